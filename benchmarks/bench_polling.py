@@ -0,0 +1,269 @@
+"""Measures how fast DataLogger and Fleet sample simulated printers.
+
+Each scenario combines a number of targets, printers, a server latency
+and a logging interval, and reports the achieved sample rate, tick
+jitter, requests per tick, CPU time per sample and memory growth. The
+simulators run in a separate process so their CPU time is not counted.
+
+    python benchmarks/bench_polling.py --output results.json
+    python benchmarks/bench_polling.py --baseline results.json
+
+With `--baseline`, the run fails if a scenario got slower than the
+baseline by more than `--tolerance`.
+"""
+from argparse import ArgumentParser
+import asyncio
+import gc
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from ultimakerpy import UMS3, Fleet  # noqa: E402
+from ultimakerpy import printer as printer_module  # noqa: E402
+from ultimakerpy.datalog import DataLogger  # noqa: E402
+
+GETTERS = [
+    lambda p: p.bed.position,
+    lambda p: p.head.position_x,
+    lambda p: p.head.position_y,
+    lambda p: p.main_nozzle.temperature,
+    lambda p: p.main_nozzle.target_temperature,
+    lambda p: p.sub_nozzle.temperature,
+    lambda p: p.sub_nozzle.target_temperature,
+    lambda p: p.bed.temperature,
+    lambda p: p.bed.target_temperature,
+    lambda p: p.peripherals.ambient_temperature,
+    lambda p: p.head.max_speed_x,
+    lambda p: p.head.accel,
+    lambda p: p.main_feeder.max_speed,
+    lambda p: p.led.brightness,
+    lambda p: p.fan.speed,
+    lambda p: p.status,
+]
+# A higher value is better for these metrics, a lower one for the others.
+HIGHER_IS_BETTER = {'sample_rate'}
+COMPARED = ['sample_rate', 'cpu_per_sample_ms', 'requests_per_tick']
+
+
+def targets_for(printer, num_targets):
+    getters = itertools.islice(itertools.cycle(GETTERS), num_targets)
+    return {'t{}'.format(i): getter(printer)
+            for i, getter in enumerate(getters)}
+
+
+class SimulatorProcess:
+    """Runs `python -m ultimakerpy.simulator` and reads its config."""
+
+    def __init__(self, count, latency, jitter):
+        self.dir = tempfile.mkdtemp(prefix='umbench')
+        self.config = os.path.join(self.dir, 'config.yaml')
+        self.proc = subprocess.Popen(
+            [sys.executable, '-m', 'ultimakerpy.simulator', '-n', str(count),
+             '--latency', str(latency), '--jitter', str(jitter),
+             '--config', self.config],
+            stdout=subprocess.DEVNULL, cwd=self.dir,
+            env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+        while not os.path.exists(self.config):
+            if self.proc.poll() is not None:
+                raise RuntimeError('simulator exited')
+            time.sleep(0.05)
+        time.sleep(0.1)
+        with open(self.config) as f:
+            self.entries = yaml.safe_load(f)
+
+    @property
+    def names(self):
+        return sorted(self.entries)
+
+    def request_count(self):
+        return sum(requests.get('http://{}/simulator/stats'.format(
+            entry['ip_address'])).json()['requests']
+            for entry in self.entries.values())
+
+    def close(self):
+        self.proc.terminate()
+        self.proc.wait()
+
+
+def run_logger(names, num_targets, interval, duration, workdir):
+    """One DataLogger thread per printer, as a sync user would run it."""
+    loggers = []
+    ticks = {}
+    for name in names:
+        printer = UMS3(name)
+        dl = DataLogger(printer._client,
+                        os.path.join(workdir, name + '.csv'),
+                        logging_interval=interval)
+        dl.register(targets_for(printer, num_targets))
+        ticks[name] = []
+        dl.add_callback(lambda t=ticks[name]: t.append(time.perf_counter()))
+        loggers.append(dl)
+
+    threads = [threading.Thread(target=_run_for, args=(dl, duration))
+               for dl in loggers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return ticks
+
+
+def _run_for(dl, duration):
+    with dl.loop():
+        time.sleep(duration)
+
+
+def run_fleet(names, num_targets, interval, duration, workdir):
+    """One Fleet polling all printers from one event loop."""
+    ticks = {name: [] for name in names}
+
+    async def main():
+        async with Fleet(names, logging_interval=interval) as fleet:
+            async for name, _ in fleet.samples(
+                    lambda p: targets_for(p, num_targets), duration):
+                ticks[name].append(time.perf_counter())
+
+    asyncio.run(main())
+    return ticks
+
+
+def summarize(ticks, interval, duration):
+    intervals = []
+    for times in ticks.values():
+        intervals += [b - a for a, b in zip(times, times[1:])]
+    samples = sum(len(times) for times in ticks.values())
+    errors = [abs(i - interval) for i in intervals] or [0.0]
+    return {
+        'samples': samples,
+        'sample_rate': samples / len(ticks) / duration,
+        'interval_mean_ms': 1e3 * statistics.fmean(intervals or [0.0]),
+        'jitter_std_ms': 1e3 * (statistics.pstdev(intervals)
+                                if intervals else 0.0),
+        'jitter_p99_ms': 1e3 * sorted(errors)[int(0.99 * (len(errors)-1))],
+        'overruns': sum(i > 1.5 * interval for i in intervals),
+    }
+
+
+def rss_kb():
+    """Return the current resident set size, or None without /proc."""
+    # Not ru_maxrss: that is the peak of the whole process, which an
+    # earlier scenario may already have set.
+    gc.collect()
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def run_scenario(mode, num_printers, num_targets, latency, jitter, interval,
+                 duration):
+    sims = SimulatorProcess(num_printers, latency, jitter)
+    workdir = tempfile.mkdtemp(prefix='umbench')
+    try:
+        printer_module.CONFIG = sims.config
+        runner = run_fleet if mode == 'fleet' else run_logger
+        rss0, cpu0 = rss_kb(), time.process_time()
+        requests0 = sims.request_count()
+        ticks = runner(sims.names, num_targets, interval, duration, workdir)
+        cpu = time.process_time() - cpu0
+        num_requests = sims.request_count() - requests0
+        rss1 = rss_kb()
+    finally:
+        sims.close()
+    result = summarize(ticks, interval, duration)
+    samples = max(result['samples'], 1)
+    result.update({
+        'requests_per_tick': num_requests / samples,
+        'cpu_per_sample_ms': 1e3 * cpu / samples,
+        'rss_growth_kb': None if rss0 is None else rss1 - rss0,
+    })
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Return a message per metric that regressed beyond `tolerance`."""
+    def key(entry):
+        return tuple(entry['scenario'][k] for k in sorted(entry['scenario']))
+
+    base = {key(entry): entry['metrics'] for entry in baseline['results']}
+    failures = []
+    for entry in results:
+        old = base.get(key(entry))
+        if old is None:
+            continue
+        for metric in COMPARED:
+            new_val, old_val = entry['metrics'][metric], old[metric]
+            if not old_val:
+                continue
+            change = (new_val - old_val) / old_val
+            if metric in HIGHER_IS_BETTER:
+                change = -change
+            if change > tolerance:
+                failures.append('{} {}: {:.4g} -> {:.4g}'.format(
+                    entry['scenario'], metric, old_val, new_val))
+    return failures
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modes', nargs='+', default=['logger', 'fleet'],
+                        choices=['logger', 'fleet'])
+    parser.add_argument('--targets', nargs='+', type=int, default=[1, 8, 16])
+    parser.add_argument('--printers', nargs='+', type=int, default=[1, 4])
+    parser.add_argument('--latency', nargs='+', type=float,
+                        default=[0.0, 0.02])
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--interval', nargs='+', type=float,
+                        default=[0.1, 0.5])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = []
+    for mode, printers, targets, latency, interval in itertools.product(
+            args.modes, args.printers, args.targets, args.latency,
+            args.interval):
+        scenario = {'mode': mode, 'printers': printers, 'targets': targets,
+                    'latency': latency, 'interval': interval}
+        metrics = run_scenario(mode, printers, targets, latency, args.jitter,
+                               interval, args.duration)
+        results.append({'scenario': scenario, 'metrics': metrics})
+        print(json.dumps(scenario), json.dumps(
+            {k: round(v, 3) if isinstance(v, float) else v
+             for k, v in metrics.items()}), flush=True)
+
+    report = {'meta': {'python': platform.python_version(),
+                       'platform': platform.platform(),
+                       'cpus': os.cpu_count(),
+                       'duration': args.duration,
+                       'time': time.time()},
+              'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            failures = compare(results, json.load(f), args.tolerance)
+        for failure in failures:
+            print('REGRESSION', failure)
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
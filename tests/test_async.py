@@ -0,0 +1,31 @@
+import asyncio
+
+from ultimakerpy import AsyncUMS3
+
+NAME = 'test'
+
+
+async def _read_values():
+    async with AsyncUMS3(name=NAME) as printer:
+        values = await asyncio.gather(
+            printer.status(),
+            printer.job_state(),
+            printer.head.position(),
+            printer.bed.position(),
+            printer.bed.temperature(),
+            printer.main_nozzle.temperature(),
+            printer.sub_nozzle.temperature(),
+            printer.led.brightness(),
+        )
+    return values
+
+
+def test_async_s3():
+    print('test_async_s3')
+    values = asyncio.run(_read_values())
+    print(values)
+    assert len(values) == 8
+
+
+if __name__ == '__main__':
+    test_async_s3()
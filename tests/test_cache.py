@@ -0,0 +1,50 @@
+import json
+import time
+
+from ultimakerpy.cache import MISS, ResponseCache
+from ultimakerpy.const import ENDPOINT
+from ultimakerpy.parse import parse_ttls
+
+BASE = 'http://printer/api/v1/printer/heads/0'
+
+
+def test_response_cache():
+    ttls = {BASE + '/jerk': 10, BASE + '/jerk/x': 10, BASE + '/accel': 0.1,
+            BASE + '/max_speed': 10}
+    cache = ResponseCache(ttls, maxsize=3)
+    assert cache.get(BASE + '/jerk/x') is MISS
+    cache.put(BASE + '/jerk/x', 5.0)
+    cache.put(BASE + '/position', 1.0)
+    assert cache.get(BASE + '/jerk/x') == 5.0
+    assert cache.get(BASE + '/position') is MISS
+
+    cache.put(BASE + '/accel', 3000)
+    time.sleep(0.2)
+    assert cache.get(BASE + '/accel') is MISS
+
+    cache.put(BASE + '/jerk', {'x': 5.0})
+    cache.invalidate(BASE + '/jerk')
+    assert cache.get(BASE + '/jerk') is MISS
+    assert cache.get(BASE + '/jerk/x') is MISS
+
+    for url in (BASE + '/jerk', BASE + '/jerk/x', BASE + '/accel',
+                BASE + '/max_speed'):
+        cache.put(url, 0)
+    stats = cache.stats()
+    print(stats)
+    assert stats['size'] == 3
+    assert stats['evictions'] == 1
+    assert stats['hits'] == 1
+
+
+def test_parse_ttls():
+    with open(ENDPOINT, 'r') as f:
+        item = json.load(f)['s3']
+    ttls = parse_ttls(item, base_path='http://printer')
+    assert ttls['http://printer/api/v1/printer/heads/0/jerk/x'] > 0
+    assert 'http://printer/api/v1/printer/heads/0/position/x' not in ttls
+
+
+if __name__ == '__main__':
+    test_response_cache()
+    test_parse_ttls()
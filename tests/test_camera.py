@@ -0,0 +1,101 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from ultimakerpy.camera import FrameGrabber
+
+NUM_FRAMES = 20
+FRAME_SIZE = (64, 48)
+
+
+def _write_video(path):
+    cv2 = pytest.importorskip('cv2')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30,
+                             FRAME_SIZE)
+    for i in range(NUM_FRAMES):
+        frame = np.full((FRAME_SIZE[1], FRAME_SIZE[0], 3), i * 10, np.uint8)
+        writer.write(frame)
+    writer.release()
+
+
+def test_frame_grabber(tmp_path):
+    path = str(tmp_path / 'test_camera.avi')
+    _write_video(path)
+    with FrameGrabber(path, capacity=8, retry_interval=10.0) as grabber:
+        frames = list(grabber.frames(timeout=2.0))
+        latest = grabber.latest_frame()
+    print('grabbed', grabber.frame_count, 'frames')
+    assert grabber.frame_count == NUM_FRAMES
+    assert latest is not None
+    timestamp, frame = latest
+    assert frame.shape == (FRAME_SIZE[1], FRAME_SIZE[0], 3)
+    assert timestamp <= time.time()
+    assert np.shares_memory(frame, grabber._frames)
+    assert 0 < len(frames) <= NUM_FRAMES
+
+
+def test_frames_skip_decoding_slot():
+    pytest.importorskip('cv2')
+    grabber = FrameGrabber(0, capacity=4)
+    grabber._frames = np.zeros((4, 1), np.uint8)
+    grabber._times[:] = [8, 9, 6, 7]
+    grabber._count = 3
+
+    def run_ahead():
+        # The grabber got ahead by more than the buffer holds.
+        with grabber._updated:
+            grabber._count = 10
+            grabber._updated.notify_all()
+
+    threading.Timer(0.05, run_ahead).start()
+    assert [t for t, _ in grabber.frames(timeout=0.5)] == [7, 8, 9]
+
+
+class FakeCapture:
+
+    def __init__(self, frames):
+        self._frames = iter(frames)
+
+    def read(self, buf=None):
+        frame = next(self._frames, None)
+        return frame is not None, frame
+
+    def release(self):
+        pass
+
+
+def test_frames_after_resize():
+    pytest.importorskip('cv2')
+    # The camera switches resolution after three frames.
+    frames = [np.full((2, 2, 3), i * 10, np.uint8) for i in range(3)] \
+        + [np.full((4, 4, 3), i * 10, np.uint8) for i in range(3, 5)]
+    capture = FakeCapture(frames)
+    grabber = FrameGrabber(0, capacity=4, retry_interval=10.0)
+    grabber._cv2 = type('cv2', (), {'VideoCapture': lambda target: capture})
+    values = []
+
+    def consume():
+        for _, frame in grabber.frames(timeout=0.5):
+            values.append((frame.shape[0], int(frame.max())))
+            time.sleep(0.2)
+
+    thread = threading.Thread(target=consume)
+    thread.start()
+    time.sleep(0.05)
+    with grabber:
+        thread.join()
+    print(values)
+    # Frames of the old buffer are gone after the resize.
+    assert values[-2:] == [(4, 30), (4, 40)]
+    assert all(size == 2 for size, _ in values[:-2])
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_frame_grabber(pathlib.Path(d))
+    test_frames_skip_decoding_slot()
+    test_frames_after_resize()
@@ -2,7 +2,8 @@ import time
 
 import pytest
 
-from ultimakerpy.client import FutureResult, UMClient, _BatchClient, _RealtimeClient
+from ultimakerpy.client import (FutureResult, UMClient, _BatchClient,
+                                _RealtimeClient, _extract, _plan_fetches)
 
 NUM_REQUESTS = 5
 URL_GET = 'http://httpbin.org/get'
@@ -24,6 +25,13 @@ def test_realtime_client():
     print('time:', t2-t1, 'sec')
 
 
+def test_realtime_pool():
+    client = _RealtimeClient(pool_connections=2, pool_maxsize=4)
+    adapter = client._session.get_adapter(URL_GET)
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 4
+
+
 def test_batch_client():
     print('_BatchClient')
     client = _BatchClient()
@@ -37,6 +45,11 @@ def test_batch_client():
     t2 = time.time()
     print('time:', t2-t1, 'sec')
 
+    for i in range(NUM_REQUESTS):
+        client.register_put(URL_PUT, str(i), group=0)
+    results = client.batch_request()
+    assert [res['data'] for res in results] == [str(i) for i in range(NUM_REQUESTS)]
+
 
 def test_um_client():
     print('UMClient')
@@ -49,12 +62,16 @@ def test_um_client():
         client.post(URL_POST, {'target': i})
     t2 = time.time()
     with client.batch_mode():
+        futures = []
         for i in range(NUM_REQUESTS):
             client.get(URL_GET)
-            client.put(URL_PUT)
-            client.post(URL_POST)
+            with client.ordered():
+                futures.append(client.put(URL_PUT, {'target': i}))
+                client.post(URL_POST)
         print('batch request')
     t3 = time.time()
+    assert [fut.get()['json'] for fut in futures] == \
+        [{'target': i} for i in range(NUM_REQUESTS)]
     print('time-realtime:', t2-t1, 'sec')
     print('time-batch   :', t3-t2, 'sec')
 
@@ -72,8 +89,40 @@ def test_future_result():
     assert future.get() == 0
 
 
+def test_snapshot_plan():
+    base = 'http://printer/api/v1'
+    urls = [base + '/printer/status',
+            base + '/printer/heads/0/position/x',
+            base + '/printer/heads/0/position/x',
+            base + '/print_job/state',
+            base + '/ambient_temperature/current']
+    plan = _plan_fetches(urls, coalesce=True)
+    assert plan[0] == (base + '/printer', ('status',))
+    assert plan[1] == (base + '/printer', ('heads', '0', 'position', 'x'))
+    assert plan[2] == plan[1]
+    assert plan[3] == (base + '/print_job/state', ())
+    assert plan[4] == (base + '/ambient_temperature/current', ())
+
+    snapshot = {'status': 'idle', 'heads': [{'position': {'x': 1.0}}]}
+    assert _extract(snapshot, plan[0][1]) == 'idle'
+    assert _extract(snapshot, plan[1][1]) == 1.0
+    with pytest.raises(Exception):
+        _extract(snapshot, ('heads', '1'))
+
+    plan = _plan_fetches(urls)
+    assert plan[1] == (base + '/printer/heads/0/position/x', ())
+
+    head = base + '/printer/heads/0'
+    plan = _plan_fetches([head + '/position/x', head + '/position',
+                          head + '/position/y', head + '/jerk'])
+    assert plan == [(head + '/position', ('x',)), (head + '/position', ()),
+                    (head + '/position', ('y',)), (head + '/jerk', ())]
+
+
 if __name__ == '__main__':
     test_realtime_client()
+    test_realtime_pool()
     test_batch_client()
     test_um_client()
     test_future_result()
+    test_snapshot_plan()
@@ -1,6 +1,9 @@
 import random
 import time
 
+import pytest
+
+from ultimakerpy import datalog
 from ultimakerpy.client import UMClient
 from ultimakerpy.datalog import DataLogger
 from ultimakerpy.printer import UMS3
@@ -24,6 +27,113 @@ def test_datalogger():
             time.sleep(1.0)
 
 
+def test_timer_wait(tmp_path):
+    print('test_timer_wait')
+    client = UMClient()
+    logger = DataLogger(client, str(tmp_path / 'test_timer_wait.csv'),
+                        logging_interval=0.1, timer_timeout=5.0)
+    counter = iter(range(1000))
+    logger.register({'count': lambda: next(counter)})
+    with logger.loop():
+        timer = logger.get_timer()
+        t1, c1 = time.perf_counter(), time.process_time()
+        timer.wait_for_datalog('count', lambda v: v >= 10)
+        t2, c2 = time.perf_counter(), time.process_time()
+    print('wait:', t2-t1, 'sec', 'cpu:', c2-c1, 'sec')
+    assert c2 - c1 < 0.5 * (t2 - t1)
+
+
+def test_sampling_intervals(tmp_path):
+    print('test_sampling_intervals')
+    client = UMClient()
+    output = tmp_path / 'test_sampling_intervals.csv'
+    logger = DataLogger(client, str(output), logging_interval=0.1,
+                        sparse=True)
+    counts = {'fast': 0, 'slow': 0}
+
+    def count(key):
+        counts[key] += 1
+        return counts[key]
+
+    logger.register({'fast': lambda: count('fast')})
+    logger.register({'slow': lambda: count('slow')}, interval=0.5)
+    with logger.loop():
+        # Read between two deadlines of `slow`, not while it is sampled.
+        time.sleep(2.05)
+        assert logger.get('slow') == counts['slow']
+    print(counts)
+    assert counts['fast'] >= 3 * counts['slow']
+    rows = output.read_text().splitlines()
+    assert any(row.endswith(',') for row in rows[1:])
+
+
+def test_stamp_columns(tmp_path):
+    print('test_stamp_columns')
+    logger = DataLogger(UMClient(), str(tmp_path / 'test_stamps.csv'),
+                        received_at=True, stale_flags=True)
+    assert list(logger.funcs) == ['timestamp']
+    with pytest.raises(ValueError):
+        logger.register({'n': lambda: 0, 'stale': lambda: 1})
+    assert list(logger.funcs) == ['timestamp']
+
+
+class FailingWriter:
+
+    def open(self, columns):
+        pass
+
+    def write_rows(self, rows):
+        raise OSError('disk full')
+
+    def close(self):
+        pass
+
+
+def test_writer_error(tmp_path, monkeypatch):
+    print('test_writer_error')
+    monkeypatch.setattr(datalog, 'open_writer', lambda path: FailingWriter())
+    logger = DataLogger(UMClient(), str(tmp_path / 'test_writer_error.csv'),
+                        logging_interval=0.01)
+    logger.register({'n': lambda: 0})
+    with pytest.raises(OSError), pytest.warns(RuntimeWarning):
+        with logger.loop():
+            # More than a batch, so the first flush has failed.
+            count = logger.wait_for_sample(150, timeout=5.0)
+            error = logger.writer_error
+    # Sampling went on after the first flush failed.
+    assert count > 150 and isinstance(error, OSError)
+
+
+def test_tick_schedule(tmp_path):
+    print('test_tick_schedule')
+    client = UMClient()
+    output = tmp_path / 'test_tick_schedule.csv'
+    logger = DataLogger(client, str(output), logging_interval=0.05,
+                        overrun_policy='skip', received_at=True)
+    calls = iter(range(1000))
+
+    def slow():
+        n = next(calls)
+        if n == 5:
+            time.sleep(0.12)
+        return n
+
+    logger.register({'n': slow})
+    with logger.loop():
+        time.sleep(1.0)
+    stats = logger.tick_stats()
+    print(stats)
+    assert stats['overruns'] >= 1 and stats['missed'] >= 2
+    assert 16 <= stats['ticks'] + stats['missed'] <= 21
+    rows = [row.split(',') for row in output.read_text().splitlines()]
+    assert rows[0] == ['timestamp', 'received_at', 'n']
+    sent = [float(row[0]) for row in rows[1:]]
+    assert all(float(row[1]) >= float(row[0]) for row in rows[1:])
+    # Ticks stay on the 50 ms grid, apart from the skipped ones.
+    gaps = [round((b - a) / 0.05) for a, b in zip(sent, sent[1:])]
+    assert gaps.count(1) >= len(gaps) - 3 and max(gaps) >= 3
+
+
 def test_s3_datalogger():
     print('test_s3_datalogger')
     printer = UMS3(name=NAME)
@@ -0,0 +1,79 @@
+import time
+
+import pytest
+import yaml
+
+from ultimakerpy import UMS3
+from ultimakerpy import printer as printer_module
+from ultimakerpy.client import UMClient
+from ultimakerpy.exceptions import (DeadlineError, RequestError,
+                                   StaleValueWarning)
+from ultimakerpy.simulator import Simulator
+
+SLOW_PATH = '/api/v1/printer/heads/0/position/z'
+
+
+@pytest.fixture
+def sim(tmp_path, monkeypatch):
+    sim = Simulator(seed=0, path_latency={SLOW_PATH: 0.6})
+    sim.start()
+    path = tmp_path / 'config.yaml'
+    path.write_text(yaml.safe_dump({'sim': sim.config_entry()}))
+    monkeypatch.setattr(printer_module, 'CONFIG', str(path))
+    yield sim
+    sim.stop()
+
+
+def test_partial_batch(sim):
+    client = UMClient(timeout=2.0)
+    base = 'http://{}'.format(sim.address)
+    t = time.perf_counter()
+    with client.batch_mode(deadline=0.2, return_exceptions=True):
+        status = client.get(base + '/api/v1/printer/status')
+        z = client.get(base + SLOW_PATH)
+        missing = client.get(base + '/api/v1/printer/missing')
+    elapsed = time.perf_counter() - t
+    print(elapsed)
+    assert elapsed < 0.5
+    assert status.get() == 'idle'
+    assert z.failed and isinstance(z.error, DeadlineError)
+    assert missing.failed and isinstance(missing.error, RequestError)
+    with pytest.raises(DeadlineError):
+        z.get()
+
+    # The late GET is still running and answers the next batch.
+    count = sim.request_count
+    time.sleep(0.3)
+    with client.batch_mode(deadline=0.5):
+        z = client.get(base + SLOW_PATH)
+    assert not z.failed and isinstance(z.get(), float)
+    assert sim.request_count == count
+
+
+def test_logger_cadence(sim, tmp_path):
+    printer = UMS3('sim')
+    targets = {'bed_pos': printer.bed.position,
+               'nozzle_temp': printer.main_nozzle.temperature}
+    printer.logging_interval = 0.2
+    printer.tick_deadline = 0.2
+    ticks, stale = [], []
+    with pytest.warns(StaleValueWarning, match='bed_pos'), \
+            printer.data_logger(str(tmp_path / 'log.csv'), targets,
+                                stale_flags=True) as dl:
+        dl.add_callback(lambda: stale.append(dl.stale))
+        dl.add_tick_hook(ticks.append)
+        dl.wait_for_sample(8, timeout=5.0)
+        stats = dl.tick_stats()
+    print(stale, stats)
+    assert max(trace.duration for trace in ticks) < 0.35
+    assert stats['missed'] <= 1
+    assert all('nozzle_temp' not in names for names in stale)
+    assert sum('bed_pos' in names for names in stale) >= len(stale) // 2
+    assert any('bed_pos' not in names for names in stale)
+    rows = (tmp_path / 'log.csv').read_text().splitlines()
+    assert rows[0].split(',')[:2] == ['timestamp', 'stale']
+    assert 'bed_pos' in rows[1]
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,31 @@
+import asyncio
+
+from ultimakerpy import Fleet
+
+NAMES = ['test']
+
+
+def targets(printer):
+    return {
+        'status': printer.status,
+        'bed_pos': printer.bed.position,
+        'mnoz_temp_cur': printer.main_nozzle.temperature,
+    }
+
+
+async def _run_fleet():
+    async with Fleet(NAMES, max_concurrency=4, logging_interval=0.5) as fleet:
+        samples = await fleet.sample(targets)
+        await fleet.log('test_fleet.csv', targets, duration=2.0)
+    return samples, fleet.errors
+
+
+def test_fleet():
+    print('test_fleet')
+    samples, errors = asyncio.run(_run_fleet())
+    print(samples)
+    assert set(samples) | set(errors) == set(NAMES)
+
+
+if __name__ == '__main__':
+    test_fleet()
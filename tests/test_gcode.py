@@ -0,0 +1,71 @@
+import numpy as np
+
+from ultimakerpy import gcode
+from ultimakerpy.gcode import analyze
+from ultimakerpy.ufp import pack_ufp
+
+
+def _write_gcode(path, layers=20, moves=200, markers=True):
+    lines = [';FLAVOR:Griffin', 'G28', 'G90', 'M82', 'G92 E0',
+             'G1 F1500 E-6.5']
+    e = 0.0
+    for layer in range(layers):
+        z = 0.27 + 0.2 * layer
+        if markers:
+            lines.append(';LAYER:{}'.format(layer))
+        lines.append('G0 F3000 X10 Y10 Z{:.2f}'.format(z))
+        for m in range(moves):
+            e += 0.05
+            lines.append('G1 F1800 X{} Y{} E{:.5f} ; wall'.format(
+                10 + m % 2 * 60, 10 + (m + 1) % 2 * 60, e))
+        lines += ['G1 F2700 E{:.5f}'.format(e - 6.5),
+                  'G0 Z{:.2f}'.format(z + 0.3),
+                  'G1 F2700 E{:.5f}'.format(e)]
+    lines.append('M104 S0')
+    path.write_text('\n'.join(lines) + '\n')
+
+
+def test_analyze(tmp_path):
+    print('test_analyze')
+    path = tmp_path / 'model.gcode'
+    _write_gcode(path)
+    table = analyze(str(path), processes=1)
+    print(table)
+    assert list(table.layer) == list(range(20))
+    assert np.allclose(table.z, 0.27 + 0.2 * np.arange(20))
+    assert np.allclose(table.extrusion, 10.0 * np.arange(1, 21))
+    assert np.all(np.diff(table.time) > 0)
+    assert table.layer_at(0.1) == -1
+    assert table.layer_at(0.27) == 0
+    assert table.layer_at(0.5) == 1
+    assert table.layer_at(0.57) == 1  # z hop above layer 1
+    assert table.layer_at(100) == 19
+
+    layers, timestamps = table.predict(9, started_at=0.0,
+                                       now=2 * table.time_of(9))
+    assert layers[0] == 10
+    assert np.isclose(timestamps[0], 2 * table.time_of(10))
+
+    _write_gcode(path, markers=False)
+    assert np.allclose(analyze(str(path), processes=1).z, table.z)
+
+    ufp = tmp_path / 'model.ufp'
+    pack_ufp(str(path), str(ufp))
+    assert np.allclose(analyze(str(ufp)).z, table.z)
+
+
+def test_analyze_chunks(tmp_path, monkeypatch):
+    print('test_analyze_chunks')
+    path = tmp_path / 'model.gcode'
+    _write_gcode(path, layers=50)
+    table = analyze(str(path), processes=1)
+    monkeypatch.setattr(gcode, '_MIN_CHUNK_SIZE', 1 << 12)
+    chunked = analyze(str(path), processes=4)
+    for key in ('layer', 'z', 'extrusion', 'time'):
+        assert np.allclose(getattr(table, key), getattr(chunked, key))
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    test_analyze(pathlib.Path(tempfile.mkdtemp()))
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+from ultimakerpy.history import History, RingBuffer
+
+
+def test_ring_buffer():
+    buffer = RingBuffer(5)
+    for i in range(8):
+        buffer.append(float(i), i * 2.0)
+    times, values = buffer.window()
+    assert len(buffer) == 5
+    assert times.tolist() == [3.0, 4.0, 5.0, 6.0, 7.0]
+    assert values.tolist() == [6.0, 8.0, 10.0, 12.0, 14.0]
+    times, values = buffer.window(seconds=2.0)
+    assert times.tolist() == [5.0, 6.0, 7.0]
+
+
+def test_history_stats():
+    history = History(100)
+    for i in range(10):
+        history.append({'timestamp': 100.0 + i, 'temp': 20.0 + 0.5 * i,
+                        'status': 'printing', 'pos': (1.0, 2.0)})
+    assert set(history.keys()) == {'temp'}
+    stats = history.window_stats('temp', seconds=4.0)
+    assert stats.count == 5
+    assert stats.min == pytest.approx(22.5)
+    assert stats.max == pytest.approx(24.5)
+    assert stats.mean == pytest.approx(23.5)
+    assert stats.slope == pytest.approx(0.5)
+    assert np.isnan(history.window_stats('missing').mean)
+
+
+if __name__ == '__main__':
+    test_ring_buffer()
+    test_history_stats()
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from ultimakerpy.client import UMClient
+from ultimakerpy.datalog import DataLogger
+
+# Layer 1 at 0.2 mm with a Z-hop to 0.5 mm, then layers 2 and 3.
+POSITIONS = [0.0, 0.0, 0.2, 0.2, 0.2, 0.5, 0.2, 0.2, 0.4, 0.4, 0.4, 0.6]
+# A new layer at every sample.
+RISING = [0.0, 0.2, 0.4, 0.6, 0.8, 1.0, 1.2, 1.4]
+
+
+def _logger(tmp_path, name, positions=POSITIONS):
+    client = UMClient()
+    logger = DataLogger(client, str(tmp_path / name), logging_interval=0.05,
+                        timer_timeout=5.0)
+    positions = iter(positions)
+    last = [0.0]
+
+    def bed_pos():
+        last[0] = next(positions, last[0])
+        return last[0]
+
+    logger.register({'bed_pos': bed_pos})
+    return logger
+
+
+def test_layer_tracker(tmp_path):
+    print('test_layer_tracker')
+    logger = _logger(tmp_path, 'test_layer_tracker.csv')
+    tracker = logger.track_layers(layer_height=0.2)
+    seen = []
+    tracker.add_callback(seen.append)
+    reached = []
+
+    def waiter(n):
+        if tracker.wait_for_layer(n, timeout=5.0):
+            reached.append(n)
+
+    threads = [threading.Thread(target=waiter, args=(n % 3 + 1,))
+               for n in range(30)]
+    for thread in threads:
+        thread.start()
+    with logger.loop():
+        events = list(tracker.iter_events(timeout=1.0))
+    for thread in threads:
+        thread.join()
+    print(events)
+    assert [e.layer for e in events] == [1, 2, 3]
+    assert seen == events == tracker.events
+    assert sorted(reached) == sorted(n % 3 + 1 for n in range(30))
+
+
+def test_timer_wait_for_layer(tmp_path):
+    print('test_timer_wait_for_layer')
+    logger = _logger(tmp_path, 'test_timer_wait_for_layer.csv')
+    logger.track_layers(min_step=0.1)
+    with logger.loop():
+        timer = logger.get_timer()
+        t1 = time.perf_counter()
+        timer.wait_for_layer(2)
+        print('waited', time.perf_counter() - t1, 'sec')
+        assert logger.get('bed_pos') == 0.4
+
+
+def test_layer_tracker_rising(tmp_path):
+    print('test_layer_tracker_rising')
+    for kwargs in ({'layer_height': 0.2}, {'min_step': 0.1}):
+        logger = _logger(tmp_path, 'test_layer_tracker_rising.csv',
+                         positions=RISING)
+        tracker = logger.track_layers(**kwargs)
+        with logger.loop():
+            assert tracker.wait_for_layer(7, timeout=2.0)
+        print(kwargs, tracker.events)
+        assert [(e.layer, e.z) for e in tracker.events] \
+            == [(2, 0.4), (4, 0.8), (6, 1.2), (7, 1.4)]
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    test_layer_tracker(pathlib.Path(tempfile.mkdtemp()))
+    test_timer_wait_for_layer(pathlib.Path(tempfile.mkdtemp()))
+    test_layer_tracker_rising(pathlib.Path(tempfile.mkdtemp()))
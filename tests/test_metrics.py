@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+import requests
+import yaml
+
+from ultimakerpy import Fleet, UMS3
+from ultimakerpy import printer as printer_module
+from ultimakerpy.client import UMClient
+from ultimakerpy.exceptions import RequestError
+from ultimakerpy.metrics import REGISTRY, Histogram, RequestMetrics
+from ultimakerpy.simulator import start_fleet
+from ultimakerpy.tracing import RequestTrace
+
+
+@pytest.fixture
+def sims(tmp_path, monkeypatch):
+    sims = start_fleet(2, seed=0)
+    config = {'sim{}'.format(i): dict(sim.config_entry(),
+                                      request_metrics=True)
+              for i, sim in enumerate(sims)}
+    path = tmp_path / 'config.yaml'
+    path.write_text(yaml.safe_dump(config))
+    monkeypatch.setattr(printer_module, 'CONFIG', str(path))
+    REGISTRY.reset()
+    yield sims
+    for sim in sims:
+        sim.stop()
+
+
+def test_histogram():
+    hist = Histogram([0.1, 1.0])
+    for value in (0.05, 0.1, 0.5, 2.0):
+        hist.observe(value)
+    assert hist.cumulative() == [(0.1, 2), (1.0, 3), (float('inf'), 4)]
+    assert hist.count == 4 and hist.sum == pytest.approx(2.65)
+    assert 0.1 < hist.quantile(0.7) <= 1.0
+
+
+def test_request_metrics():
+    metrics = RequestMetrics(buckets=[0.1])
+    url = 'http://um/api/v1/bed/z'
+    ok = RequestTrace('GET', url, 'um', 'bed/pos')
+    ok.started_at, ok.finished_at = 1.0, 1.01
+    ok.bytes_received = 4
+    timeout = RequestTrace('GET', url, 'um', 'bed/pos')
+    timeout.error = asyncio.TimeoutError()
+    cancelled = RequestTrace('GET', url, 'um', 'bed/pos')
+    cancelled.error = asyncio.CancelledError()
+    error = RequestTrace('GET', 'http://um/api/v1/printer', None,
+                         '/api/v1/printer')
+    error.error = RequestError()
+    for trace in (ok, timeout, cancelled, error):
+        metrics.record(trace)
+    series = {s['endpoint']: s for s in metrics.snapshot()}
+    assert series['bed/pos']['requests'] == 3
+    assert series['bed/pos']['errors'] == 1
+    assert series['bed/pos']['timeouts'] == 1
+    assert series['bed/pos']['bytes_received'] == 4
+    assert series['/api/v1/printer']['printer'] == 'um'
+
+    text = metrics.to_prometheus()
+    print(text)
+    assert ('ultimakerpy_requests_total{printer="um",endpoint="bed/pos",'
+            'method="GET"} 3') in text
+    assert ('ultimakerpy_request_duration_seconds_bucket{printer="um",'
+            'endpoint="bed/pos",method="GET",le="+Inf"} 3') in text
+
+
+def test_client_metrics(sims):
+    metrics = RequestMetrics()
+    client = UMClient(timeout=0.5, metrics=metrics)
+    url = 'http://{}/api/v1/printer/status'.format(sims[0].address)
+    client.get(url)
+    with client.batch_mode():
+        client.get(url)
+        client.put(url[:-len('status')] + 'led/brightness', 50)
+    with pytest.raises(RequestError):
+        client.get(url + '/missing')
+    with pytest.raises(requests.ConnectionError):
+        client.get('http://127.0.0.1:1/api/v1/printer')
+    series = {(s['endpoint'], s['method']): s for s in metrics.snapshot()}
+    print(series)
+    status = series[('/api/v1/printer/status', 'GET')]
+    assert status['requests'] == 2 and status['errors'] == 0
+    assert status['bytes_received'] > 0
+    assert series[('/api/v1/printer/led/brightness', 'PUT')]['bytes_sent'] \
+        == 2
+    assert series[('/api/v1/printer/status/missing', 'GET')]['errors'] == 1
+    assert series[('/api/v1/printer', 'GET')]['errors'] == 1
+
+
+def test_printer_metrics(sims):
+    printer = UMS3('sim0')
+    printer.bed.position()
+    with printer.batch_mode():
+        printer.bed.position()
+        printer.main_nozzle.temperature()
+    series = {s['endpoint']: s for s in printer.request_metrics()}
+    print(series)
+    assert series['bed/pos_z']['requests'] == 2
+    assert series['nozzle1/cur_temp']['requests'] == 1
+    assert UMS3('sim1').request_metrics() == []
+
+    async def main():
+        async with Fleet(['sim0', 'sim1']) as fleet:
+            await fleet.sample(lambda p: {'z': p.bed.position})
+
+    asyncio.run(main())
+    text = REGISTRY.to_prometheus()
+    assert 'printer="sim1",endpoint="bed/pos_z",method="GET"} 1' in text
+    assert 'printer="sim0",endpoint="bed/pos_z",method="GET"} 3' in text
+
+
+if __name__ == '__main__':
+    test_histogram()
+    test_request_metrics()
@@ -0,0 +1,87 @@
+import random
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from ultimakerpy.mjpeg import JpegFrame, MJPEGStream, MultipartParser
+
+BOUNDARY = 'boundarydonotcross'
+
+
+def _stream(parts, content_length=True):
+    data = b''
+    for part in parts:
+        data += b'--' + BOUNDARY.encode() + b'\r\n'
+        data += b'Content-Type: image/jpeg\r\n'
+        if content_length:
+            data += b'Content-Length: %d\r\n' % len(part)
+        data += b'X-Timestamp: 0.0\r\n\r\n' + part + b'\r\n'
+    return data
+
+
+@pytest.mark.parametrize('content_length', [True, False])
+@pytest.mark.parametrize('boundary', [BOUNDARY, None])
+def test_multipart_parser(content_length, boundary):
+    parts = [bytes(random.randrange(256) for _ in range(random.randint(1, 500)))
+             .replace(b'\r', b'').replace(b'-', b'') + b'\xff\xd9'
+             for _ in range(20)]
+    data = b'\r\n' + _stream(parts, content_length)
+    parser = MultipartParser(boundary)
+    result = []
+    pos = 0
+    while pos < len(data):
+        size = random.randint(1, 300)
+        result += parser.feed(data[pos:pos+size])
+        pos += size
+    result += parser.feed(b'--' + BOUNDARY.encode() + b'\r\n')
+    assert result == parts
+
+
+def test_jpeg_frame_decode():
+    cv2 = pytest.importorskip('cv2')
+    image = np.zeros((480, 640, 3), np.uint8)
+    data = cv2.imencode('.jpg', image)[1].tobytes()
+    frame = JpegFrame(0.0, data)
+    assert frame.decode().shape == (480, 640, 3)
+    assert frame.decode(scale=4).shape == (120, 160, 3)
+
+
+def _stalling_server(connections):
+    """Serve one frame per connection, then stall without closing."""
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    sock.listen()
+
+    def serve():
+        while True:
+            conn, _ = sock.accept()
+            conn.recv(65536)
+            connections.append(conn)
+            conn.sendall(b'HTTP/1.1 200 OK\r\nContent-Type: '
+                         b'multipart/x-mixed-replace;boundary=' +
+                         BOUNDARY.encode() + b'\r\n\r\n' +
+                         _stream([b'\xff\xd8frame\xff\xd9'] * 2))
+
+    threading.Thread(target=serve, daemon=True).start()
+    return 'http://127.0.0.1:{}/'.format(sock.getsockname()[1])
+
+
+def test_mjpeg_reconnect():
+    connections = []
+    url = _stalling_server(connections)
+    with MJPEGStream(url, timeout=0.2, retry_interval=0.05) as stream:
+        t = time.monotonic()
+        while len(connections) < 2 and time.monotonic() - t < 3.0:
+            time.sleep(0.05)
+    # The stalled read timed out and the reader connected again.
+    assert len(connections) >= 2
+    assert stream.frame_count >= 2
+
+
+if __name__ == '__main__':
+    test_multipart_parser(True, BOUNDARY)
+    test_jpeg_frame_decode()
+    test_mjpeg_reconnect()
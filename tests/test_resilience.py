@@ -0,0 +1,182 @@
+import asyncio
+import time
+
+import aiohttp
+import pytest
+import requests
+import yaml
+
+from ultimakerpy import UMS3
+from ultimakerpy import printer as printer_module
+from ultimakerpy.async_client import AsyncUMClient
+from ultimakerpy.client import UMClient
+from ultimakerpy.const import BreakerState, JobState
+from ultimakerpy.exceptions import (CircuitOpenError, RequestError,
+                                   RequestTimeoutError, ServerError)
+from ultimakerpy.resilience import (CircuitBreaker, RetryPolicy, call,
+                                    call_async)
+from ultimakerpy.simulator import Simulator
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def sim():
+    sim = Simulator(seed=0)
+    sim.start()
+    yield sim
+    sim.stop()
+
+
+def test_backoff():
+    policy = RetryPolicy(attempts=4, backoff=0.1, max_backoff=0.3, seed=0)
+    delays = [policy.delay(n) for n in (1, 2, 3, 4)]
+    print(delays)
+    assert 0 <= delays[0] <= 0.1 and 0 <= delays[1] <= 0.2
+    assert all(d <= 0.3 for d in delays[2:])
+    assert policy.retryable('GET', ServerError(), 3)
+    assert not policy.retryable('GET', ServerError(), 4)
+    assert not policy.retryable('PUT', ServerError(), 1)
+    assert not policy.retryable('GET', RequestError(), 1)
+    with pytest.raises(ValueError):
+        RetryPolicy(hedge_quantile=1.5)
+
+
+def test_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10.0,
+                             clock=clock)
+    for error in (requests.ConnectionError(), RequestError(),
+                  requests.ConnectionError(), ServerError()):
+        breaker.before_request()
+        breaker.record(error)
+    assert breaker.state == BreakerState.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    clock.now += 10.0
+    assert breaker.state == BreakerState.HALF_OPEN
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record(RequestTimeoutError())
+    assert breaker.state == BreakerState.OPEN
+
+    clock.now += 10.0
+    breaker.before_request()
+    breaker.record()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.stats() == {'state': 'closed', 'failures': 0,
+                               'opened': 2}
+
+
+def test_breaker_interrupted():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10.0,
+                             clock=clock)
+    policy = RetryPolicy(attempts=3, backoff=0.0)
+    breaker.before_request()
+    breaker.record(requests.ConnectionError())
+    clock.now += 10.0
+
+    def interrupt():
+        raise KeyboardInterrupt
+
+    async def cancel():
+        raise asyncio.CancelledError
+
+    with pytest.raises(KeyboardInterrupt):
+        call(interrupt, 'GET', policy, breaker)
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(call_async(cancel, 'GET', policy, breaker))
+    # Neither counted as an outcome, and the probe is free again.
+    assert breaker.state == BreakerState.HALF_OPEN
+    assert breaker.failures == 1 and policy.retries == 0
+    breaker.before_request()
+
+
+def test_hedge():
+    policy = RetryPolicy(attempts=1, hedge_quantile=0.9, hedge_min_samples=3)
+    for seconds in (0.01, 0.02, 0.03):
+        policy.observe(seconds)
+    delays = iter([1.0, 0.0])
+    cancelled = []
+
+    async def send():
+        try:
+            await asyncio.sleep(next(delays))
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return 'ok'
+
+    t = time.perf_counter()
+    assert asyncio.run(call_async(send, 'GET', policy)) == 'ok'
+    assert time.perf_counter() - t < 0.5
+    assert policy.hedges == 1 and cancelled == [True]
+
+
+def test_client_retry(sim):
+    url = 'http://{}/api/v1/printer/status'.format(sim.address)
+    sim.error_rate = 0.5
+    client = UMClient(timeout=1.0, retry=RetryPolicy(attempts=8,
+                                                     backoff=0.01))
+    assert [client.get(url) for _ in range(5)] == ['idle'] * 5
+    with client.batch_mode():
+        status = client.get(url)
+    assert status.get() == 'idle'
+    assert client.retry.retries > 0
+
+    sim.error_rate = 1.0
+    with pytest.raises(ServerError):
+        UMClient(timeout=1.0).get(url)
+
+
+def test_timeout(sim):
+    sim.latency = 0.3
+    url = 'http://{}/api/v1/printer/status'.format(sim.address)
+    with pytest.raises(RequestTimeoutError):
+        UMClient(timeout=0.1).get(url)
+
+
+def test_job_state_unreachable(sim, tmp_path, monkeypatch):
+    path = tmp_path / 'config.yaml'
+    entry = dict(sim.config_entry(), request_timeout=0.1, breaker_threshold=1)
+    path.write_text(yaml.safe_dump({'sim': entry}))
+    monkeypatch.setattr(printer_module, 'CONFIG', str(path))
+    printer = UMS3('sim')
+    assert printer.job_state() == JobState.NONE
+    # Not answering is not the same as having no job.
+    sim.latency = 0.3
+    with pytest.raises(RequestTimeoutError):
+        printer.job_state()
+    with pytest.raises(CircuitOpenError):
+        printer.job_state()
+
+
+def test_breaker_before_limiter():
+    async def main():
+        limiter = asyncio.Semaphore(1)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60.0)
+        client = AsyncUMClient(timeout=1.0, limiter=limiter, breaker=breaker)
+        url = 'http://127.0.0.1:1/api/v1/printer'
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await client.get(url)
+        async with limiter:
+            # The slot is taken, yet the open breaker answers at once.
+            with pytest.raises(CircuitOpenError):
+                await asyncio.wait_for(client.get(url), 0.5)
+        await client.close()
+
+    asyncio.run(main())
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
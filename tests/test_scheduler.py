@@ -0,0 +1,68 @@
+import pytest
+
+from ultimakerpy.const import OverrunPolicy
+from ultimakerpy.scheduler import TickScheduler
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(policy, work):
+    """Run ticks taking `work` seconds each; return their start times."""
+    clock = FakeClock()
+    scheduler = TickScheduler(1.0, policy, clock=clock)
+    scheduler.start()
+    starts = []
+    for seconds in work:
+        starts.append(clock.now - 100.0)
+        clock.now += seconds
+        clock.now += scheduler.advance()
+    return starts, scheduler
+
+
+def test_no_drift():
+    starts, scheduler = run(OverrunPolicy.STRETCH, [0.3] * 1000)
+    assert starts[-1] == pytest.approx(999.0)
+    assert scheduler.overruns == 0 and scheduler.missed == 0
+
+
+def test_skip():
+    starts, scheduler = run(OverrunPolicy.SKIP, [0.5, 2.5, 0.5, 0.5])
+    print(starts)
+    assert starts == [0.0, 1.0, 4.0, 5.0]
+    assert scheduler.overruns == 1 and scheduler.missed == 2
+    assert scheduler.max_lateness == pytest.approx(1.5)
+
+
+def test_catch_up():
+    starts, scheduler = run(OverrunPolicy.CATCH_UP, [0.5, 2.5, 0.2, 0.2,
+                                                    0.2, 0.2])
+    print(starts)
+    assert starts == pytest.approx([0.0, 1.0, 3.5, 3.7, 4.0, 5.0])
+    assert scheduler.overruns == 2 and scheduler.missed == 0
+
+
+def test_stretch():
+    starts, scheduler = run(OverrunPolicy.STRETCH, [0.5, 2.5, 0.5, 0.5])
+    print(starts)
+    assert starts == pytest.approx([0.0, 1.0, 3.5, 4.5])
+    assert scheduler.overruns == 1 and scheduler.missed == 1
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        TickScheduler(1.0, 'wait')
+
+
+if __name__ == '__main__':
+    test_no_drift()
+    test_skip()
+    test_catch_up()
+    test_stretch()
+    test_invalid_policy()
@@ -0,0 +1,180 @@
+import asyncio
+import time
+
+import pytest
+import yaml
+
+from ultimakerpy import Fleet, UMS3, JobState, PrinterStatus
+from ultimakerpy import printer as printer_module
+from ultimakerpy.exceptions import RequestError, ServerError
+from ultimakerpy.mjpeg import MJPEGStream
+from ultimakerpy.simulator import Simulator, start_fleet
+
+
+@pytest.fixture
+def sims(tmp_path, monkeypatch):
+    sims = start_fleet(3, username='user', password='pass', layer_time=0.3,
+                       pre_print_time=0.3, num_layers=10, seed=0)
+    config = {'sim{}'.format(i): sim.config_entry()
+              for i, sim in enumerate(sims)}
+    config['wrong'] = dict(config['sim0'], password='wrong')
+    path = tmp_path / 'config.yaml'
+    path.write_text(yaml.safe_dump(config))
+    monkeypatch.setattr(printer_module, 'CONFIG', str(path))
+    yield sims
+    for sim in sims:
+        sim.stop()
+
+
+def test_sim_printer(sims):
+    print('test_sim_printer')
+    printer = UMS3('sim0')
+    assert printer.is_accessible()
+    assert not UMS3('wrong').is_accessible()
+    assert printer.status() == PrinterStatus.IDLE
+    assert printer.job_state() == JobState.NONE
+
+    printer.main_nozzle.heat_to(200)
+    printer.head.move_to(10.0, 20.0)
+    with printer.batch_mode():
+        target = printer.main_nozzle.target_temperature()
+        pos = printer.head.position()
+    assert target.get() == 200
+    assert (pos[0].get(), pos[1].get()) == (10.0, 20.0)
+    t1 = printer.main_nozzle.temperature()
+    time.sleep(0.5)
+    assert printer.main_nozzle.temperature() > t1
+
+    with pytest.raises(RequestError):
+        UMS3('wrong').main_nozzle.heat_to(100)
+
+
+def test_sim_batch_threads(sims, tmp_path):
+    print('test_sim_batch_threads')
+    printer = UMS3('sim0')
+    printer.logging_interval = 0.05
+    targets = {'nozzle_temp': printer.main_nozzle.temperature}
+    with printer.data_logger(str(tmp_path / 'log.csv'), targets) as dl:
+        dl.wait_for_sample(1, timeout=5.0)
+        for temp in range(100, 120):
+            # Sent at once, not queued into the batch of the logger.
+            printer.main_nozzle.heat_to(temp)
+            assert printer.main_nozzle.target_temperature() == temp
+
+    with pytest.raises(ZeroDivisionError):
+        with printer.batch_mode():
+            printer.main_nozzle.heat_to(150)
+            1 / 0
+    assert printer.main_nozzle.target_temperature() == 119
+
+    client = printer._client
+    with client.batch_mode():
+        with client.ordered():
+            printer.main_nozzle.heat_to(160)
+            with client.ordered():
+                printer.main_nozzle.heat_to(170)
+            printer.main_nozzle.heat_to(180)
+    assert printer.main_nozzle.target_temperature() == 180
+
+
+def test_sim_print_job(sims, tmp_path):
+    print('test_sim_print_job')
+    gcode = tmp_path / 'model.gcode'
+    gcode.write_text('G1 X10 Y10 E1\n' * 1000)
+    printer = UMS3('sim1')
+    progress = []
+    printer.print(str(gcode), progress=lambda sent, total: progress.append(
+        sent / total))
+    assert progress[-1] == 1.0
+    assert printer.status() == PrinterStatus.PRINTING
+
+    targets = {'job_state': printer.job_state, 'bed_pos': printer.bed.position}
+    with printer.data_logger(str(tmp_path / 'sim.csv'), targets,
+                             {'job_state': 0.05, 'bed_pos': 0.05}) as dl:
+        dl.get_timer().wait_for_datalog(
+            'job_state', lambda state: state == JobState.PRINTING)
+        tracker = dl.track_layers(layer_height=0.2)
+        dl.get_timer().wait_for_layer(3)
+        printer.pause()
+        assert printer.job_state() == 'paused'
+        printer.abort()
+    print(tracker.events)
+    assert [e.layer for e in tracker.events][-2:] == [2, 3]
+    assert printer.status() == PrinterStatus.IDLE
+
+
+def test_sim_faults():
+    print('test_sim_faults')
+    from ultimakerpy.client import UMClient
+    with Simulator(latency=0.05, jitter=0.01, error_rate=1.0,
+                   camera_port=None) as sim:
+        client = UMClient(timeout=5)
+        url = 'http://{}/api/v1/printer/status'.format(sim.address)
+        t1 = time.perf_counter()
+        with pytest.raises(RequestError):
+            client.get(url)
+        assert time.perf_counter() - t1 >= 0.02
+        sim.error_rate = 0.0
+        assert client.get(url) == PrinterStatus.IDLE
+
+
+def test_sim_limits(monkeypatch):
+    print('test_sim_limits')
+    import requests
+    from ultimakerpy import simulator
+    monkeypatch.setattr(simulator, 'MAX_NONCES', 4)
+    with Simulator(username='user', password='pass',
+                   camera_port=None) as sim:
+        url = 'http://{}/api/v1/printer/led'.format(sim.address)
+        for _ in range(10):
+            assert requests.put(url, json={}).status_code == 401
+        assert len(sim._nonces) == 4
+        # A job ended by another request while the body was read.
+        assert sim._set_job_state({'target': 'pause'}).status == 404
+
+
+def test_sim_camera(sims):
+    print('test_sim_camera')
+    with MJPEGStream(sims[0].camera_url) as stream:
+        frames = []
+        for frame in stream.frames(timeout=2.0):
+            frames.append(frame)
+            if len(frames) == 3:
+                break
+    assert frames[0].data.startswith(b'\xff\xd8')
+
+    stream = UMS3('sim0').peripherals.mjpeg_stream()
+    try:
+        frame = next(stream.frames(timeout=2.0))
+    finally:
+        stream.stop()
+    assert frame.data.startswith(b'\xff\xd8')
+
+
+def test_sim_fleet(sims, tmp_path):
+    print('test_sim_fleet')
+
+    def targets(printer):
+        return {'status': printer.status,
+                'nozzle_temp': printer.main_nozzle.temperature}
+
+    async def run():
+        async with Fleet(['sim0', 'sim1', 'sim2'],
+                         logging_interval=0.1) as fleet:
+            samples = await fleet.sample(targets)
+            await fleet.log(str(output), targets, duration=0.5)
+            return samples, fleet.errors
+
+    output = tmp_path / 'fleet.csv'
+    sims[2].error_rate = 1.0
+    samples, errors = asyncio.run(run())
+    # A failing printer does not stop the others.
+    assert set(errors) == {'sim2'} and isinstance(errors['sim2'], ServerError)
+    assert set(samples) == {'sim0', 'sim1'}
+    rows = [row.split(',') for row in output.read_text().splitlines()]
+    assert rows[0] == ['printer', 'timestamp', 'status', 'nozzle_temp']
+    assert {row[0] for row in rows[1:]} == {'sim0', 'sim1'}
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,98 @@
+import csv
+import time
+import zipfile
+
+import pytest
+
+from ultimakerpy.client import UMClient
+from ultimakerpy.datalog import DataLogger
+from ultimakerpy.mjpeg import JpegFrame
+from ultimakerpy.timelapse import LayerTimelapse
+
+
+class FakeStream:
+
+    def __init__(self):
+        self.count = 0
+
+    def latest_frame(self):
+        return None
+
+    def frames(self, timeout=None):
+        while True:
+            time.sleep(0.01)
+            self.count += 1
+            yield JpegFrame(time.time(), b'jpeg%d' % self.count)
+
+
+class FakeHead:
+
+    def __init__(self):
+        self.moves = []
+
+    def position(self):
+        return (10.0, 20.0)
+
+    def move_to(self, x_value=None, y_value=None):
+        self.moves.append((x_value, y_value))
+
+
+def _logger(tmp_path):
+    client = UMClient()
+    logger = DataLogger(client, str(tmp_path / 'test_timelapse.csv'),
+                        logging_interval=0.05)
+    positions = iter([0.0, 0.0, 0.1, 0.2, 0.2, 0.19, 0.4, 0.4, 0.6, 0.6])
+    last = [0.0]
+
+    def bed_pos():
+        last[0] = next(positions, last[0])
+        return last[0]
+
+    logger.register({'bed_pos': bed_pos})
+    return logger
+
+
+def test_layer_timelapse(tmp_path):
+    print('test_layer_timelapse')
+    logger = _logger(tmp_path)
+    output = tmp_path / 'timelapse.zip'
+    with logger.loop():
+        tracker = logger.track_layers(layer_height=0.2)
+        with LayerTimelapse(tracker, FakeStream(), str(output)):
+            time.sleep(1.0)
+    with zipfile.ZipFile(output) as zf:
+        names = zf.namelist()
+    with open(tmp_path / 'timelapse.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    print(names, rows)
+    assert names == ['layer_00001.jpg', 'layer_00002.jpg', 'layer_00003.jpg']
+    assert [row['layer'] for row in rows] == ['1', '2', '3']
+    assert all(float(row['frame_timestamp']) >= float(row['timestamp'])
+               for row in rows)
+
+    # An existing archive is not appended to.
+    timelapse = LayerTimelapse(tracker, FakeStream(), str(output))
+    with pytest.raises(FileExistsError):
+        timelapse.start()
+
+
+def test_timelapse_park(tmp_path):
+    print('test_timelapse_park')
+    logger = _logger(tmp_path)
+    head = FakeHead()
+    output = tmp_path / 'timelapse.zip'
+    with logger.loop():
+        tracker = logger.track_layers(layer_height=0.2)
+        with LayerTimelapse(tracker, FakeStream(), str(output), head=head,
+                            park_position=(200, 200)):
+            time.sleep(1.0)
+    print(head.moves)
+    # The head goes back to where it was after each frame.
+    assert head.moves == [(200, 200), (10.0, 20.0)] * 3
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    test_layer_timelapse(pathlib.Path(tempfile.mkdtemp()))
+    test_timelapse_park(pathlib.Path(tempfile.mkdtemp()))
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+import requests
+import yaml
+
+from ultimakerpy import UMS3
+from ultimakerpy import printer as printer_module
+from ultimakerpy.async_client import AsyncUMClient
+from ultimakerpy.client import UMClient
+from ultimakerpy.exceptions import RequestError
+from ultimakerpy.simulator import Simulator
+
+
+@pytest.fixture
+def sim(tmp_path, monkeypatch):
+    sim = Simulator(latency=0.05, seed=0)
+    sim.start()
+    path = tmp_path / 'config.yaml'
+    path.write_text(yaml.safe_dump({'sim': sim.config_entry()}))
+    monkeypatch.setattr(printer_module, 'CONFIG', str(path))
+    yield sim
+    sim.stop()
+
+
+def record(client):
+    events = []
+    for name in ('before_send', 'after_receive', 'on_error'):
+        client.add_hook(name, lambda trace, name=name: events.append(
+            (name, trace)))
+    return events
+
+
+def test_realtime_trace(sim):
+    client = UMClient(timeout=1.0, labels={
+        'http://{}/api/v1/printer/status'.format(sim.address): 'sys/status'})
+    events = record(client)
+    url = 'http://{}/api/v1/printer/status'.format(sim.address)
+    client.get(url)
+    client.get(url)
+    with pytest.raises(RequestError):
+        client.get(url + '/missing')
+    with pytest.raises(ValueError):
+        client.add_hook('after_send', print)
+
+    print(events)
+    assert [name for name, _ in events] == [
+        'before_send', 'after_receive', 'before_send', 'after_receive',
+        'before_send', 'on_error']
+    first, second = events[1][1], events[3][1]
+    assert first.endpoint == 'sys/status' and first.status == 200
+    assert first.batch_id is None and first.tick is None
+    assert first.connect > 0 and second.connect == 0
+    assert second.wait >= 0.05
+    assert second.duration >= second.wait + second.transfer + second.parse
+    assert events[5][1].status == 404
+    assert isinstance(events[5][1].error, RequestError)
+
+
+def test_batch_trace(sim):
+    client = UMClient(timeout=1.0)
+    events = record(client)
+    base = 'http://{}/api/v1/printer'.format(sim.address)
+    with client.batch_mode(tick=7):
+        client.get(base + '/status')
+        time.sleep(0.05)
+        client.get(base + '/bed/temperature')
+    with client.batch_mode():
+        client.get(base + '/status')
+    traces = [trace for name, trace in events if name == 'after_receive']
+    print(traces)
+    assert len(traces) == 3
+    assert {t.batch_id for t in traces[:2]} == {1}
+    assert {t.tick for t in traces[:2]} == {7}
+    assert traces[2].batch_id == 2 and traces[2].tick is None
+    status = next(t for t in traces[:2] if t.endpoint.endswith('status'))
+    assert status.queue >= 0.05
+    assert status.connect is not None and status.wait >= 0.05
+
+    with pytest.raises(requests.ConnectionError):
+        client.get('http://127.0.0.1:1/')
+    assert events[-1][0] == 'on_error'
+
+
+def test_async_trace(sim):
+    async def main():
+        client = AsyncUMClient(timeout=1.0)
+        events = record(client)
+        url = 'http://{}/api/v1/printer/status'.format(sim.address)
+        await asyncio.gather(client.get(url), client.get(url))
+        await client.close()
+        return events
+
+    events = asyncio.run(main())
+    traces = [trace for name, trace in events if name == 'after_receive']
+    assert len(traces) == 2
+    assert all(t.connect is not None and t.wait >= 0.05 for t in traces)
+
+
+def test_tick_trace(sim, tmp_path):
+    printer = UMS3('sim')
+    requests_by_tick = {}
+    ticks = []
+    printer.add_request_hook('after_receive', lambda trace:
+                             requests_by_tick.setdefault(trace.tick, [])
+                             .append(trace))
+    targets = {'bed_pos': printer.bed.position,
+               'nozzle_temp': printer.main_nozzle.temperature}
+    printer.logging_interval = 0.2
+    with printer.data_logger(str(tmp_path / 'log.csv'), targets) as dl:
+        dl.add_tick_hook(ticks.append)
+        dl.wait_for_sample(2, timeout=5.0)
+    print(ticks)
+    for trace in ticks[1:]:
+        assert len(requests_by_tick[trace.tick]) == 2
+        slowest = max(t.duration for t in requests_by_tick[trace.tick])
+        assert trace.requests >= slowest >= 0.05
+        assert trace.duration < 0.2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,85 @@
+import os
+import time
+import zipfile
+
+from ultimakerpy.ufp import UFP_GCODE_PATH, cached_ufp, pack_ufp
+
+GCODE = b''';START_OF_HEADER
+;FLAVOR:Griffin
+;PRINT.TIME:100
+;END_OF_HEADER
+;Generated with Cura
+M104 S200 ; set temperature
+;LAYER_COUNT:2
+;LAYER:0
+G1 X10 Y10 E1
+;TYPE:WALL-OUTER
+;LAYER:1
+G1 X20 Y20 E2
+'''
+
+
+def test_pack_ufp(tmp_path):
+    print('test_pack_ufp')
+    gcode = tmp_path / 'model.gcode'
+    gcode.write_bytes(GCODE * 1000)
+    ufp = tmp_path / 'model.ufp'
+    pack_ufp(str(gcode), str(ufp))
+    with zipfile.ZipFile(ufp) as zf:
+        assert '[Content_Types].xml' in zf.namelist()
+        assert '_rels/.rels' in zf.namelist()
+        assert zf.read(UFP_GCODE_PATH) == GCODE * 1000
+    print(gcode.stat().st_size, '->', ufp.stat().st_size)
+    assert ufp.stat().st_size * 5 < gcode.stat().st_size
+
+    pack_ufp(str(gcode), str(ufp), strip=True)
+    with zipfile.ZipFile(ufp) as zf:
+        lines = zf.read(UFP_GCODE_PATH).splitlines()[:10]
+    assert lines == [b';START_OF_HEADER', b';FLAVOR:Griffin',
+                     b';PRINT.TIME:100', b';END_OF_HEADER', b'M104 S200',
+                     b';LAYER_COUNT:2', b';LAYER:0', b'G1 X10 Y10 E1',
+                     b';LAYER:1', b'G1 X20 Y20 E2']
+
+
+def test_cached_ufp(tmp_path):
+    print('test_cached_ufp')
+    gcode = tmp_path / 'model.gcode'
+    gcode.write_bytes(GCODE)
+    cache_dir = str(tmp_path / 'cache')
+    path = cached_ufp(str(gcode), cache_dir=cache_dir)
+    mtime = (tmp_path / 'cache' / path).stat().st_mtime_ns
+    assert cached_ufp(str(gcode), cache_dir=cache_dir) == path
+    assert (tmp_path / 'cache' / path).stat().st_mtime_ns == mtime
+    assert cached_ufp(str(gcode), strip=True, cache_dir=cache_dir) != path
+
+
+def test_ufp_cache_eviction(tmp_path):
+    print('test_ufp_cache_eviction')
+    cache_dir = tmp_path / 'cache'
+    gcode = tmp_path / 'model.gcode'
+    gcode.write_bytes(GCODE)
+    old = cached_ufp(str(gcode), cache_dir=str(cache_dir))
+    # An edited file replaces the entry of its previous content.
+    gcode.write_bytes(GCODE + b'G1 X0\n')
+    new = cached_ufp(str(gcode), cache_dir=str(cache_dir))
+    assert not os.path.exists(old) and os.path.exists(new)
+
+    size = os.path.getsize(new)
+    paths = []
+    for i in range(3):
+        other = tmp_path / 'other{}.gcode'.format(i)
+        other.write_bytes(GCODE + b'; %d\n' % i)
+        paths.append(cached_ufp(str(other), cache_dir=str(cache_dir),
+                                max_bytes=int(size * 2.5)))
+        time.sleep(0.01)
+    print(sorted(os.listdir(cache_dir)))
+    assert [os.path.exists(p) for p in paths] == [False, True, True]
+    assert not os.path.exists(new)
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    test_pack_ufp(pathlib.Path(tempfile.mkdtemp()))
+    test_cached_ufp(pathlib.Path(tempfile.mkdtemp()))
+    test_ufp_cache_eviction(pathlib.Path(tempfile.mkdtemp()))
@@ -0,0 +1,35 @@
+import io
+import os
+
+from ultimakerpy.upload import MultipartUpload
+
+
+def test_multipart_upload():
+    print('test_multipart_upload')
+    content = os.urandom(300000)
+    progress = []
+    body = MultipartUpload(io.BytesIO(content), fields={'job_name': 'job'},
+                           filename='test.gcode', chunk_size=4096,
+                           progress=lambda sent, total: progress.append(sent))
+    data = b''.join(body)
+    assert len(data) == len(body)
+    assert progress[-1] == len(body)
+    assert max(b - a for a, b in zip([0] + progress, progress)) <= 4096
+
+    boundary = body.boundary.encode()
+    assert body.content_type.endswith(body.boundary)
+    parts = data.split(b'--' + boundary)
+    assert parts[0] == b'' and parts[-1] == b'--\r\n'
+    assert parts[1] == (b'\r\nContent-Disposition: form-data; name="job_name"'
+                        b'\r\n\r\njob\r\n')
+    head, file_data = parts[2].split(b'\r\n\r\n', 1)
+    assert b'filename="test.gcode"' in head
+    assert file_data == content + b'\r\n'
+
+    body.seek(0)
+    chunk = body.read()
+    assert chunk and data.startswith(chunk)
+
+
+if __name__ == '__main__':
+    test_multipart_upload()
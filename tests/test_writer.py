@@ -0,0 +1,105 @@
+import csv
+import gzip
+
+import pytest
+
+from ultimakerpy.writer import (BackgroundWriter, BinaryWriter, CsvWriter,
+                                open_writer, read_binary)
+
+COLUMNS = ['timestamp', 'status', 'head_pos', 'bed_temp']
+ROWS = [[1.5 + i, 'printing', (10.0, 20.0 + i), i] for i in range(250)]
+
+
+def _write(writer):
+    bg = BackgroundWriter(writer, batch_size=64, flush_interval=0.1)
+    bg.start(COLUMNS)
+    for row in ROWS:
+        bg.write(row)
+    bg.close()
+
+
+def test_csv_gz_writer(tmp_path):
+    path = str(tmp_path / 'test.csv.gz')
+    writer = open_writer(path)
+    assert isinstance(writer, CsvWriter)
+    _write(writer)
+    with gzip.open(path, 'rt', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == COLUMNS
+    assert len(rows) == len(ROWS) + 1
+
+
+def test_binary_writer(tmp_path):
+    path = str(tmp_path / 'test.umlog')
+    writer = open_writer(path)
+    assert isinstance(writer, BinaryWriter)
+    _write(writer)
+    _write(open_writer(path))
+    rows = list(read_binary(path))
+    assert len(rows) == 2 * len(ROWS)
+    assert rows[0][0] == COLUMNS
+    assert rows[3][1] == [4.5, 'printing', [10.0, 23.0], 3]
+
+
+def test_parquet_writer(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'test.parquet')
+    _write(open_writer(path))
+    table = pq.read_table(path)
+    assert table.column_names == COLUMNS
+    assert table.num_rows == len(ROWS)
+
+
+def test_parquet_types(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = str(tmp_path / 'types.parquet')
+    writer = open_writer(path)
+    writer.max_pending = 3
+    writer.open(['n', 'pos', 'state', 'empty'])
+    writer.write_rows([[None, None, None, None], [1, (1, 2), 'idle', None]])
+    writer.write_rows([[2.5, [3.0, 4.5], 'printing', None]])
+    writer.write_rows([[None, None, None, 7]])
+    # A failed read leaves '' in place of a number.
+    writer.write_rows([['', 'x', 'idle', 8], [3, ['', 5], 'idle', None]])
+    writer.close()
+    table = pq.read_table(path).to_pydict()
+    print(table)
+    assert table['n'] == [None, 1.0, 2.5, None, None, 3.0]
+    assert table['pos'][1:3] == [[1.0, 2.0], [3.0, 4.5]]
+    assert table['pos'][4:] == [None, [None, 5.0]]
+    assert table['empty'] == [None, None, None, '7', '8', None]
+
+
+class FailingWriter:
+
+    def open(self, columns):
+        pass
+
+    def write_rows(self, rows):
+        raise OSError('disk full')
+
+    def close(self):
+        pass
+
+
+def test_write_error():
+    bg = BackgroundWriter(FailingWriter(), batch_size=1, flush_interval=0.01)
+    bg.start(COLUMNS)
+    with pytest.warns(RuntimeWarning):
+        bg.write(ROWS[0])
+        bg._thread.join(0.2)
+    assert isinstance(bg.error, OSError)
+    bg.write(ROWS[1])
+    with pytest.raises(OSError):
+        bg.close()
+
+
+if __name__ == '__main__':
+    import pathlib
+    import tempfile
+    with tempfile.TemporaryDirectory() as d:
+        test_csv_gz_writer(pathlib.Path(d))
+        test_binary_writer(pathlib.Path(d))
+        test_parquet_writer(pathlib.Path(d))
+        test_parquet_types(pathlib.Path(d))
+    test_write_error()
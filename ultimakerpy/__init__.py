@@ -1,2 +1,4 @@
+from .async_printer import AsyncUMS3
 from .const import JobState, PrinterStatus
+from .fleet import Fleet
 from .printer import UMS3
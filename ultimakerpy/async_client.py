@@ -0,0 +1,160 @@
+import asyncio
+import json
+import time
+from typing import Any, Callable, Dict, Optional
+
+import aiohttp
+import aiohttp.payload
+
+from .client import _parse_async_response, _read_traced
+from .metrics import RequestMetrics
+from .resilience import CircuitBreaker, RetryPolicy, call_async
+from .tracing import RequestTrace, Tracer, trace_config
+from .upload import MultipartUpload
+
+
+class AsyncUMClient:
+
+    def __init__(
+            self, timeout: Optional[float] = None,
+            username: Optional[str] = None,
+            password: Optional[str] = None,
+            session: Optional['aiohttp.ClientSession'] = None,
+            limiter: Optional['asyncio.Semaphore'] = None,
+            metrics: Optional['RequestMetrics'] = None,
+            printer: Optional[str] = None,
+            labels: Optional[Dict[str, str]] = None,
+            retry: Optional['RetryPolicy'] = None,
+            breaker: Optional['CircuitBreaker'] = None) -> None:
+        """See `UMClient` for `retry` and `breaker`.
+
+        An open breaker fails requests before they wait for `limiter`, so
+        a dead printer does not hold slots shared with other printers.
+        """
+        self.timeout = aiohttp.ClientTimeout(timeout)
+        self._middlewares = ()
+        if username is not None and password is not None:
+            self._middlewares = (
+                aiohttp.DigestAuthMiddleware(username, password),)
+        self._session = session
+        self._owns_session = session is None
+        self._limiter = limiter
+        self.tracer = Tracer(metrics=metrics, printer=printer, labels=labels)
+        self.retry = retry or RetryPolicy(attempts=1)
+        self.breaker = breaker
+
+    @property
+    def metrics(self) -> Optional['RequestMetrics']:
+        return self.tracer.metrics
+
+    def add_hook(
+            self, name: str, func: Callable[['RequestTrace'], Any]) -> None:
+        """Call `func(trace)` on 'before_send', 'after_receive' or
+        'on_error' of every request.
+
+        Connection times are only measured on sessions created with
+        `tracing.trace_config()`, as the ones this client and `Fleet`
+        create are.
+        """
+        self.tracer.add_hook(name, func)
+
+    async def get(
+            self, url: str, headers: Optional[Dict[str, str]] = None) -> Any:
+        return await self._request('GET', url, headers=headers)
+
+    async def put(
+            self, url: str, data: Optional[Any] = None,
+            headers: Optional[Dict[str, str]] = None) -> Any:
+        if data is not None: data = json.dumps(data)
+        return await self._request('PUT', url, data=data, headers=headers)
+
+    async def post(
+            self, url: str, data: Optional[Any] = None,
+            files: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None) -> Any:
+        if data is not None: data = json.dumps(data)
+        if files is not None:
+            data = aiohttp.FormData()
+            for name, value in files.items():
+                data.add_field(name, value)
+        return await self._request('POST', url, data=data, headers=headers)
+
+    async def upload(self, url: str, body: 'MultipartUpload') -> Any:
+        """POST a streamed multipart body.
+
+        The file is read chunk by chunk in a worker thread. The request
+        timeout applies to each chunk rather than the whole transfer: the
+        upload fails with `asyncio.TimeoutError` only once no progress is
+        made for that long.
+        """
+        stall = self.timeout.total
+        timeout = aiohttp.ClientTimeout(sock_connect=stall, sock_read=stall)
+        payload = _UploadPayload(body, content_type=body.content_type)
+        task = asyncio.ensure_future(
+            self._request('POST', url, data=payload, timeout=timeout))
+        sent = -1
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=stall)
+            if done:
+                return task.result()
+            if body.tell() == sent and sent < len(body):
+                task.cancel()
+                raise asyncio.TimeoutError(
+                    'upload stalled for {} seconds'.format(stall))
+            sent = body.tell()
+
+    async def close(self) -> None:
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _request(self, method, url, **kwargs):
+        queued_at = time.perf_counter() if self.tracer.active else None
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                trace_configs=[trace_config()])
+        if self._middlewares:
+            kwargs['middlewares'] = self._middlewares
+
+        async def send():
+            if self._limiter is None:
+                return await self._send(method, url, queued_at, **kwargs)
+            async with self._limiter:
+                return await self._send(method, url, queued_at, **kwargs)
+
+        return await call_async(send, method, self.retry, self.breaker)
+
+    async def _send(self, method, url, queued_at=None, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        tracer = self.tracer
+        if not tracer.active:
+            async with self._session.request(method, url, **kwargs) as resp:
+                return await _parse_async_response(resp)
+
+        trace = tracer.trace(method, url, kwargs.get('data'),
+                             queued_at=queued_at)
+        tracer.before_send(trace)
+        try:
+            async with self._session.request(
+                    method, url, trace_request_ctx=trace, **kwargs) as resp:
+                trace.status = resp.status
+                value = await _read_traced(resp, trace)
+        except BaseException as e:
+            tracer.on_error(trace, e)
+            raise
+        tracer.after_receive(trace)
+        return value
+
+
+class _UploadPayload(aiohttp.payload.IOBasePayload):
+    """Lets aiohttp stream, size and rewind a `MultipartUpload`."""
+
+    @property
+    def size(self) -> int:
+        if self._start_position is None:
+            self._start_position = self._value.tell()
+        return len(self._value) - self._start_position
+
+    def _close(self) -> None:
+        # The caller opened the file, so it is left for the caller to close.
+        self._consumed = True
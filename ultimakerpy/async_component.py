@@ -0,0 +1,340 @@
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+
+from .async_client import AsyncUMClient
+from .camera import FrameGrabber
+from .component import (_camera_streaming, _frame_grabber, _mjpeg_stream,
+                        _validate_choice, _validate_range)
+from .const import Ctype
+from .mjpeg import MJPEGStream
+from .upload import MultipartUpload
+
+
+class AsyncSystem:
+
+    def __init__(
+            self, client: 'AsyncUMClient', url: Dict, lim: Dict) -> None:
+        self._client = client
+        self._url = url
+        self._lim = lim
+
+    async def start_job(
+            self, fileobj: BinaryIO,
+            progress: Optional[Callable[[int, int], None]] = None,
+            filename: Optional[str] = None) -> None:
+        body = MultipartUpload(fileobj,
+                               fields={'job_name': format(datetime.now())},
+                               filename=filename, progress=progress)
+        await self._client.upload(self._url['job'], body)
+
+    async def set_job_state(self, value: str) -> None:
+        _validate_choice(value, self._lim['state'])
+        await self._client.put(self._url['state'], {'target': value},
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def printer_status(self) -> str:
+        return await self._client.get(self._url['status'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def job_state(self) -> str:
+        return await self._client.get(self._url['state'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def verify(self) -> Dict[str, str]:
+        return await self._client.get(self._url['verify'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+
+class AsyncPeripherals:
+
+    def __init__(
+            self, client: 'AsyncUMClient', url: Dict, lim: Dict) -> None:
+        self._client = client
+        self._url = url
+        self._lim = lim
+
+    def camera_streaming(
+            self, name: str = 'Internal Camera') -> 'subprocess.Popen':
+        return _camera_streaming(self._url['cam_stream'], name)
+
+    def frame_grabber(self, capacity: int = 30) -> 'FrameGrabber':
+        """Start grabbing camera frames; the caller stops the grabber."""
+        return _frame_grabber(self._url['cam_stream'], capacity)
+
+    def mjpeg_stream(self, capacity: int = 10) -> 'MJPEGStream':
+        """Start reading the camera stream; the caller stops it."""
+        return _mjpeg_stream(self._url['cam_stream'], capacity)
+
+    async def ambient_temperature(self) -> float:
+        return await self._client.get(self._url['amb_temp'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+
+class AsyncBed:
+
+    def __init__(
+            self, client: 'AsyncUMClient', url: Dict, lim: Dict) -> None:
+        self._client = client
+        self._url = url
+        self._lim = lim
+
+    async def heat_to(self, value: float) -> None:
+        _validate_range(value, *self._lim['tgt_temp'])
+        await self._client.put(self._url['tgt_temp'], value,
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def preheat_to(
+            self, value: float, timeout: Optional[float] = None) -> None:
+        _validate_range(value, *self._lim['pre_temp'])
+        await self._client.put(self._url['pre_temp'],
+                               {'temperature': value, 'timeout': timeout},
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def move_to(self, value: float) -> None:
+        _validate_range(value, *self._lim['pos_z'])
+        await self._client.put(self._url['pos'], {'z': value},
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def limit_speed_to(self, value: float) -> None:
+        _validate_range(value, *self._lim['speed_z'])
+        await self._client.put(self._url['speed'], {'z': value},
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def set_jerk_to(self, value: float) -> None:
+        _validate_range(value, *self._lim['jerk_z'])
+        await self._client.put(self._url['jerk'], {'z': value},
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def heat_by(self, value: float) -> None:
+        new = await self.target_temperature() + value
+        await self.heat_to(value=new)
+
+    async def move_by(self, value: float) -> None:
+        new = await self.position() + value
+        await self.move_to(value=new)
+
+    async def temperature(self) -> float:
+        return await self._client.get(self._url['cur_temp'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def target_temperature(self) -> float:
+        return await self._client.get(self._url['tgt_temp'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def preheat_temperature(self) -> float:
+        return await self._client.get(self._url['pre_temp'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def position(self) -> float:
+        return await self._client.get(self._url['pos_z'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+
+class AsyncHead:
+
+    def __init__(
+            self, client: 'AsyncUMClient', url: Dict, lim: Dict) -> None:
+        self._client = client
+        self._url = url
+        self._lim = lim
+
+    async def move_to(
+            self,
+            x_value: Optional[float] = None,
+            y_value: Optional[float] = None) -> None:
+        if x_value is not None:
+            _validate_range(x_value, *self._lim['pos_x'])
+        if y_value is not None:
+            _validate_range(y_value, *self._lim['pos_y'])
+        await self._client.put(self._url['pos'], {'x': x_value, 'y': y_value},
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def limit_speed_to(
+            self,
+            x_value: Optional[float] = None,
+            y_value: Optional[float] = None) -> None:
+        if x_value is not None:
+            _validate_range(x_value, *self._lim['speed_x'])
+        if y_value is not None:
+            _validate_range(y_value, *self._lim['speed_y'])
+        await self._client.put(self._url['speed'],
+                               {'x': x_value, 'y': y_value},
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def set_acceleration_to(self, value: float) -> None:
+        _validate_range(value, *self._lim['accel'])
+        await self._client.put(self._url['accel'], value,
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def set_jerk_to(
+            self,
+            x_value: Optional[float] = None,
+            y_value: Optional[float] = None) -> None:
+        if x_value is not None:
+            _validate_range(x_value, *self._lim['jerk_x'])
+        if y_value is not None:
+            _validate_range(y_value, *self._lim['jerk_y'])
+        await self._client.put(self._url['jerk'], {'x': x_value, 'y': y_value},
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def move_by(
+            self,
+            x_value: Optional[float] = None,
+            y_value: Optional[float] = None) -> None:
+        x_new, y_new = None, None
+        if x_value is not None:
+            x_new = await self.position_x() + x_value
+        if y_value is not None:
+            y_new = await self.position_y() + y_value
+        await self.move_to(x_value=x_new, y_value=y_new)
+
+    async def position(self) -> Tuple[float, float]:
+        res = await self._client.get(self._url['pos'],
+                                     headers={'Accept': Ctype.APP_JSON})
+        return (res['x'], res['y'])
+
+    async def position_x(self) -> float:
+        return await self._client.get(self._url['pos_x'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def position_y(self) -> float:
+        return await self._client.get(self._url['pos_y'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def max_speed(self) -> Tuple[float, float]:
+        res = await self._client.get(self._url['speed'],
+                                     headers={'Accept': Ctype.APP_JSON})
+        return (res['x'], res['y'])
+
+    async def max_speed_x(self) -> float:
+        return await self._client.get(self._url['speed_x'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def max_speed_y(self) -> float:
+        return await self._client.get(self._url['speed_y'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def accel(self) -> float:
+        return await self._client.get(self._url['accel'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def jerk(self) -> Tuple[float, float]:
+        res = await self._client.get(self._url['jerk'],
+                                     headers={'Accept': Ctype.APP_JSON})
+        return (res['x'], res['y'])
+
+    async def jerk_x(self) -> float:
+        return await self._client.get(self._url['jerk_x'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def jerk_y(self) -> float:
+        return await self._client.get(self._url['jerk_y'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+
+class AsyncFeeder:
+
+    def __init__(
+            self, client: 'AsyncUMClient', url: Dict, lim: Dict) -> None:
+        self._client = client
+        self._url = url
+        self._lim = lim
+
+    async def limit_speed_to(self, value: float) -> None:
+        _validate_range(value, *self._lim['speed'])
+        await self._client.put(self._url['speed'], value,
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def set_acceleration_to(self, value: float) -> None:
+        _validate_range(value, *self._lim['accel'])
+        await self._client.put(self._url['accel'], value,
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def set_jerk_to(self, value: float) -> None:
+        _validate_range(value, *self._lim['jerk'])
+        await self._client.put(self._url['jerk'], value,
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def max_speed(self) -> float:
+        return await self._client.get(self._url['speed'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def acceleration(self) -> float:
+        return await self._client.get(self._url['accel'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def jerk(self) -> float:
+        return await self._client.get(self._url['jerk'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+
+class AsyncNozzle:
+
+    def __init__(
+            self, client: 'AsyncUMClient', url: Dict, lim: Dict) -> None:
+        self._client = client
+        self._url = url
+        self._lim = lim
+
+    async def heat_to(self, value: float) -> None:
+        _validate_range(value, *self._lim['tgt_temp'])
+        await self._client.put(self._url['tgt_temp'], value,
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def heat_by(self, value: float) -> None:
+        new = await self.target_temperature() + value
+        await self.heat_to(value=new)
+
+    async def temperature(self) -> float:
+        return await self._client.get(self._url['cur_temp'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+    async def target_temperature(self) -> float:
+        return await self._client.get(self._url['tgt_temp'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+
+class AsyncLED:
+
+    def __init__(
+            self, client: 'AsyncUMClient', url: Dict, lim: Dict) -> None:
+        self._client = client
+        self._url = url
+        self._lim = lim
+
+    async def set_brightness_to(self, value: float) -> None:
+        _validate_range(value, *self._lim['brightness'])
+        await self._client.put(self._url['brightness'], value,
+                               headers={'Content-Type': Ctype.APP_JSON,
+                                        'Accept': Ctype.APP_JSON})
+
+    async def brightness(self) -> float:
+        return await self._client.get(self._url['brightness'],
+                                      headers={'Accept': Ctype.APP_JSON})
+
+
+class AsyncFan:
+
+    def __init__(
+            self, client: 'AsyncUMClient', url: Dict, lim: Dict) -> None:
+        self._client = client
+        self._url = url
+        self._lim = lim
+
+    async def speed(self) -> float:
+        return await self._client.get(self._url['speed'],
+                                      headers={'Accept': Ctype.APP_JSON})
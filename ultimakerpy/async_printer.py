@@ -0,0 +1,174 @@
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+import warnings
+
+import aiohttp
+
+from .async_client import AsyncUMClient
+from .async_component import (AsyncBed, AsyncFan, AsyncFeeder, AsyncHead,
+                              AsyncLED, AsyncNozzle, AsyncPeripherals,
+                              AsyncSystem)
+from .const import JobState, PrinterStatus
+from .exceptions import PrintJobWarning, RequestError
+from .printer import (_breaker, _job_file, _load_config, _load_endpoints,
+                      _metrics, _retry_policy)
+from .tracing import RequestTrace, endpoint_labels
+
+
+class _AsyncPrinter:
+
+    def __init__(
+            self, machine_type: str, config_key: str,
+            session: Optional['aiohttp.ClientSession'] = None,
+            limiter: Optional['asyncio.Semaphore'] = None) -> None:
+        config = _load_config(config_key)
+        self._config_key = config_key
+
+        username = config.get('username', None)
+        password = config.get('password', None)
+        request_timeout = config.get('request_timeout', 30)
+
+        self._url, self._lim = _load_endpoints(
+            machine_type, config['ip_address'], config.get('camera_url'))
+
+        self._client = AsyncUMClient(
+            timeout=request_timeout, username=username, password=password,
+            session=session, limiter=limiter, metrics=_metrics(config),
+            printer=config_key, labels=endpoint_labels(self._url),
+            retry=_retry_policy(config), breaker=_breaker(config))
+
+        self._system = AsyncSystem(self._client, self._url['system'],
+                                   self._lim['system'])
+
+    async def __aenter__(self) -> '_AsyncPrinter':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        await self._client.close()
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Return the retry, hedge and circuit breaker counters."""
+        stats = self._client.retry.stats()
+        if self._client.breaker is not None:
+            stats['breaker'] = self._client.breaker.stats()
+        return stats
+
+    def add_request_hook(
+            self, name: str, func: Callable[['RequestTrace'], Any]) -> None:
+        """See `AsyncUMClient.add_hook`."""
+        self._client.add_hook(name, func)
+
+    def request_metrics(self) -> List[Dict[str, Any]]:
+        """Return the request counters of this printer, per endpoint."""
+        if self._client.metrics is None:
+            return []
+        return [series for series in self._client.metrics.snapshot()
+                if series['printer'] == self._config_key]
+
+    async def print(
+            self, filepath: str,
+            progress: Optional[Callable[[int, int], None]] = None,
+            compress: bool = False, strip_comments: bool = False) -> None:
+        if await self.status() != PrinterStatus.IDLE:
+            warnings.warn(
+                'The new job is ignored because the printer is still working.',
+                PrintJobWarning, stacklevel=2)
+        else:
+            filepath, filename = await asyncio.to_thread(
+                _job_file, filepath, compress, strip_comments)
+            with open(filepath, 'rb') as f:
+                await self._system.start_job(fileobj=f, progress=progress,
+                                             filename=filename)
+
+    async def pause(self) -> None:
+        await self._system.set_job_state(JobState.PAUSE)
+
+    async def resume(self) -> None:
+        await self._system.set_job_state(JobState.PRINT)
+
+    async def abort(self) -> None:
+        await self._system.set_job_state(JobState.ABORT)
+
+    async def status(self) -> str:
+        return await self._system.printer_status()
+
+    async def job_state(self) -> str:
+        try:
+            return await self._system.job_state()
+        except RequestError:
+            return JobState.NONE
+
+    async def is_accessible(self) -> bool:
+        try:
+            await self._system.verify()
+            return True
+        except RequestError:
+            return False
+
+
+class AsyncUMS3(_AsyncPrinter):
+
+    def __init__(
+            self, name: str,
+            session: Optional['aiohttp.ClientSession'] = None,
+            limiter: Optional['asyncio.Semaphore'] = None) -> None:
+        super().__init__(machine_type='s3', config_key=name, session=session,
+                         limiter=limiter)
+
+        self.__bed = AsyncBed(self._client, self._url['bed'],
+                              self._lim['bed'])
+        self.__fan = AsyncFan(self._client, self._url['fan'],
+                              self._lim['fan'])
+        self.__head = AsyncHead(self._client, self._url['head'],
+                                self._lim['head'])
+        self.__led = AsyncLED(self._client, self._url['led'],
+                              self._lim['led'])
+        self.__main_feeder = AsyncFeeder(self._client, self._url['feeder1'],
+                                         self._lim['feeder1'])
+        self.__main_nozzle = AsyncNozzle(self._client, self._url['nozzle1'],
+                                         self._lim['nozzle1'])
+        self.__sub_feeder = AsyncFeeder(self._client, self._url['feeder2'],
+                                        self._lim['feeder2'])
+        self.__sub_nozzle = AsyncNozzle(self._client, self._url['nozzle2'],
+                                        self._lim['nozzle2'])
+        self.__peripherals = AsyncPeripherals(
+            self._client, self._url['periph'], self._lim['periph'])
+
+    @property
+    def bed(self) -> 'AsyncBed':
+        return self.__bed
+
+    @property
+    def fan(self) -> 'AsyncFan':
+        return self.__fan
+
+    @property
+    def head(self) -> 'AsyncHead':
+        return self.__head
+
+    @property
+    def led(self) -> 'AsyncLED':
+        return self.__led
+
+    @property
+    def main_feeder(self) -> 'AsyncFeeder':
+        return self.__main_feeder
+
+    @property
+    def main_nozzle(self) -> 'AsyncNozzle':
+        return self.__main_nozzle
+
+    @property
+    def sub_feeder(self) -> 'AsyncFeeder':
+        return self.__sub_feeder
+
+    @property
+    def sub_nozzle(self) -> 'AsyncNozzle':
+        return self.__sub_nozzle
+
+    @property
+    def peripherals(self) -> 'AsyncPeripherals':
+        return self.__peripherals
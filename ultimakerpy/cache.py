@@ -0,0 +1,67 @@
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Dict
+
+MISS = object()
+
+
+class ResponseCache:
+    """LRU cache of GET responses with a TTL per URL.
+
+    Only URLs listed in `ttls` are cached. A write to a URL drops the
+    cached entries of that URL, its parents and its children.
+    """
+
+    def __init__(self, ttls: Dict[str, float], maxsize: int = 256) -> None:
+        self._ttls = ttls
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def is_cacheable(self, url: str) -> bool:
+        return self._ttls.get(url, 0) > 0
+
+    def get(self, url: str) -> Any:
+        """Return the cached value of `url`, or `MISS`."""
+        if not self.is_cacheable(url):
+            return MISS
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(url)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, url: str, value: Any) -> None:
+        if not self.is_cacheable(url):
+            return
+        with self._lock:
+            self._entries[url] = (time.monotonic() + self._ttls[url], value)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, url: str) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                if key == url or url.startswith(key + '/') \
+                        or key.startswith(url + '/'):
+                    del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions, 'size': len(self._entries),
+                    'hit_rate': self.hits / requests if requests else 0.0}
@@ -0,0 +1,123 @@
+import threading
+import time
+from typing import Iterator, Optional, Tuple, Union
+
+import numpy as np
+
+Frame = Tuple[float, 'np.ndarray']
+
+
+class FrameGrabber:
+    """Reads a video stream on a background thread into a ring buffer.
+
+    The last `capacity` frames are kept in one preallocated array, and
+    frames are decoded straight into it. `latest_frame` and `frames`
+    return views into the buffer without copying, so a frame is only
+    valid until `capacity - 1` newer frames have been grabbed (the next
+    slot is being decoded into); copy it to keep it longer. Requires
+    OpenCV (`cv2`).
+    """
+
+    def __init__(
+            self, target: Union[str, int], capacity: int = 30,
+            retry_interval: float = 1.0) -> None:
+        try:
+            import cv2
+        except ImportError:
+            raise ImportError('FrameGrabber requires opencv-python')
+        self._cv2 = cv2
+        self.target = target
+        self.capacity = capacity
+        self.retry_interval = retry_interval
+        self._frames = None
+        self._times = np.zeros(capacity, dtype=np.float64)
+        self._count = 0
+        # Index of the first frame in the current buffer.
+        self._first = 0
+        self._updated = threading.Condition()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def __enter__(self) -> 'FrameGrabber':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._updated:
+            self._updated.notify_all()
+
+    @property
+    def frame_count(self) -> int:
+        return self._count
+
+    def latest_frame(self) -> Optional[Frame]:
+        """Return `(timestamp, frame)` of the newest frame, if any."""
+        with self._updated:
+            if self._count == 0:
+                return None
+            return self._get(self._count - 1)
+
+    def frames(self, timeout: Optional[float] = None) -> Iterator[Frame]:
+        """Yield each new frame as `(timestamp, frame)`.
+
+        Frames that were overwritten before the consumer caught up are
+        skipped. Stops when the grabber stops or no frame arrives within
+        `timeout` seconds.
+        """
+        count = self._count
+        while True:
+            with self._updated:
+                if not self._updated.wait_for(
+                        lambda: self._count > count or self._stopped.is_set(),
+                        timeout):
+                    return
+                if self._count <= count:
+                    return
+                # The oldest slot is the one being decoded into.
+                count = max(count, self._count - self.capacity + 1,
+                            self._first)
+                frame = self._get(count)
+            count += 1
+            yield frame
+
+    def _get(self, index):
+        slot = index % self.capacity
+        return float(self._times[slot]), self._frames[slot]
+
+    def _run(self):
+        cap = self._cv2.VideoCapture(self.target)
+        try:
+            while not self._stopped.is_set():
+                slot = self._count % self.capacity
+                buf = None if self._frames is None else self._frames[slot]
+                ok, frame = cap.read(buf)
+                timestamp = time.time()
+                if not ok:
+                    cap.release()
+                    self._stopped.wait(self.retry_interval)
+                    cap = self._cv2.VideoCapture(self.target)
+                    continue
+                with self._updated:
+                    if self._frames is None \
+                            or self._frames.shape[1:] != frame.shape:
+                        self._frames = np.empty(
+                            (self.capacity,) + frame.shape, dtype=frame.dtype)
+                        self._first = self._count
+                    if not np.may_share_memory(frame, self._frames[slot]):
+                        self._frames[slot] = frame
+                    self._times[slot] = timestamp
+                    self._count += 1
+                    self._updated.notify_all()
+        finally:
+            cap.release()
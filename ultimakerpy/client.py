@@ -1,15 +1,29 @@
 import asyncio
 import atexit
+import itertools
 import json
-from typing import Any, Dict, Optional
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 import warnings
 from contextlib import contextmanager
 
 import aiohttp
 import requests
+from requests.adapters import DEFAULT_POOLBLOCK, DEFAULT_POOLSIZE, HTTPAdapter
 from requests.auth import HTTPDigestAuth
+from urllib3 import HTTPConnectionPool
+from urllib3.connection import HTTPConnection
 
-from .exceptions import FutureResultError, RequestError, RequestModeWarning
+from .cache import MISS, ResponseCache
+from .const import SNAPSHOT_PATHS
+from .exceptions import (DeadlineError, FutureResultError, RequestError,
+                         RequestModeWarning, ServerError)
+from .metrics import RequestMetrics
+from .resilience import CircuitBreaker, RetryPolicy, call, call_async
+from .tracing import RequestTrace, Tracer, trace_config
+from .upload import MultipartUpload
 
 
 class UMClient:
@@ -17,83 +31,374 @@ class UMClient:
     def __init__(
             self, timeout: Optional[float] = None,
             username: Optional[str] = None,
-            password: Optional[str] = None) -> None:
-        auth = None
+            password: Optional[str] = None,
+            coalesce: bool = False,
+            pool_connections: int = DEFAULT_POOLSIZE,
+            pool_maxsize: int = DEFAULT_POOLSIZE,
+            cache: Optional['ResponseCache'] = None,
+            metrics: Optional['RequestMetrics'] = None,
+            printer: Optional[str] = None,
+            labels: Optional[Dict[str, str]] = None,
+            retry: Optional['RetryPolicy'] = None,
+            breaker: Optional['CircuitBreaker'] = None) -> None:
+        """Send requests to one printer.
+
+        `retry` sets how failed GETs are retried and, in batch mode,
+        hedged; by default nothing is retried. A timeout raises
+        `RequestTimeoutError`. With `breaker`, requests to a printer that
+        keeps failing raise `CircuitOpenError` until it recovers.
+        """
+        self.tracer = Tracer(metrics=metrics, printer=printer, labels=labels)
+        self.retry = retry or RetryPolicy(attempts=1)
+        self.breaker = breaker
+        auth, bauth = None, None
         if username is not None and password is not None:
             auth = HTTPDigestAuth(username, password)
-        self._rclient = _RealtimeClient(auth=auth, timeout=timeout)
-        self._bclient = _BatchClient(timeout=timeout)
-        self.__is_batch_mode = False
-        self.__future_results = []
+            bauth = aiohttp.DigestAuthMiddleware(username, password)
+        self._rclient = _RealtimeClient(auth=auth, timeout=timeout,
+                                        pool_connections=pool_connections,
+                                        pool_maxsize=pool_maxsize,
+                                        tracer=self.tracer, retry=self.retry,
+                                        breaker=breaker)
+        self._bclient = _BatchClient(auth=bauth, timeout=timeout,
+                                     tracer=self.tracer, retry=self.retry,
+                                     breaker=breaker)
+        self.coalesce = coalesce
+        self.cache = cache
+        # Each thread has its own batch, so requests from other threads
+        # are sent at once while a DataLogger thread is batching.
+        self.__state = _BatchState()
+        self.__group_count = itertools.count(1)
+        self.__batch_count = itertools.count(1)
+        self.__batch_lock = threading.Lock()
+
+    @property
+    def metrics(self) -> Optional['RequestMetrics']:
+        return self.tracer.metrics
+
+    def add_hook(
+            self, name: str, func: Callable[['RequestTrace'], Any]) -> None:
+        """Call `func(trace)` on 'before_send', 'after_receive' or
+        'on_error' of every request, in realtime and batch mode.
+        """
+        self.tracer.add_hook(name, func)
 
     @contextmanager
-    def batch_mode(self) -> None:
+    def batch_mode(
+            self, coalesce: Optional[bool] = None,
+            tick: Optional[int] = None,
+            deadline: Optional[float] = None,
+            return_exceptions: bool = False) -> None:
+        """Defer requests and send them concurrently on exit.
+
+        With `coalesce`, GET URLs sharing a snapshot resource (see
+        `SNAPSHOT_PATHS`) are read from a single GET of that resource.
+        `tick` is passed to the request traces, to tell which sample of
+        a DataLogger sent them.
+
+        A failed request fails its own `FutureResult`, and the first
+        failure is raised on exit once all results are stored; with
+        `return_exceptions`, nothing is raised. With `deadline`, the batch
+        returns after that many seconds at most; requests still running
+        fail with `DeadlineError`. Late GETs are left running and reused
+        by the next batch that asks for the same URL, while other late
+        requests are cancelled.
+
+        Only requests from the thread that entered the block are batched.
+        If the block raises, nothing queued in it is sent.
+        """
+        if coalesce is None:
+            coalesce = self.coalesce
+        state = self.__state
+        if state.active:
+            # A nested block joins the outer batch.
+            yield
+            return
+        batch_id = next(self.__batch_count)
+        state.active = True
+        try:
+            yield
+        except BaseException:
+            state.reset()
+            raise
+        errors = []
+        try:
+            results = self.__batch_request(coalesce, batch_id, tick,
+                                           deadline)
+            errors = [res for res in results if isinstance(res, Exception)]
+            for fut, res in zip(state.future_results, results):
+                if isinstance(res, Exception):
+                    fut.store_error(res)
+                else:
+                    fut.store(res)
+            if self.cache is not None:
+                for (method, url, *_), res in zip(state.requests, results):
+                    if method == 'GET' and not isinstance(res, Exception):
+                        self.cache.put(url, res)
+                for method, url, *_ in state.requests:
+                    if method != 'GET':
+                        self.cache.invalidate(url)
+        finally:
+            state.reset()
+        if errors and not return_exceptions:
+            raise errors[0]
+
+    @contextmanager
+    def ordered(self) -> None:
+        """Send the requests issued inside one after another in batch mode.
+
+        Requests outside of any `ordered` block, and separate blocks, are
+        still sent concurrently with each other. A nested block joins the
+        order of the outer one.
+        """
+        state = self.__state
+        if state.group is not None:
+            yield
+            return
         try:
-            self.__is_batch_mode = True
+            state.group = next(self.__group_count)
             yield
         finally:
-            for fut, res in zip(self.__future_results,
-                                self._bclient.batch_request()):
-                fut.store(res)
-            self.__is_batch_mode = False
-            self.__future_results = []
+            state.group = None
 
     def get(self, url: str, headers: Optional[Dict[str, str]] = None) -> Any:
-        if not self.__is_batch_mode:
-            return self._rclient.get(url, headers=headers)
+        if self.cache is not None:
+            value = self.cache.get(url)
+            if value is not MISS:
+                return self.__cached_result(value)
+        if not self.__state.active:
+            value = self._rclient.get(url, headers=headers)
+            if self.cache is not None:
+                self.cache.put(url, value)
+            return value
         else:
-            self._bclient.register_get(url, headers=headers)
-            return self.__generate_future_result()
+            return self.__register('GET', url, headers=headers)
 
     def put(
             self, url: str, data: Optional[Any] = None,
             files: Optional[Any] = None,
-            headers: Optional[Dict[str, str]] = None) -> None:
-        if self.__is_batch_mode:
-            warnings.warn('batch mode does not currently support put method',
-                          RequestModeWarning, stacklevel=2)
+            headers: Optional[Dict[str, str]] = None) -> Any:
         if data is not None: data = json.dumps(data)
         if files is not None: files = json.dumps(files)
+        if self.cache is not None:
+            self.cache.invalidate(url)
+        if self.__state.active:
+            if files is None:
+                return self.__register('PUT', url, data=data, headers=headers)
+            warnings.warn('batch mode does not support file uploads',
+                          RequestModeWarning, stacklevel=2)
         return self._rclient.put(url, data=data, files=files, headers=headers)
 
     def post(
             self, url: str, data: Optional[Any] = None,
             files: Optional[Any] = None,
-            headers: Optional[Dict[str, str]] = None) -> None:
-        if self.__is_batch_mode:
-            warnings.warn('batch mode does not currently support post method',
-                          RequestModeWarning, stacklevel=2)
+            headers: Optional[Dict[str, str]] = None) -> Any:
         if data is not None: data = json.dumps(data)
+        if self.cache is not None:
+            self.cache.invalidate(url)
+        if self.__state.active:
+            if files is None:
+                return self.__register('POST', url, data=data, headers=headers)
+            warnings.warn('batch mode does not support file uploads',
+                          RequestModeWarning, stacklevel=2)
         return self._rclient.post(url, data=data, files=files, headers=headers)
 
+    def upload(self, url: str, body: 'MultipartUpload') -> Any:
+        """POST a streamed multipart body; always sent immediately.
+
+        The request timeout applies to each chunk sent, not the whole
+        transfer.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(url)
+        if self.__state.active:
+            warnings.warn('batch mode does not support file uploads',
+                          RequestModeWarning, stacklevel=2)
+        return self._rclient.upload(url, body)
+
+    def __register(self, method: str, url: str, **kwargs) -> 'FutureResult':
+        state = self.__state
+        state.requests.append((method, url, kwargs, state.group,
+                               time.perf_counter()))
+        return self.__generate_future_result()
+
+    def __cached_result(self, value: Any) -> Any:
+        if not self.__state.active:
+            return value
+        future_result = FutureResult()
+        future_result.store(value)
+        return future_result
+
     def __generate_future_result(self) -> 'FutureResult':
         future_result = FutureResult()
-        self.__future_results.append(future_result)
+        self.__state.future_results.append(future_result)
         return future_result
 
+    def __batch_request(
+            self, coalesce: bool, batch_id: int, tick: Optional[int],
+            deadline: Optional[float]) -> List[Any]:
+        # The batch client has one event loop, shared by all threads.
+        with self.__batch_lock:
+            registers = {'GET': self._bclient.register_get,
+                         'PUT': self._bclient.register_put,
+                         'POST': self._bclient.register_post}
+            for method, url, kwargs, group, queued_at \
+                    in self.__state.requests:
+                registers[method](url, group=group, queued_at=queued_at,
+                                  **kwargs)
+            return self._bclient.batch_request(
+                coalesce=coalesce, batch_id=batch_id, tick=tick,
+                deadline=deadline, return_exceptions=True)
+
+
+class _BatchState(threading.local):
+    """Requests queued by the thread in `UMClient.batch_mode`."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.active = False
+        self.future_results = []
+        self.requests = []
+        self.group = None
+
+
+def _snapshot_root(url: str) -> Optional[str]:
+    parts = urlsplit(url)
+    if parts.query:
+        return None
+    for path in SNAPSHOT_PATHS:
+        if parts.path.startswith(path + '/'):
+            return '{}://{}{}'.format(parts.scheme, parts.netloc, path)
+    return None
+
+
+def _plan_fetches(
+        urls: List[str], coalesce: bool = False
+        ) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Map each URL to the URL to fetch and the keys leading to its value.
+
+    A URL is answered from the response of its closest requested ancestor
+    (e.g. `/position/x` from `/position`), so duplicate and nested URLs
+    share one request. With `coalesce`, a snapshot resource is added as an
+    ancestor when at least two distinct URLs fall under it.
+    """
+    candidates = set(urls)
+    if coalesce:
+        members = {}
+        for url in candidates:
+            root = _snapshot_root(url)
+            if root is not None:
+                members.setdefault(root, set()).add(url)
+        candidates.update(root for root, children in members.items()
+                          if len(children) >= 2)
+
+    plan = []
+    for url in urls:
+        parts = urlsplit(url)
+        if parts.query:
+            plan.append((url, ()))
+            continue
+        base = '{}://{}'.format(parts.scheme, parts.netloc)
+        segments = parts.path.strip('/').split('/')
+        for i in range(1, len(segments) + 1):
+            ancestor = base + '/' + '/'.join(segments[:i])
+            if ancestor in candidates:
+                plan.append((ancestor, tuple(segments[i:])))
+                break
+        else:
+            plan.append((url, ()))
+    return plan
+
+
+def _extract(value: Any, keys: Tuple[str, ...]) -> Any:
+    for key in keys:
+        try:
+            if isinstance(value, list):
+                value = value[int(key)]
+            else:
+                value = value[key]
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise RequestError(
+                'key {} not found in response'.format('/'.join(keys)))
+    return value
+
 
 class _RealtimeClient:
 
-    def __init__(self, auth=None, timeout=None):
+    def __init__(
+            self, auth=None, timeout=None, pool_connections=DEFAULT_POOLSIZE,
+            pool_maxsize=DEFAULT_POOLSIZE, tracer=None, retry=None,
+            breaker=None):
         self.auth = auth
         self.timeout = timeout
+        self.tracer = tracer or Tracer()
+        self.retry = retry or RetryPolicy(attempts=1)
+        self.breaker = breaker
+        # A session keeps connections alive between commands, and sharing
+        # one digest auth object across it lets later requests answer the
+        # cached nonce up front instead of taking a 401 round trip.
+        self._session = requests.Session()
+        adapter = _TimedAdapter(pool_connections=pool_connections,
+                                pool_maxsize=pool_maxsize,
+                                pool_block=DEFAULT_POOLBLOCK)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        atexit.register(self._session.close)
 
     def get(self, url, headers=None):
-        resp = requests.get(url=url, headers=headers, auth=self.auth,
-                            timeout=self.timeout)
-        return self._parse_response(resp)
+        return self._send('GET', url, headers=headers)
 
     def put(self, url, data=None, files=None, headers=None):
-        resp = requests.put(url=url, data=data, files=files,
-                            headers=headers, auth=self.auth,
-                            timeout=self.timeout)
-        return self._parse_response(resp)
+        return self._send('PUT', url, data=data, files=files,
+                          headers=headers)
 
     def post(self, url, data=None, files=None, headers=None):
-        resp = requests.post(url=url, data=data, files=files,
-                             headers=headers, auth=self.auth,
-                             timeout=self.timeout)
-        return self._parse_response(resp)
+        return self._send('POST', url, data=data, files=files,
+                          headers=headers)
+
+    def upload(self, url, body):
+        # With a stream body, requests applies the timeout to each socket
+        # operation, so a stalled chunk fails without capping the whole
+        # transfer.
+        return self._send('POST', url, data=body,
+                          headers={'Content-Type': body.content_type})
+
+    def _send(self, method, url, **kwargs):
+        return call(lambda: self._send_once(method, url, **kwargs), method,
+                    self.retry, self.breaker)
+
+    def _send_once(self, method, url, **kwargs):
+        tracer = self.tracer
+        if not tracer.active:
+            resp = self._session.request(method, url, auth=self.auth,
+                                         timeout=self.timeout, **kwargs)
+            return self._parse_response(resp)
+
+        trace = tracer.trace(method, url, kwargs.get('data'))
+        tracer.before_send(trace)
+        _connect_time.seconds = None
+        try:
+            # Streaming stops at the headers, so the body is timed apart.
+            resp = self._session.request(method, url, auth=self.auth,
+                                         timeout=self.timeout, stream=True,
+                                         **kwargs)
+            t1 = time.perf_counter()
+            trace.status = resp.status_code
+            if url.startswith('http:'):
+                trace.connect = _connect_time.seconds or 0.0
+            trace.wait = t1 - trace.started_at - (trace.connect or 0.0)
+            trace.bytes_received = len(resp.content)
+            t2 = time.perf_counter()
+            trace.transfer = t2 - t1
+            value = self._parse_response(resp)
+            trace.parse = time.perf_counter() - t2
+        except BaseException as e:
+            tracer.on_error(trace, e)
+            raise
+        tracer.after_receive(trace)
+        return value
 
     def _parse_response(self, resp):
         code = resp.status_code
@@ -101,78 +406,296 @@ class _RealtimeClient:
             respj = resp.json()
         except requests.JSONDecodeError:
             respj = ''
-        if code > 400:
-            raise RequestError('status code {}: {}'.format(code, respj))
+        _check_status(code, respj)
         return respj
 
 
+def _check_status(code: int, respj: Any) -> None:
+    if code >= 500:
+        raise ServerError('status code {}: {}'.format(code, respj))
+    if code > 400:
+        raise RequestError('status code {}: {}'.format(code, respj))
+
+
+# Seconds spent opening connections by the request on this thread.
+_connect_time = threading.local()
+
+
+class _TimedConnection(HTTPConnection):
+
+    def connect(self):
+        t1 = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _connect_time.seconds = (getattr(_connect_time, 'seconds', None)
+                                     or 0.0) + time.perf_counter() - t1
+
+
+class _TimedConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedConnection
+
+
+class _TimedAdapter(HTTPAdapter):
+    """Times how long plain HTTP requests spend connecting."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = dict(
+            self.poolmanager.pool_classes_by_scheme,
+            http=_TimedConnectionPool)
+
+
 class _BatchClient:
 
-    def __init__(self, auth=None, timeout=None):
+    def __init__(
+            self, auth=None, timeout=None, tracer=None, retry=None,
+            breaker=None):
         self.auth = auth
-        self._tasks = []
+        self.timeout = timeout
+        self.tracer = tracer or Tracer()
+        self.retry = retry or RetryPolicy(attempts=1)
+        self.breaker = breaker
+        self._requests = []
+        self._batch_id = None
+        self._tick = None
+        # GETs left running by a batch that hit its deadline, by URL.
+        self._inflight = {}
+        # The loop is private and only runs inside `batch_request`, so it
+        # is never installed as the current loop of the calling thread.
         self._loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self._loop)
-        self._session = aiohttp.ClientSession(
-            auth=auth, loop=self._loop,
-            timeout=aiohttp.ClientTimeout(timeout))
-        atexit.register(
-            lambda: self._loop.run_until_complete(self._session.close()))
+        self._session = None
+        atexit.register(self.close)
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        if self._inflight:
+            tasks = list(self._inflight.values())
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.wait(tasks))
+        if self._session is not None:
+            self._loop.run_until_complete(self._session.close())
+        self._loop.close()
+
+    def register_get(self, url, headers=None, group=None, queued_at=None):
+        self.__register('GET', group, url, queued_at, headers=headers)
+
+    def register_put(
+            self, url, data=None, headers=None, group=None, queued_at=None):
+        self.__register('PUT', group, url, queued_at, data=data,
+                        headers=headers)
+
+    def register_post(
+            self, url, data=None, headers=None, group=None, queued_at=None):
+        self.__register('POST', group, url, queued_at, data=data,
+                        headers=headers)
+
+    def batch_request(
+            self, coalesce=False, batch_id=None, tick=None, deadline=None,
+            return_exceptions=False):
+        """Send the registered requests and return results in order.
+
+        GETs outside of ordering groups are merged: each distinct URL is
+        fetched once, and URLs below another requested URL are read from
+        its response (see `_plan_fetches`). The first request that failed,
+        or did not finish within `deadline` seconds, raises its exception;
+        with `return_exceptions`, the exception is its result instead.
+        """
+        results = [_PENDING] * len(self._requests)
+        chains = {}
+        gets = []
+        for index, (method, group, url, queued_at, kwargs) \
+                in enumerate(self._requests):
+            if method == 'GET' and group is None:
+                gets.append((index, url, queued_at, kwargs))
+                continue
+            key = index if group is None else ('group', group)
+            chains.setdefault(key, []).append(
+                (index, method, url, queued_at, kwargs))
+
+        fetches = {}
+        plan = _plan_fetches([url for _, url, _, _ in gets],
+                             coalesce=coalesce)
+        for (index, _, queued_at, kwargs), (fetch_url, keys) \
+                in zip(gets, plan):
+            fetches.setdefault(fetch_url, (queued_at, kwargs, []))[2].append(
+                (index, keys))
+
+        self._requests = []
+        self._batch_id, self._tick = batch_id, tick
+        self._loop.run_until_complete(
+            self.__run_all(chains, fetches, results, deadline))
+        for index, res in enumerate(results):
+            if res is _PENDING:
+                results[index] = DeadlineError(
+                    'no response within {} seconds'.format(deadline))
+        if not return_exceptions:
+            for res in results:
+                if isinstance(res, Exception):
+                    raise res
+        return results
 
-    def register_get(self, url, headers=None):
-        self.__register(self.__get(url, headers=headers))
+    def __register(self, method, group, url, queued_at, **kwargs):
+        self._requests.append((method, group, url, queued_at, kwargs))
+
+    async def __run_all(self, chains, fetches, results, deadline):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(self.timeout),
+                middlewares=(self.auth,) if self.auth is not None else (),
+                trace_configs=[trace_config()])
+        tasks = [asyncio.ensure_future(self.__run_chain(chain, results))
+                 for chain in chains.values()]
+        tasks += [asyncio.ensure_future(
+                      self.__run_fetch(url, queued_at, kwargs, targets,
+                                       results))
+                  for url, (queued_at, kwargs, targets) in fetches.items()]
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        if pending:
+            # Fetches wait on their GET through a shield, so cancelling
+            # them leaves the GET running for the next batch to reuse.
+            for task in pending:
+                task.cancel()
+            await asyncio.wait(pending)
+
+    async def __run_chain(self, chain, results):
+        for i, (index, method, url, queued_at, kwargs) in enumerate(chain):
+            try:
+                results[index] = await self.__send(method, url, queued_at,
+                                                   **kwargs)
+            except Exception as e:
+                # Later requests of an ordered group depend on this one.
+                for index, *_ in chain[i:]:
+                    results[index] = e
+                return
+
+    async def __run_fetch(self, url, queued_at, kwargs, targets, results):
+        task = self._inflight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(
+                self.__send('GET', url, queued_at, **kwargs))
+            self._inflight[url] = task
+
+            def done(t):
+                if self._inflight.get(url) is t:
+                    del self._inflight[url]
+
+            task.add_done_callback(done)
+        try:
+            value = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            for index, _ in targets:
+                results[index] = e
+            return
+        for index, keys in targets:
+            try:
+                results[index] = _extract(value, keys)
+            except RequestError as e:
+                results[index] = e
+
+    async def __send(self, method, url, queued_at, **kwargs):
+        return await call_async(
+            lambda: self.__send_once(method, url, queued_at, **kwargs),
+            method, self.retry, self.breaker)
+
+    async def __send_once(self, method, url, queued_at, **kwargs):
+        tracer = self.tracer
+        if not tracer.active:
+            resp = await self._session.request(method, url, **kwargs)
+            return await self._parse_response(resp)
+
+        trace = tracer.trace(method, url, kwargs.get('data'),
+                             batch_id=self._batch_id, tick=self._tick,
+                             queued_at=queued_at)
+        tracer.before_send(trace)
+        try:
+            resp = await self._session.request(
+                method, url, trace_request_ctx=trace, **kwargs)
+            trace.status = resp.status
+            value = await _read_traced(resp, trace)
+        except BaseException as e:
+            tracer.on_error(trace, e)
+            raise
+        tracer.after_receive(trace)
+        return value
 
-    def register_put(self, url, data=None, headers=None):
-        self.__register(self.__put(url, data=data, headers=headers))
+    async def _parse_response(self, resp):
+        return await _parse_async_response(resp)
 
-    def register_post(self, url, data=None, headers=None):
-        self.__register(self.__post(url, data=data, headers=headers))
 
-    def batch_request(self):
-        results = self._loop.run_until_complete(asyncio.gather(*self._tasks))
-        self._tasks = []
-        return results
+async def _read_traced(
+        resp: 'aiohttp.ClientResponse', trace: 'RequestTrace') -> Any:
+    """Read and parse a response whose headers just arrived, timing both.
 
-    def __register(self, coro):
-        self._tasks.append(self._loop.create_task(coro))
+    Time spent waiting for a pooled connection, already added to the
+    queue time of `trace`, is not counted as waiting for the response.
+    """
+    t1 = time.perf_counter()
+    pooled = trace.queue - (trace.started_at - trace.queued_at
+                            if trace.queued_at is not None else 0.0)
+    trace.wait = t1 - trace.started_at - (trace.connect or 0.0) - pooled
+    trace.bytes_received = len(await resp.read())
+    t2 = time.perf_counter()
+    trace.transfer = t2 - t1
+    value = await _parse_async_response(resp)
+    trace.parse = time.perf_counter() - t2
+    return value
 
-    async def __get(self, *args, **kwargs):
-        resp = await self._session.get(*args, **kwargs)
-        return await self._parse_response(resp)
 
-    async def __put(self, *args, **kwargs):
-        resp = await self._session.put(*args, **kwargs)
-        return await self._parse_response(resp)
+async def _parse_async_response(resp: 'aiohttp.ClientResponse') -> Any:
+    code = resp.status
+    try:
+        respj = await resp.json(content_type=None)
+    except json.JSONDecodeError:
+        respj = ''
+    _check_status(code, respj)
+    return respj
 
-    async def __post(self, *args, **kwargs):
-        resp = await self._session.post(*args, **kwargs)
-        return await self._parse_response(resp)
 
-    async def _parse_response(self, resp):
-        code = resp.status
-        respj = await resp.json()
-        if code > 400:
-            raise RequestError('status code {}: {}'.format(code, respj))
-        return respj
+_NOT_STORED = object()
+_PENDING = object()
 
 
 class FutureResult:
 
     def __init__(self):
-        self.__value = None
+        self.__value = _NOT_STORED
+        self.__error = None
         self.__slice_items = []
 
     def __getitem__(self, item):
         self.__slice_items.append(item)
         return self
 
+    @property
+    def failed(self) -> bool:
+        return self.__error is not None
+
+    @property
+    def error(self) -> Optional[Exception]:
+        return self.__error
+
     def store(self, value: Any) -> None:
-        if self.__value is not None:
+        if self.__value is not _NOT_STORED or self.__error is not None:
             raise FutureResultError('value already stored')
         self.__value = value
 
-    def get(self) -> None:
-        if self.__value is None:
+    def store_error(self, error: Exception) -> None:
+        """Fail the result; `get` raises `error` from then on."""
+        if self.__value is not _NOT_STORED or self.__error is not None:
+            raise FutureResultError('value already stored')
+        self.__error = error
+
+    def get(self) -> Any:
+        if self.__error is not None:
+            raise self.__error
+        if self.__value is _NOT_STORED:
             raise FutureResultError('value not stored')
         if len(self.__slice_items) > 0:
             return self.__value[self.__slice_items.pop(0)]
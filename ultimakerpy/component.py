@@ -1,11 +1,14 @@
 import atexit
 from datetime import datetime
 import subprocess
-from typing import BinaryIO, Dict, Optional, Tuple
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
 
+from .camera import FrameGrabber
 from .client import UMClient
 from .const import CAMSTREAM_PY_PATH, Ctype
 from .exceptions import ChoiceValidationError, RangeValidationError
+from .mjpeg import MJPEGStream
+from .upload import MultipartUpload
 
 
 def _validate_range(val, min_, max_):
@@ -20,6 +23,28 @@ def _validate_choice(val, choices):
             f'{val} is not in choices {choices}')
 
 
+# Camera helpers shared by the blocking and async peripherals.
+
+def _camera_streaming(url, name):
+    proc = subprocess.Popen(
+        'python "{path}" {target} --name "{name}"'.format(
+            path=CAMSTREAM_PY_PATH, target=url, name=name))
+    atexit.register(proc.kill)
+    return proc
+
+
+def _frame_grabber(url, capacity):
+    grabber = FrameGrabber(url, capacity=capacity)
+    grabber.start()
+    return grabber
+
+
+def _mjpeg_stream(url, capacity):
+    stream = MJPEGStream(url, capacity=capacity)
+    stream.start()
+    return stream
+
+
 class System:
 
     def __init__(self, client: 'UMClient', url: Dict, lim: Dict) -> None:
@@ -27,10 +52,14 @@ class System:
         self._url = url
         self._lim = lim
 
-    def start_job(self, fileobj: BinaryIO) -> None:
-        self._client.post(self._url['job'],
-                          files={'job_name': format(datetime.now()),
-                                 'file': fileobj})
+    def start_job(
+            self, fileobj: BinaryIO,
+            progress: Optional[Callable[[int, int], None]] = None,
+            filename: Optional[str] = None) -> None:
+        body = MultipartUpload(fileobj,
+                               fields={'job_name': format(datetime.now())},
+                               filename=filename, progress=progress)
+        self._client.upload(self._url['job'], body)
 
     def set_job_state(self, value: str) -> None:
         _validate_choice(value, self._lim['state'])
@@ -60,13 +89,15 @@ class Peripherals:
 
     def camera_streaming(
             self, name: str = 'Internal Camera') -> 'subprocess.Popen':
-        proc = subprocess.Popen(
-            'python "{path}" {target} --name "{name}"'.format(
-                path=CAMSTREAM_PY_PATH,
-                target=self._url['cam_stream'],
-                name=name))
-        atexit.register(proc.kill)
-        return proc
+        return _camera_streaming(self._url['cam_stream'], name)
+
+    def frame_grabber(self, capacity: int = 30) -> 'FrameGrabber':
+        """Start grabbing camera frames; the caller stops the grabber."""
+        return _frame_grabber(self._url['cam_stream'], capacity)
+
+    def mjpeg_stream(self, capacity: int = 10) -> 'MJPEGStream':
+        """Start reading the camera stream; the caller stops it."""
+        return _mjpeg_stream(self._url['cam_stream'], capacity)
 
     def ambient_temperature(self) -> float:
         return self._client.get(self._url['amb_temp'],
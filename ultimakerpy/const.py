@@ -13,10 +13,15 @@ CAMSTREAM_PY_PATH = _abssource('camstream.py')
 
 ENDPOINT = _abssource('endpoint.json')
 CONFIG = _relsource('config.yaml')
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'ultimakerpy')
 PRINTABLE_FORMATS = [
     ('UFP file','*.ufp'),
     ('GCODE file', '*.gcode')
 ]
+SNAPSHOT_PATHS = [
+    '/api/v1/printer',
+    '/api/v1/print_job'
+]
 
 
 class Ctype:
@@ -40,3 +45,15 @@ class PrinterStatus:
     PRINTING = 'printing'
     ERROR = 'error'
     MAINTENANCE = 'maintenance'
+
+
+class OverrunPolicy:
+    SKIP = 'skip'
+    CATCH_UP = 'catch_up'
+    STRETCH = 'stretch'
+
+
+class BreakerState:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
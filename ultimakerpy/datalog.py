@@ -1,32 +1,110 @@
-import csv
 import threading
 import time
 from contextlib import contextmanager
 from datetime import datetime
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+import warnings
+
+import numpy as np
 
 from .client import FutureResult, UMClient
+from .const import OverrunPolicy
+from .exceptions import StaleValueWarning
+from .gcode import LayerTable
+from .history import History, WindowStats
+from .layer import LayerTracker
+from .scheduler import TickScheduler
 from .timer import Timer
+from .tracing import TickTrace
+from .writer import BackgroundWriter, open_writer
+
+# Columns filled in by the logger itself rather than by registered funcs.
+_STAMPS = ('timestamp', 'received_at', 'stale')
+
+
+def _wall_clock() -> float:
+    return datetime.now().timestamp()
+
+
+def _error(ret: Any) -> Optional[Exception]:
+    """Return the error of a failed `FutureResult` in `ret`, if any."""
+    if type(ret) in (list, tuple):
+        return next((e for e in map(_error, ret) if e is not None), None)
+    return ret.error if type(ret) == FutureResult else None
+
+
+def _resolve(ret: Any) -> Any:
+    t = type(ret)
+    if t in (list, tuple):
+        return t(r.get() if type(r) == FutureResult else r for r in ret)
+    return ret.get() if t == FutureResult else ret
 
 
 class DataLogger:
 
     def __init__(
             self, client: 'UMClient', output_csv: str,
-            logging_interval: float = 1.0, timer_timeout: float = 600.) -> None:
-        self.funcs = {'timestamp': lambda: datetime.now().timestamp()}
+            logging_interval: float = 1.0, timer_timeout: float = 600.,
+            history_capacity: Optional[int] = None,
+            sparse: bool = False, overrun_policy: str = OverrunPolicy.STRETCH,
+            received_at: bool = False, tick_deadline: Optional[float] = None,
+            stale_flags: bool = False) -> None:
+        """Sample registered functions every `logging_interval` seconds.
+
+        Ticks are scheduled on fixed deadlines (see `TickScheduler`);
+        `overrun_policy` decides what happens when one runs late. The
+        `timestamp` of a sample is when its requests were sent; with
+        `received_at`, a column of when the responses arrived follows it.
+
+        With `tick_deadline`, the requests of a tick are given that many
+        seconds. Values that failed or came too late keep their last known
+        value, are listed in `stale` and raise a `StaleValueWarning` when
+        they turn stale; with `stale_flags`, a column of their names
+        follows the stamps.
+        """
+        self.funcs = {'timestamp': _wall_clock}
+        # Stamp columns written after `timestamp`, ahead of the funcs.
+        self._stamps = [name for name, on in (('received_at', received_at),
+                                              ('stale', stale_flags)) if on]
+        self.tick_deadline = tick_deadline
         self._client = client
         self.output_csv = output_csv
         self.logging_interval = logging_interval
+        self.sparse = sparse
+        self.scheduler = TickScheduler(logging_interval, overrun_policy)
         self._callbacks = []
+        self._tick_hooks = []
+        self._intervals = {}
+        self.layer_tracker = None
         self.__valdict = None
+        self.__sampled = ()
+        self.__stale = frozenset()
+        self.__history = None
+        if history_capacity is not None:
+            self.__history = History(history_capacity)
+        self.__sample_count = 0
+        self.__updated = threading.Condition()
         self.__thread = None
+        self.__writer = None
         self.__loop_alive = False
 
         self._timer = Timer(self, timeout=timer_timeout)
 
-    def register(self, funcs: Callable[[], Any]) -> None:
+    def register(
+            self, funcs: Dict[str, Callable[[], Any]],
+            interval: Optional[float] = None) -> None:
+        """Register functions sampled every `interval` seconds.
+
+        Without `interval`, they are sampled every `logging_interval`.
+        Between their samples, values are carried forward, or written as
+        empty cells if the logger is `sparse`. Names of stamp columns
+        (`timestamp`, `received_at` and `stale`) are rejected.
+        """
+        taken = [name for name in funcs if name in _STAMPS]
+        if taken:
+            raise ValueError('{} is a stamp column'.format(taken[0]))
         self.funcs.update(funcs)
+        self._intervals.update({name: interval for name in funcs})
 
     def get(self, *names: str) -> Any:
         valdict = self.get_all()
@@ -38,14 +116,53 @@ class DataLogger:
         self._timer.wait_for(lambda: self.__valdict is not None)
         return self.__valdict.copy()
 
+    def history(
+            self, key: str, seconds: Optional[float] = None
+            ) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Return `(timestamps, values)` of `key` over the last `seconds`."""
+        return self.__get_history().history(key, seconds)
+
+    def window_stats(
+            self, key: str, seconds: Optional[float] = None) -> 'WindowStats':
+        """Return min/max/mean/slope of `key` over the last `seconds`."""
+        return self.__get_history().window_stats(key, seconds)
+
+    def __get_history(self) -> 'History':
+        if self.__history is None:
+            raise ValueError('history is disabled; set history_capacity')
+        return self.__history
+
+    @property
+    def sample_count(self) -> int:
+        return self.__sample_count
+
+    @property
+    def stale(self) -> FrozenSet[str]:
+        """Names whose value in the latest sample was carried forward."""
+        return self.__stale
+
+    @property
+    def writer_error(self) -> Optional[Exception]:
+        """The error that stopped writing rows, if any.
+
+        Sampling goes on after it; the error is raised when `loop` exits.
+        """
+        return None if self.__writer is None else self.__writer.error
+
+    def wait_for_sample(
+            self, count: int, timeout: Optional[float] = None) -> int:
+        """Block until more than `count` samples have been published."""
+        with self.__updated:
+            self.__updated.wait_for(lambda: self.__sample_count > count,
+                                    timeout)
+            return self.__sample_count
+
     @contextmanager
     def loop(self) -> None:
         try:
-            f = open(self.output_csv, 'a', newline='')
-            self.__writer = csv.writer(f)
-            self.__writer.writerow(self.funcs.keys())
-            self.add_callback(
-                lambda: self.__writer.writerow(self.__valdict.values()))
+            self.__writer = BackgroundWriter(open_writer(self.output_csv))
+            self.__writer.start(self.__columns())
+            self.add_callback(lambda: self.__writer.write(self.__row()))
 
             self.__thread = threading.Thread(target=self.update)
             self.__loop_alive = True
@@ -54,36 +171,123 @@ class DataLogger:
         finally:
             self.__loop_alive = False
             self.__thread.join()
-            f.flush()
-            f.close()
+            self.__writer.close()
 
     def update(self) -> None:
-        def main():
-            with self._client.batch_mode():
-                rets = [f() for f in self.funcs.values()]
-
-            valdict = {}
-            for ret, name in zip(rets, self.funcs.keys()):
-                t = type(ret)
-                if t in (list, tuple):
-                    val = t((r.get() if type(r) == FutureResult else r \
-                             for r in ret))
-                else:
-                    val = ret.get() if t == FutureResult else ret
-                valdict[name] = val
-            self.__valdict = valdict
+        next_due = {}
+        scheduler = self.scheduler
+
+        def due_names(now, tick):
+            names = []
+            for name in self.funcs.keys():
+                if name in _STAMPS:
+                    continue
+                interval = self._intervals.get(name) or self.logging_interval
+                due = next_due.get(name, now)
+                if due - now > tick / 2:
+                    continue
+                names.append(name)
+                due += interval
+                next_due[name] = due if due > now else now + interval
+            return names
 
+        def main(names):
+            tick = self.__sample_count
+            lateness = scheduler.lateness()
+            t1 = time.perf_counter()
+            with self._client.batch_mode(tick=tick,
+                                         deadline=self.tick_deadline,
+                                         return_exceptions=True):
+                rets = [self.funcs[name]() for name in names]
+                sent_at = _wall_clock()
+            received_at = _wall_clock()
+            t2 = time.perf_counter()
+
+            valdict = {'timestamp': sent_at}
+            if 'received_at' in self._stamps:
+                valdict['received_at'] = received_at
+            stale = []
+            for ret, name in zip(rets, names):
+                error = _error(ret)
+                if error is None:
+                    valdict[name] = _resolve(ret)
+                    continue
+                stale.append(name)
+                if name not in self.__stale:
+                    warnings.warn('{} is stale: {!r}'.format(name, error),
+                                  StaleValueWarning)
+            if 'stale' in self._stamps:
+                valdict['stale'] = ';'.join(stale)
+            if self.__history is not None:
+                self.__history.append(valdict)
+            with self.__updated:
+                prev = self.__valdict or {}
+                self.__valdict = {name: valdict.get(name, prev.get(name))
+                                  for name in self.__columns()}
+                self.__sampled = set(valdict)
+                self.__stale = frozenset(stale)
+                self.__sample_count += 1
+                self.__updated.notify_all()
+
+            t3 = time.perf_counter()
             for cb in self._callbacks:
                 cb()
+            if self._tick_hooks:
+                trace = TickTrace(tick, t1, t2 - t1, t3 - t2,
+                                  time.perf_counter() - t3, lateness)
+                for hook in self._tick_hooks:
+                    hook(trace)
 
+        scheduler.start()
         while self.__loop_alive:
-            t1 = time.perf_counter()
-            main()
-            t2 = time.perf_counter()
-            time.sleep(max(0, self.logging_interval-(t2-t1)))
+            scheduler.interval = self.__tick_interval()
+            main(due_names(scheduler.deadline, scheduler.interval))
+            time.sleep(scheduler.advance())
+
+    def __columns(self) -> List[str]:
+        return ['timestamp', *self._stamps,
+                *(name for name in self.funcs if name not in _STAMPS)]
+
+    def __tick_interval(self) -> float:
+        intervals = [i for i in self._intervals.values() if i is not None]
+        return min([self.logging_interval] + intervals)
+
+    def __row(self) -> List[Any]:
+        if not self.sparse:
+            return list(self.__valdict.values())
+        return [val if name in self.__sampled else None
+                for name, val in self.__valdict.items()]
+
+    def track_layers(
+            self, pos_key: str = 'bed_pos',
+            layer_height: Optional[float] = None,
+            layers: Optional['LayerTable'] = None,
+            min_step: float = 0.05, debounce: int = 2) -> 'LayerTracker':
+        """Follow layer changes in the `pos_key` column.
+
+        The tracker is also used by `Timer.wait_for_layer`.
+        """
+        if pos_key not in self.funcs:
+            raise ValueError('{} is not logged'.format(pos_key))
+        self.layer_tracker = LayerTracker(
+            self, pos_key=pos_key, layer_height=layer_height, layers=layers,
+            min_step=min_step, debounce=debounce)
+        return self.layer_tracker
+
+    def tick_stats(self) -> Dict[str, Any]:
+        """Return the tick, overrun and missed tick counts of the loop."""
+        return self.scheduler.stats()
 
     def get_timer(self) -> 'Timer':
         return self._timer
 
     def add_callback(self, func) -> None:
         self._callbacks.append(func)
+
+    def add_tick_hook(self, func: Callable[['TickTrace'], None]) -> None:
+        """Call `func(trace)` after each sample with its time breakdown.
+
+        `trace.tick` matches the `tick` of the request traces of the
+        sample (see `UMClient.add_hook`).
+        """
+        self._tick_hooks.append(func)
@@ -6,6 +6,22 @@ class RequestError(PrinterControlError):
     """The URL does not exist or the request is not permitted."""
 
 
+class ServerError(RequestError):
+    """The printer failed to handle the request (status code 5xx)."""
+
+
+class RequestTimeoutError(PrinterControlError, TimeoutError):
+    """The printer did not answer within the request timeout."""
+
+
+class CircuitOpenError(PrinterControlError):
+    """Requests to the printer are suspended after repeated failures."""
+
+
+class DeadlineError(PrinterControlError):
+    """The response did not arrive before the deadline of its batch."""
+
+
 class FutureResultError(PrinterControlError):
     """The peration is not permitted in the state at the time."""
 
@@ -26,5 +42,9 @@ class RequestModeWarning(PrinterControlWarning):
     """The request mode does not support the method."""
 
 
+class StaleValueWarning(PrinterControlWarning):
+    """A logged value could not be read; its last known value is kept."""
+
+
 class PrintJobWarning(PrinterControlWarning):
     """The print job cannot be executed and is ignored."""
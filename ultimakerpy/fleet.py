@@ -0,0 +1,166 @@
+import asyncio
+from datetime import datetime
+import functools
+from typing import (Any, AsyncIterator, Awaitable, Callable, Dict, Iterable,
+                    Optional, Tuple, Union)
+
+import aiohttp
+
+from .async_printer import AsyncUMS3
+from .const import OverrunPolicy
+from .exceptions import PrinterControlError
+from .printer import _job_file
+from .scheduler import TickScheduler
+from .tracing import trace_config
+from .writer import BackgroundWriter, open_writer
+
+Targets = Callable[['AsyncUMS3'], Dict[str, Callable[[], Awaitable[Any]]]]
+
+
+class Fleet:
+    """Polls many printers concurrently from one event loop.
+
+    `targets` maps a printer to the functions to log for it, e.g.
+    `lambda p: {'nozzle_temp': p.main_nozzle.temperature}`.
+    """
+
+    def __init__(
+            self, names: Iterable[str], max_concurrency: int = 16,
+            logging_interval: float = 1.0,
+            overrun_policy: str = OverrunPolicy.STRETCH) -> None:
+        self.names = list(names)
+        self.max_concurrency = max_concurrency
+        self.logging_interval = logging_interval
+        self.scheduler = TickScheduler(logging_interval, overrun_policy)
+        self.errors: Dict[str, Exception] = {}
+        self._session = None
+        self._printers = {}
+
+    async def __aenter__(self) -> 'Fleet':
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        self._session = aiohttp.ClientSession(trace_configs=[trace_config()])
+        limiter = asyncio.Semaphore(self.max_concurrency)
+        self._printers = {
+            name: AsyncUMS3(name, session=self._session, limiter=limiter)
+            for name in self.names}
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    @property
+    def printers(self) -> Dict[str, 'AsyncUMS3']:
+        return self._printers
+
+    async def sample(self, targets: Targets) -> Dict[str, Dict[str, Any]]:
+        samples = {}
+        async for name, valdict in self.__sample_all(targets):
+            samples[name] = valdict
+        return samples
+
+    async def samples(
+            self, targets: Targets, duration: Optional[float] = None
+            ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Yield `(name, sample)` pairs as each printer answers a tick.
+
+        Ticks follow `scheduler`, as in `DataLogger`.
+        """
+        scheduler = self.scheduler
+        t_start = scheduler.start()
+        while duration is None or scheduler.deadline < t_start + duration:
+            scheduler.interval = self.logging_interval
+            async for name, valdict in self.__sample_all(targets):
+                yield name, valdict
+            await asyncio.sleep(scheduler.advance())
+
+    async def log(
+            self, output_csv: str, targets: Targets,
+            duration: Optional[float] = None) -> None:
+        """Write the samples of all printers to one file.
+
+        As in `DataLogger`, the format follows the extension of
+        `output_csv`, and rows are written on a background thread so the
+        event loop never waits for the disk.
+        """
+        writer = BackgroundWriter(open_writer(output_csv))
+        header = None
+        try:
+            async for name, valdict in self.samples(targets, duration):
+                if header is None:
+                    header = list(valdict.keys())
+                    await asyncio.to_thread(writer.start,
+                                            ['printer'] + header)
+                writer.write([name] + [valdict[key] for key in header])
+        finally:
+            if header is not None:
+                await asyncio.to_thread(writer.close)
+
+    async def print(
+            self, filepaths: Union[str, Dict[str, str]],
+            progress: Optional[Callable[[str, int, int], None]] = None,
+            compress: bool = False, strip_comments: bool = False) -> None:
+        """Upload and start jobs on all printers at the same time.
+
+        `filepaths` is one file for every printer, or a file per printer
+        name. `progress(name, sent, total)` reports each upload. Failed
+        uploads are recorded in `errors`.
+        """
+        if isinstance(filepaths, str):
+            filepaths = {name: filepaths for name in self._printers}
+        names = list(filepaths)
+        if compress:
+            # Pack each distinct file once before the uploads share it.
+            await asyncio.gather(
+                *(asyncio.to_thread(_job_file, path, compress, strip_comments)
+                  for path in set(filepaths.values())))
+        results = await asyncio.gather(
+            *(self.__print(name, filepaths[name], progress,
+                           compress=compress, strip_comments=strip_comments)
+              for name in names), return_exceptions=True)
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                self.errors[name] = result
+            else:
+                self.errors.pop(name, None)
+
+    async def __print(self, name, filepath, progress, **kwargs):
+        if progress is not None:
+            progress = functools.partial(progress, name)
+        await self._printers[name].print(filepath, progress=progress,
+                                         **kwargs)
+
+    async def __sample_all(self, targets):
+        tasks = [asyncio.ensure_future(self.__sample(name, printer, targets))
+                 for name, printer in self._printers.items()]
+        try:
+            for future in asyncio.as_completed(tasks):
+                name, valdict = await future
+                if isinstance(valdict, Exception):
+                    self.errors[name] = valdict
+                    continue
+                self.errors.pop(name, None)
+                yield name, valdict
+        finally:
+            # Left early or failed: do not leave samples running.
+            for task in tasks:
+                task.cancel()
+
+    async def __sample(self, name, printer, targets):
+        funcs = targets(printer)
+        timestamp = datetime.now().timestamp()
+        values = await asyncio.gather(*(f() for f in funcs.values()),
+                                      return_exceptions=True)
+        for value in values:
+            if isinstance(value, (PrinterControlError, aiohttp.ClientError,
+                                  asyncio.TimeoutError)):
+                return name, value
+            if isinstance(value, BaseException):
+                raise value
+        return name, dict(zip(['timestamp', *funcs], [timestamp, *values]))
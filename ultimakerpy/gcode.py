@@ -0,0 +1,314 @@
+from concurrent.futures import ProcessPoolExecutor
+import math
+import mmap
+import os
+import re
+import time
+from typing import Optional, Tuple
+import zipfile
+
+import numpy as np
+
+from .ufp import UFP_GCODE_PATH
+
+_MODE = re.compile(rb'^[ \t]*(G90|G91|M82|M83)\b', re.MULTILINE)
+_LAYER_MARKER = b';LAYER:'
+_AXES = b'XYZE'
+# Parameter letters, as the ints that indexing a bytes word yields.
+_X, _Y, _E, _F, _P, _S = b'XYEFPS'
+_MIN_CHUNK_SIZE = 4 << 20
+
+
+class LayerTable:
+    """Per-layer summary of a G-code file.
+
+    `z` is the height of each layer, `extrusion` the filament length (mm)
+    extruded by the end of it and `time` the estimated seconds from the
+    job start to the start of it. The estimate assumes every move runs at
+    its feedrate, so it is usually short; `predict` rescales it by the
+    progress seen so far.
+    """
+
+    def __init__(
+            self, layer: 'np.ndarray', z: 'np.ndarray',
+            extrusion: 'np.ndarray', time: 'np.ndarray',
+            total_time: float) -> None:
+        self.layer = layer
+        self.z = z
+        self.extrusion = extrusion
+        self.time = time
+        self.total_time = total_time
+        self._z_floor = np.maximum.accumulate(
+            np.where(np.isnan(z), -np.inf, z)) if len(z) else z
+
+    def __len__(self) -> int:
+        return len(self.layer)
+
+    def __repr__(self) -> str:
+        return 'LayerTable({} layers, {:.0f} s)'.format(
+            len(self), self.total_time)
+
+    def layer_at(self, z: float, tolerance: float = 1e-3) -> int:
+        """Return the layer being printed at height `z`, or -1 before it."""
+        idx = np.searchsorted(self._z_floor, z + tolerance, side='right') - 1
+        return int(self.layer[idx]) if idx >= 0 else -1
+
+    def time_of(self, layer: int) -> float:
+        """Estimated seconds from the job start to the start of `layer`."""
+        idx = np.searchsorted(self.layer, layer)
+        if idx >= len(self):
+            return self.total_time
+        return float(self.time[idx])
+
+    def predict(
+            self, layer: int, started_at: float,
+            now: Optional[float] = None) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Return `(layers, timestamps)` of when the layers after `layer`
+        should start, for a job started at `started_at`.
+        """
+        now = time.time() if now is None else now
+        estimated = self.time_of(layer)
+        scale = (now - started_at) / estimated if estimated > 0 else 1.0
+        mask = self.layer > layer
+        return self.layer[mask], started_at + self.time[mask] * scale
+
+    def eta(
+            self, layer: int, started_at: float,
+            now: Optional[float] = None) -> float:
+        """Return the predicted timestamp of the end of the job."""
+        now = time.time() if now is None else now
+        estimated = self.time_of(layer)
+        scale = (now - started_at) / estimated if estimated > 0 else 1.0
+        return started_at + self.total_time * scale
+
+
+def analyze(path: str, processes: Optional[int] = None) -> 'LayerTable':
+    """Build a `LayerTable` from a `.gcode` or `.ufp` file.
+
+    A G-code file is memory-mapped and, when large, parsed in chunks on a
+    process pool of `processes` workers. A first pass finds the
+    positioning modes at each chunk start; the second parses the chunks,
+    leaving the moves that depend on the previous chunk to be resolved
+    when the results are joined in order.
+    """
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zf:
+            data = zf.read(UFP_GCODE_PATH)
+        markers = _LAYER_MARKER in data
+        return _join([_parse_chunk(data, 0, len(data), (True, True), markers)],
+                     markers)
+
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return _join([], False)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            markers = mm.find(_LAYER_MARKER) != -1
+            processes = processes or os.cpu_count() or 1
+            bounds = _split(mm, size, processes)
+    if len(bounds) == 1:
+        return _join([_parse_file(path, 0, size, (True, True), markers)],
+                     markers)
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        chunk_modes = list(pool.map(
+            _scan_file, *zip(*((path, start, end) for start, end in bounds))))
+        entry_modes = []
+        modes = (True, True)
+        for abs_pos, abs_e in chunk_modes:
+            entry_modes.append(modes)
+            modes = (modes[0] if abs_pos is None else abs_pos,
+                     modes[1] if abs_e is None else abs_e)
+        parts = list(pool.map(
+            _parse_file, *zip(*((path, start, end, mode, markers)
+                                for (start, end), mode
+                                in zip(bounds, entry_modes)))))
+    return _join(parts, markers)
+
+
+def _split(mm, size, processes):
+    num_chunks = max(1, min(processes, size // _MIN_CHUNK_SIZE))
+    bounds = []
+    start = 0
+    for i in range(1, num_chunks):
+        end = mm.find(b'\n', size * i // num_chunks)
+        if end == -1 or end + 1 <= start:
+            continue
+        bounds.append((start, end + 1))
+        start = end + 1
+    bounds.append((start, size))
+    return bounds
+
+
+def _scan_file(path, start, end):
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _scan_modes(mm, start, end)
+
+
+def _scan_modes(data, start, end):
+    """Return the positioning and extrusion modes left by a chunk; None
+    where the chunk does not change them.
+    """
+    abs_pos, abs_e = None, None
+    for match in _MODE.finditer(data, start, end):
+        cmd = match.group(1)
+        if cmd in (b'G90', b'G91'):
+            abs_pos = abs_e = cmd == b'G90'
+        else:
+            abs_e = cmd == b'M82'
+    return abs_pos, abs_e
+
+
+def _parse_file(path, start, end, modes, markers):
+    with open(path, 'rb') as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _parse_chunk(mm, start, end, modes, markers)
+
+
+def _parse_chunk(data, start, end, modes, markers):
+    """Parse one chunk without knowing the machine state at its start.
+
+    Axis positions start out unknown and hold an offset from the entry
+    position until an absolute value is seen. Moves that need the entry
+    position or feedrate are returned as deferred and resolved in
+    `_join`. Returns `(pos, known, feed, slots, deferred)`, where each
+    slot is `[marker, z, extrusion, time]`; the first slot continues the
+    layer of the previous chunk.
+    """
+    abs_pos, abs_e = modes
+    pos = [0.0, 0.0, 0.0, 0.0]
+    known = [False, False, False, False]
+    feed = None
+    slots = [[None, None, 0.0, 0.0]]
+    deferred = []
+
+    for line in data[start:end].splitlines():
+        if line.startswith(b';'):
+            if markers and line.startswith(_LAYER_MARKER):
+                try:
+                    layer = int(line[len(_LAYER_MARKER):])
+                except ValueError:
+                    continue
+                slots.append([layer, None, 0.0, 0.0])
+            continue
+        words = line.split(b';', 1)[0].split()
+        if not words:
+            continue
+        cmd = words[0]
+        if cmd in (b'G0', b'G1'):
+            params = _params(words)
+            if params is None:
+                continue
+            deltas = [0.0, 0.0, 0.0, 0.0]
+            unresolved = {}
+            for i, axis in enumerate(_AXES):
+                val = params.get(axis)
+                if val is None:
+                    continue
+                if not (abs_e if i == 3 else abs_pos):
+                    deltas[i] = val
+                    pos[i] += val
+                elif known[i]:
+                    deltas[i] = val - pos[i]
+                    pos[i] = val
+                else:
+                    unresolved[i] = (val, pos[i])
+                    pos[i] = val
+                    known[i] = True
+            if _F in params:
+                feed = params[_F]
+            slot = slots[-1]
+            if _E in params and (_X in params or _Y in params) \
+                    and (3 in unresolved or deltas[3] > 0):
+                z = (pos[2], known[2])
+                if slot[1] is None:
+                    slot[1] = z
+                elif not markers and slot[1] != z:
+                    slot = [None, z, 0.0, 0.0]
+                    slots.append(slot)
+            if unresolved or feed is None:
+                deferred.append((len(slots) - 1, deltas, unresolved, feed))
+            else:
+                slot[2] += deltas[3]
+                slot[3] += _move_time(deltas, feed)
+        elif cmd == b'G92':
+            params = _params(words) or {}
+            for i, axis in enumerate(_AXES):
+                if not params or axis in params:
+                    pos[i] = params.get(axis, 0.0)
+                    known[i] = True
+        elif cmd == b'G28':
+            params = _params(words) or {}
+            for i, axis in enumerate(_AXES[:3]):
+                if not params or axis in params:
+                    pos[i] = 0.0
+                    known[i] = True
+        elif cmd == b'G4':
+            params = _params(words) or {}
+            slots[-1][3] += params.get(_P, 0.0) / 1000 + params.get(_S, 0.0)
+        elif cmd in (b'G90', b'G91'):
+            abs_pos = abs_e = cmd == b'G90'
+        elif cmd in (b'M82', b'M83'):
+            abs_e = cmd == b'M82'
+    return pos, known, feed, slots, deferred
+
+
+def _params(words):
+    try:
+        return {word[0]: float(word[1:]) for word in words[1:]}
+    except ValueError:
+        return None
+
+
+def _move_time(deltas, feed):
+    if not feed:
+        return 0.0
+    dist = math.sqrt(deltas[0]**2 + deltas[1]**2 + deltas[2]**2)
+    return (dist or abs(deltas[3])) / (feed / 60)
+
+
+def _join(parts, markers):
+    pos = [0.0, 0.0, 0.0, 0.0]
+    feed = None
+    slots = []
+    for part_pos, part_known, part_feed, part_slots, deferred in parts:
+        for idx, deltas, unresolved, move_feed in deferred:
+            for i, (val, offset) in unresolved.items():
+                deltas[i] = val - (pos[i] + offset)
+            part_slots[idx][2] += deltas[3]
+            part_slots[idx][3] += _move_time(deltas, move_feed or feed)
+        for slot in part_slots:
+            if slot[1] is not None:
+                z, z_known = slot[1]
+                slot[1] = z if z_known else pos[2] + z
+        pos = [p if k else e + p
+               for p, k, e in zip(part_pos, part_known, pos)]
+        feed = part_feed or feed
+        slots.extend(part_slots)
+
+    layers, zs, extrusions, times = [], [], [], []
+    elapsed, extruded = 0.0, 0.0
+    started = False
+    for marker, z, extrusion, duration in slots:
+        if markers:
+            new_layer = marker is not None
+        else:
+            new_layer = z is not None and (not zs or z > zs[-1] + 1e-6)
+        if new_layer:
+            layers.append(marker if markers else len(layers))
+            zs.append(z)
+            extrusions.append(extruded)
+            times.append(elapsed)
+            started = True
+        elif started and zs[-1] is None and z is not None:
+            zs[-1] = z
+        elapsed += duration
+        extruded += extrusion
+        if started:
+            extrusions[-1] = extruded
+    zs = [np.nan if z is None else z for z in zs]
+    return LayerTable(np.array(layers, dtype=np.int64),
+                      np.array(zs, dtype=np.float64),
+                      np.array(extrusions, dtype=np.float64),
+                      np.array(times, dtype=np.float64), elapsed)
@@ -0,0 +1,106 @@
+from numbers import Real
+import threading
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class WindowStats(NamedTuple):
+    count: int
+    min: float
+    max: float
+    mean: float
+    slope: float
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of timestamped numeric samples."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._times = np.empty(capacity, dtype=np.float64)
+        self._values = np.empty(capacity, dtype=np.float64)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, value: float) -> None:
+        self._times[self._next] = timestamp
+        self._values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def window(
+            self, seconds: Optional[float] = None
+            ) -> Tuple['np.ndarray', 'np.ndarray']:
+        """Return `(timestamps, values)` of the last `seconds` in order.
+
+        The window is measured back from the newest sample. Without
+        `seconds`, all buffered samples are returned.
+        """
+        if self._size < self.capacity:
+            times = self._times[:self._size]
+            values = self._values[:self._size]
+        else:
+            times = np.concatenate(
+                (self._times[self._next:], self._times[:self._next]))
+            values = np.concatenate(
+                (self._values[self._next:], self._values[:self._next]))
+        if seconds is not None and self._size > 0:
+            start = np.searchsorted(times, times[-1] - seconds, side='left')
+            times, values = times[start:], values[start:]
+        return times, values
+
+
+class History:
+    """Ring buffers for the numeric columns of DataLogger samples."""
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self._buffers: Dict[str, 'RingBuffer'] = {}
+        self._lock = threading.Lock()
+
+    def append(self, valdict: Dict[str, Any]) -> None:
+        timestamp = valdict['timestamp']
+        with self._lock:
+            for key, val in valdict.items():
+                if key == 'timestamp' or isinstance(val, bool) \
+                        or not isinstance(val, Real):
+                    continue
+                if key not in self._buffers:
+                    self._buffers[key] = RingBuffer(self.capacity)
+                self._buffers[key].append(timestamp, val)
+
+    def keys(self):
+        return self._buffers.keys()
+
+    def history(
+            self, key: str, seconds: Optional[float] = None
+            ) -> Tuple['np.ndarray', 'np.ndarray']:
+        with self._lock:
+            if key not in self._buffers:
+                return np.empty(0), np.empty(0)
+            times, values = self._buffers[key].window(seconds)
+            return times.copy(), values.copy()
+
+    def window_stats(
+            self, key: str, seconds: Optional[float] = None) -> 'WindowStats':
+        times, values = self.history(key, seconds)
+        if len(values) == 0:
+            return WindowStats(0, np.nan, np.nan, np.nan, np.nan)
+        return WindowStats(len(values), float(values.min()),
+                           float(values.max()), float(values.mean()),
+                           _slope(times, values))
+
+
+def _slope(times, values):
+    """Least-squares slope of `values` per second."""
+    if len(values) < 2:
+        return np.nan
+    dt = times - times.mean()
+    denom = np.dot(dt, dt)
+    if denom == 0:
+        return np.nan
+    return float(np.dot(dt, values - values.mean()) / denom)
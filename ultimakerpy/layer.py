@@ -0,0 +1,137 @@
+import threading
+from typing import (TYPE_CHECKING, Callable, Iterator, List, NamedTuple,
+                    Optional)
+
+if TYPE_CHECKING:
+    from .datalog import DataLogger
+    from .gcode import LayerTable
+
+
+class LayerEvent(NamedTuple):
+    layer: int
+    z: float
+    timestamp: float
+
+
+class LayerTracker:
+    """Turns the bed position logged by a DataLogger into layer changes.
+
+    The layer of a position comes from a `LayerTable` (see
+    `gcode.analyze`), a fixed `layer_height`, or else counts each rise
+    of at least `min_step`. A new layer is confirmed once `debounce`
+    consecutive samples stay at or above it, so Z-hops during travel
+    moves are ignored; the highest layer reached by then is reported. The
+    tracker is updated once per sample on the logger thread; any number
+    of threads can wait on it without polling.
+    """
+
+    def __init__(
+            self, data_logger: 'DataLogger', pos_key: str = 'bed_pos',
+            layer_height: Optional[float] = None,
+            layers: Optional['LayerTable'] = None,
+            min_step: float = 0.05, debounce: int = 2) -> None:
+        self.pos_key = pos_key
+        self.layer_height = layer_height
+        self.layers = layers
+        self.min_step = min_step
+        self.debounce = debounce
+        self._data_logger = data_logger
+        self._layer = None
+        self._layer_z = None
+        self._candidate = None
+        self._candidate_count = 0
+        self._events: List[LayerEvent] = []
+        self._callbacks = []
+        self._changed = threading.Condition()
+        data_logger.add_callback(self._on_sample)
+
+    @property
+    def layer(self) -> Optional[int]:
+        """The current layer, or None before the first sample."""
+        return self._layer
+
+    @property
+    def events(self) -> List['LayerEvent']:
+        with self._changed:
+            return list(self._events)
+
+    def add_callback(self, func: Callable[['LayerEvent'], None]) -> None:
+        """Call `func(event)` on the logger thread at each layer change."""
+        self._callbacks.append(func)
+
+    def wait_for_layer(
+            self, layer: int, timeout: Optional[float] = None) -> bool:
+        """Block until `layer` has started; False if `timeout` expired."""
+        with self._changed:
+            return self._changed.wait_for(
+                lambda: self._layer is not None and self._layer >= layer,
+                timeout)
+
+    def iter_events(
+            self, timeout: Optional[float] = None) -> Iterator['LayerEvent']:
+        """Yield each layer change from now on.
+
+        Stops when no layer starts within `timeout` seconds.
+        """
+        with self._changed:
+            index = len(self._events)
+        while True:
+            with self._changed:
+                if not self._changed.wait_for(
+                        lambda: len(self._events) > index, timeout):
+                    return
+                pending = self._events[index:]
+                index = len(self._events)
+            yield from pending
+
+    def _on_sample(self):
+        valdict = self._data_logger.get_all()
+        z = valdict.get(self.pos_key)
+        if isinstance(z, bool) or not isinstance(z, (int, float)):
+            return
+        if self._layer is None:
+            with self._changed:
+                self._layer = self._layer_of(z, 0)
+                self._layer_z = z
+                self._changed.notify_all()
+            return
+
+        layer = self._layer_of(z, self._layer)
+        if layer <= self._layer:
+            self._candidate = None
+            return
+        candidate = self._candidate
+        if candidate is None or layer < candidate.layer:
+            self._candidate = LayerEvent(layer, z, valdict.get('timestamp'))
+            self._candidate_count = 1
+        else:
+            # Still at or above the candidate: confirm the highest layer
+            # reached, as Z may rise by a layer per sample.
+            if layer > candidate.layer:
+                self._candidate = LayerEvent(layer, z,
+                                             valdict.get('timestamp'))
+            self._candidate_count += 1
+        if self._candidate_count < self.debounce:
+            return
+
+        event = self._candidate
+        self._candidate = None
+        with self._changed:
+            self._layer = event.layer
+            self._layer_z = event.z
+            self._events.append(event)
+            self._changed.notify_all()
+        for cb in self._callbacks:
+            cb(event)
+
+    def _layer_of(self, z, current):
+        if self.layers is not None:
+            return self.layers.layer_at(z)
+        if self.layer_height is not None:
+            return round(z / self.layer_height)
+        candidate = self._candidate
+        if candidate is not None and z - candidate.z >= self.min_step:
+            return candidate.layer + 1
+        if self._layer_z is not None and z - self._layer_z >= self.min_step:
+            return current + 1
+        return current
@@ -0,0 +1,187 @@
+import asyncio
+from bisect import bisect_left
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+if TYPE_CHECKING:
+    from .tracing import RequestTrace
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0)
+TIMEOUT_ERRORS = (requests.Timeout, asyncio.TimeoutError)
+
+
+class Histogram:
+    """Counts of observations per upper bound, as Prometheus buckets."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """Return `(upper_bound, count)` pairs, ending with `+inf`."""
+        pairs = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, q: float) -> float:
+        """Estimate the `q` quantile by interpolating within its bucket."""
+        if self.count == 0:
+            return float('nan')
+        rank = q * self.count
+        lower, seen = 0.0, 0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            lower, seen = bound, seen + count
+        return self.buckets[-1] if self.buckets else float('nan')
+
+
+class _Series:
+
+    __slots__ = ('latency', 'requests', 'errors', 'timeouts', 'bytes_sent',
+                 'bytes_received')
+
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.requests = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+class RequestMetrics:
+    """Request latency, count, error and byte counters.
+
+    Requests are counted per printer, endpoint and method, from the
+    traces a client records (see `tracing.Tracer`). The endpoint is the
+    `category/label` of the URL in `endpoint.json`; other URLs (e.g. the
+    resources read by coalesced requests) are counted by their path.
+    Failed requests are counted as errors, and those that timed out also
+    as timeouts; cancelled ones only as requests.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, str, str], '_Series'] = {}
+        self._lock = threading.Lock()
+
+    def record(self, trace: 'RequestTrace') -> None:
+        """Count a finished or failed request."""
+        key = (trace.printer or urlsplit(trace.url).netloc, trace.endpoint,
+               trace.method)
+        error = trace.error
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(self.buckets)
+            series.latency.observe(trace.duration)
+            series.requests += 1
+            if error is not None \
+                    and not isinstance(error, asyncio.CancelledError):
+                series.errors += 1
+                if isinstance(error, TIMEOUT_ERRORS):
+                    series.timeouts += 1
+            series.bytes_sent += trace.bytes_sent
+            series.bytes_received += trace.bytes_received
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Return the counters and latency summary of every series."""
+        with self._lock:
+            items = sorted(self._series.items())
+            return [{'printer': printer, 'endpoint': endpoint,
+                     'method': method, 'requests': s.requests,
+                     'errors': s.errors, 'timeouts': s.timeouts,
+                     'bytes_sent': s.bytes_sent,
+                     'bytes_received': s.bytes_received,
+                     'latency_sum': s.latency.sum,
+                     'latency_p50': s.latency.quantile(0.5),
+                     'latency_p99': s.latency.quantile(0.99)}
+                    for (printer, endpoint, method), s in items]
+
+    def to_prometheus(self, prefix: str = 'ultimakerpy') -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self._series.items())
+            lines = []
+            counters = [
+                ('requests_total', 'Requests sent.', 'requests'),
+                ('request_errors_total', 'Requests that failed.', 'errors'),
+                ('request_timeouts_total', 'Requests that timed out.',
+                 'timeouts'),
+                ('request_bytes_sent_total', 'Request body bytes sent.',
+                 'bytes_sent'),
+                ('request_bytes_received_total',
+                 'Response body bytes received.', 'bytes_received')]
+            for name, help_text, attr in counters:
+                name = '{}_{}'.format(prefix, name)
+                lines.append('# HELP {} {}'.format(name, help_text))
+                lines.append('# TYPE {} counter'.format(name))
+                for key, s in items:
+                    lines.append('{}{{{}}} {}'.format(
+                        name, _labelset(key), getattr(s, attr)))
+
+            name = '{}_request_duration_seconds'.format(prefix)
+            lines.append('# HELP {} Request latency.'.format(name))
+            lines.append('# TYPE {} histogram'.format(name))
+            for key, s in items:
+                labels = _labelset(key)
+                for bound, count in s.latency.cumulative():
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(
+                        name, labels, _format_bound(bound), count))
+                lines.append('{}_sum{{{}}} {}'.format(
+                    name, labels, repr(s.latency.sum)))
+                lines.append('{}_count{{{}}} {}'.format(
+                    name, labels, s.latency.count))
+        return '\n'.join(lines) + '\n'
+
+
+def body_size(body: Any) -> int:
+    """Return the size of a request body in bytes, 0 if unknown."""
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode('utf-8'))
+    try:
+        return len(body)
+    except TypeError:
+        # aiohttp payloads know their size, when it is known up front.
+        return getattr(body, 'size', None) or 0
+
+
+def _labelset(key):
+    printer, endpoint, method = key
+    return 'printer="{}",endpoint="{}",method="{}"'.format(
+        _escape(printer), _escape(endpoint), method)
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(float(bound))
+
+
+# Shared by every printer with `request_metrics` enabled in its config.
+REGISTRY = RequestMetrics()
@@ -0,0 +1,203 @@
+from collections import deque
+import re
+import threading
+import time
+from typing import Iterator, List, Optional
+
+import numpy as np
+import requests
+import urllib3
+
+_CONTENT_LENGTH = re.compile(rb'content-length:\s*(\d+)', re.IGNORECASE)
+_BOUNDARY = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+
+
+class JpegFrame:
+    """A raw JPEG frame that is only decoded when asked for."""
+
+    __slots__ = ('timestamp', 'data')
+
+    def __init__(self, timestamp: float, data: bytes) -> None:
+        self.timestamp = timestamp
+        self.data = data
+
+    def decode(self, scale: int = 1) -> 'np.ndarray':
+        """Decode to a BGR image, reduced by `scale` (1, 2, 4 or 8).
+
+        Reduced decoding skips most of the inverse DCT work. Requires
+        OpenCV (`cv2`).
+        """
+        try:
+            import cv2
+        except ImportError:
+            raise ImportError('decoding frames requires opencv-python')
+        flags = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+        if scale not in flags:
+            raise ValueError('scale must be one of {}'.format(list(flags)))
+        return cv2.imdecode(np.frombuffer(self.data, dtype=np.uint8),
+                            flags[scale])
+
+
+class MultipartParser:
+    """Incremental parser for `multipart/x-mixed-replace` bodies.
+
+    Bytes are appended to one reusable buffer; each complete part is cut
+    out of it by its Content-Length header, or by the next boundary when
+    the header is missing.
+    """
+
+    def __init__(self, boundary: Optional[str] = None) -> None:
+        self._delimiter = None
+        if boundary is not None:
+            self._delimiter = b'--' + boundary.lstrip('-').encode('ascii')
+        self._buf = bytearray()
+
+    def feed(self, data: bytes) -> List[bytes]:
+        self._buf += data
+        parts = []
+        while True:
+            part = self._next_part()
+            if part is None:
+                return parts
+            parts.append(part)
+
+    def _next_part(self):
+        buf = self._buf
+        while self._delimiter is None:
+            line_end = buf.find(b'\r\n')
+            if line_end == -1:
+                return None
+            line = bytes(buf[:line_end]).strip()
+            if line.startswith(b'--'):
+                self._delimiter = line
+            else:
+                del buf[:line_end + 2]
+
+        start = buf.find(self._delimiter)
+        if start == -1:
+            # Keep only a tail that could be the start of a delimiter.
+            del buf[:max(0, len(buf) - len(self._delimiter))]
+            return None
+        if start > 0:
+            del buf[:start]
+        header_end = buf.find(b'\r\n\r\n')
+        if header_end == -1:
+            return None
+        body_start = header_end + 4
+        match = _CONTENT_LENGTH.search(buf, 0, header_end)
+        if match is not None:
+            body_end = body_start + int(match.group(1))
+            if len(buf) < body_end:
+                return None
+            next_start = body_end
+        else:
+            body_end = buf.find(self._delimiter, body_start)
+            if body_end == -1:
+                return None
+            next_start = body_end
+            while body_end > body_start and buf[body_end-1] in b'\r\n':
+                body_end -= 1
+        part = bytes(buf[body_start:body_end])
+        del buf[:next_start]
+        return part
+
+
+class MJPEGStream:
+    """Reads an mjpg-streamer stream on a background thread.
+
+    The last `capacity` frames are kept as raw JPEG bytes; nothing is
+    decoded until `JpegFrame.decode` is called.
+    """
+
+    def __init__(
+            self, url: str, capacity: int = 10, chunk_size: int = 65536,
+            timeout: float = 10.0, retry_interval: float = 1.0) -> None:
+        self.url = url
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retry_interval = retry_interval
+        self._frames = deque(maxlen=capacity)
+        self._count = 0
+        self._updated = threading.Condition()
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def __enter__(self) -> 'MJPEGStream':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._updated:
+            self._updated.notify_all()
+
+    @property
+    def frame_count(self) -> int:
+        return self._count
+
+    def latest_frame(self) -> Optional['JpegFrame']:
+        """Return the newest frame, if any."""
+        with self._updated:
+            return self._frames[-1] if self._frames else None
+
+    def frames(
+            self, timeout: Optional[float] = None) -> Iterator['JpegFrame']:
+        """Yield each new frame until the stream stops or times out.
+
+        Frames that already left the buffer when the consumer catches up
+        are skipped.
+        """
+        count = self._count
+        while True:
+            with self._updated:
+                if not self._updated.wait_for(
+                        lambda: self._count > count or self._stopped.is_set(),
+                        timeout):
+                    return
+                if self._count <= count:
+                    return
+                num_new = min(self._count - count, len(self._frames))
+                pending = list(self._frames)[-num_new:]
+                count = self._count
+            yield from pending
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._read_stream()
+            # Reads from `resp.raw` raise urllib3 errors, which requests
+            # does not wrap.
+            except (requests.RequestException, urllib3.exceptions.HTTPError,
+                    OSError):
+                pass
+            self._stopped.wait(self.retry_interval)
+
+    def _read_stream(self):
+        with requests.get(self.url, stream=True,
+                          timeout=self.timeout) as resp:
+            match = _BOUNDARY.search(resp.headers.get('Content-Type', ''))
+            parser = MultipartParser(match.group(1) if match else None)
+            while not self._stopped.is_set():
+                chunk = resp.raw.read1(self.chunk_size)
+                if not chunk:
+                    return
+                timestamp = time.time()
+                parts = parser.feed(chunk)
+                if not parts:
+                    continue
+                with self._updated:
+                    for part in parts:
+                        self._frames.append(JpegFrame(timestamp, part))
+                        self._count += 1
+                    self._updated.notify_all()
@@ -1,4 +1,6 @@
-def parse_endpoints(item, base_path='', url={}, lim={}):
+def parse_endpoints(item, base_path='', url=None, lim=None):
+    url = {} if url is None else url
+    lim = {} if lim is None else lim
     path = base_path + item['path']
     if 'endpoints' in item.keys():
         u, l = _collect_item_endpoints(item['endpoints'], path)
@@ -38,3 +40,16 @@ def _merge_subdict(d1, d2):
             continue
         d1[key].update(sd)
     return d1
+
+
+def parse_ttls(item, base_path='', ttl=None):
+    ttl = {} if ttl is None else ttl
+    path = base_path + item['path']
+    if 'endpoints' in item.keys():
+        for ep in item['endpoints']:
+            if 'ttl' in ep.keys():
+                ttl[path + ep.get('path', '')] = ep['ttl']
+    if 'items' in item.keys():
+        for item in item['items']:
+            ttl = parse_ttls(item, path, ttl)
+    return ttl
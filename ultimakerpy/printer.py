@@ -1,69 +1,202 @@
 from contextlib import contextmanager
 import json
+import os
 from tkinter import Tk
 import tkinter.filedialog
-from typing import Any, Callable, Dict, Iterator
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 import warnings
 
 import yaml
+from requests.adapters import DEFAULT_POOLSIZE
 
+from .cache import ResponseCache
 from .client import UMClient
 from .component import LED, Bed, Fan, Feeder, Head, Nozzle, Peripherals, System
-from .const import CONFIG, ENDPOINT, PRINTABLE_FORMATS, JobState, PrinterStatus
+from .const import (CONFIG, ENDPOINT, PRINTABLE_FORMATS, JobState,
+                    OverrunPolicy, PrinterStatus)
 from .datalog import DataLogger
 from .exceptions import PrintJobWarning, RequestError
-from .parse import parse_endpoints
+from .gcode import LayerTable
+from .metrics import REGISTRY, RequestMetrics
+from .parse import parse_endpoints, parse_ttls
+from .resilience import CircuitBreaker, RetryPolicy
+from .timelapse import LayerTimelapse
+from .tracing import RequestTrace, endpoint_labels
+from .ufp import cached_ufp
+
+
+def _load_config(config_key: str) -> Dict[str, Any]:
+    with open(CONFIG, 'r') as f:
+        return yaml.safe_load(f)[config_key]
+
+
+def _load_endpoints(
+        machine_type: str, ip_address: str,
+        camera_url: Optional[str] = None) -> Tuple[Dict, Dict]:
+    """Load the endpoint URLs; `camera_url` replaces the default stream."""
+    with open(ENDPOINT, 'r') as f:
+        item = json.load(f)[machine_type]
+    url, lim = parse_endpoints(
+        item=item,
+        base_path='http://{ip_address}'.format(ip_address=ip_address))
+    if camera_url is not None:
+        url['periph']['cam_stream'] = camera_url
+    return url, lim
+
+
+def _load_ttls(machine_type: str, ip_address: str) -> Dict[str, float]:
+    with open(ENDPOINT, 'r') as f:
+        item = json.load(f)[machine_type]
+    return parse_ttls(
+        item=item,
+        base_path='http://{ip_address}'.format(ip_address=ip_address))
+
+
+def _metrics(config: Dict[str, Any]) -> Optional['RequestMetrics']:
+    """Return the shared metrics registry if the config enables it."""
+    return REGISTRY if config.get('request_metrics', False) else None
+
+
+def _retry_policy(config: Dict[str, Any]) -> 'RetryPolicy':
+    return RetryPolicy(attempts=config.get('retry_attempts', 1),
+                       backoff=config.get('retry_backoff', 0.1),
+                       hedge_quantile=config.get('hedge_quantile', None))
+
+
+def _breaker(config: Dict[str, Any]) -> Optional['CircuitBreaker']:
+    """Return a circuit breaker if the config sets `breaker_threshold`."""
+    threshold = config.get('breaker_threshold', None)
+    if threshold is None:
+        return None
+    return CircuitBreaker(threshold, config.get('breaker_reset', 30.0))
+
+
+def _job_file(
+        filepath: str, compress: bool,
+        strip_comments: bool) -> Tuple[str, str]:
+    """Return the file to upload and the file name the printer sees."""
+    name, ext = os.path.splitext(os.path.basename(filepath))
+    if not compress or ext.lower() != '.gcode':
+        return filepath, name + ext
+    return cached_ufp(filepath, strip=strip_comments), name + '.ufp'
 
 
 class _Printer:
 
     def __init__(self, machine_type: str, config_key: str) -> None:
-        with open(CONFIG, 'r') as f:
-            config: dict = yaml.safe_load(f)[config_key]
-
-        with open(ENDPOINT, 'r') as f:
-            item = json.load(f)[machine_type]
+        config = _load_config(config_key)
+        self._config_key = config_key
 
-        ip_address = config['ip_address']
         username = config.get('username', None)
         password = config.get('password', None)
 
         request_timeout = config.get('request_timeout', 30)
         self.timer_timeout = config.get('timer_timeout', 600)
         self.logging_interval = config.get('logging_interval', 1.0)
+        self.overrun_policy = config.get('overrun_policy',
+                                         OverrunPolicy.STRETCH)
+        self.history_capacity = config.get('history_capacity', None)
+        self.tick_deadline = config.get('tick_deadline', None)
+        coalesce_requests = config.get('coalesce_requests', False)
+        pool_connections = config.get('pool_connections', DEFAULT_POOLSIZE)
+        pool_maxsize = config.get('pool_maxsize', DEFAULT_POOLSIZE)
+
+        self._url, self._lim = _load_endpoints(
+            machine_type, config['ip_address'], config.get('camera_url'))
+
+        cache = None
+        if config.get('response_cache', False):
+            ttls = _load_ttls(machine_type, config['ip_address'])
+            cache = ResponseCache(ttls, maxsize=config.get('cache_size', 256))
 
         self._client = UMClient(timeout=request_timeout, username=username,
-                                password=password)
-
-        self._url, self._lim = parse_endpoints(
-            item=item,
-            base_path='http://{ip_address}'.format(ip_address=ip_address))
+                                password=password, coalesce=coalesce_requests,
+                                pool_connections=pool_connections,
+                                pool_maxsize=pool_maxsize, cache=cache,
+                                metrics=_metrics(config), printer=config_key,
+                                labels=endpoint_labels(self._url),
+                                retry=_retry_policy(config),
+                                breaker=_breaker(config))
 
         self._system = System(self._client, self._url['system'],
                               self._lim['system'])
 
     @contextmanager
     def data_logger(
-            self, filepath: str, target_funcs: Dict[str, Callable[[], Any]]
-            ) -> Iterator['DataLogger']:
+            self, filepath: str, target_funcs: Dict[str, Callable[[], Any]],
+            target_intervals: Optional[Dict[str, float]] = None,
+            sparse: bool = False, received_at: bool = False,
+            stale_flags: bool = False) -> Iterator['DataLogger']:
         try:
             dl = DataLogger(self._client, filepath,
                             logging_interval=self.logging_interval,
-                            timer_timeout=self.timer_timeout)
+                            timer_timeout=self.timer_timeout,
+                            history_capacity=self.history_capacity,
+                            sparse=sparse,
+                            overrun_policy=self.overrun_policy,
+                            received_at=received_at,
+                            tick_deadline=self.tick_deadline,
+                            stale_flags=stale_flags)
             dl.register(target_funcs)
+            for name, interval in (target_intervals or {}).items():
+                dl.register({name: target_funcs[name]}, interval=interval)
             with dl.loop():
                 yield dl
         finally:
             pass
 
-    def print(self, filepath: str) -> None:
+    @contextmanager
+    def batch_mode(self) -> Iterator[None]:
+        with self._client.batch_mode():
+            yield
+
+    @contextmanager
+    def ordered(self) -> Iterator[None]:
+        with self._client.ordered():
+            yield
+
+    def cache_stats(self) -> Dict[str, Any]:
+        if self._client.cache is None:
+            return {}
+        return self._client.cache.stats()
+
+    def resilience_stats(self) -> Dict[str, Any]:
+        """Return the retry, hedge and circuit breaker counters."""
+        stats = self._client.retry.stats()
+        if self._client.breaker is not None:
+            stats['breaker'] = self._client.breaker.stats()
+        return stats
+
+    def add_request_hook(
+            self, name: str, func: Callable[['RequestTrace'], Any]) -> None:
+        """See `UMClient.add_hook`."""
+        self._client.add_hook(name, func)
+
+    def request_metrics(self) -> List[Dict[str, Any]]:
+        """Return the request counters of this printer, per endpoint."""
+        if self._client.metrics is None:
+            return []
+        return [series for series in self._client.metrics.snapshot()
+                if series['printer'] == self._config_key]
+
+    def print(
+            self, filepath: str,
+            progress: Optional[Callable[[int, int], None]] = None,
+            compress: bool = False, strip_comments: bool = False) -> None:
+        """Upload and start `filepath`; `progress(sent, total)` is optional.
+
+        With `compress`, a `.gcode` file is packed into a UFP first (see
+        `ufp.cached_ufp`), optionally without its comments.
+        """
         if self.status() != PrinterStatus.IDLE:
             warnings.warn(
                 'The new job is ignored because the printer is still working.',
                 PrintJobWarning, stacklevel=2)
         else:
+            filepath, filename = _job_file(filepath, compress, strip_comments)
             with open(filepath, 'rb') as f:
-                self._system.start_job(fileobj=f)
+                self._system.start_job(fileobj=f, progress=progress,
+                                       filename=filename)
 
     def print_from_dialog(self) -> None:
         Tk().withdraw()
@@ -119,6 +252,25 @@ class UMS3(_Printer):
         self.__peripherals = Peripherals(self._client, self._url['periph'],
                                          self._lim['periph'])
 
+    @contextmanager
+    def layer_timelapse(
+            self, data_logger: 'DataLogger', output_zip: str,
+            pos_key: str = 'bed_pos', layer_height: Optional[float] = None,
+            layers: Optional['LayerTable'] = None,
+            park_position: Optional[Tuple[float, float]] = None,
+            settle: float = 0.0) -> Iterator['LayerTimelapse']:
+        tracker = data_logger.track_layers(pos_key=pos_key,
+                                           layer_height=layer_height,
+                                           layers=layers)
+        stream = self.__peripherals.mjpeg_stream()
+        try:
+            with LayerTimelapse(tracker, stream, output_zip,
+                                head=self.__head, park_position=park_position,
+                                settle=settle) as timelapse:
+                yield timelapse
+        finally:
+            stream.stop()
+
     @property
     def bed(self) -> 'Bed':
         return self.__bed
@@ -0,0 +1,262 @@
+import asyncio
+from collections import deque
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import aiohttp
+import requests
+
+from .const import BreakerState
+from .exceptions import CircuitOpenError, RequestTimeoutError, ServerError
+from .metrics import TIMEOUT_ERRORS
+
+# Failures that say nothing about the request itself, so the same request
+# may succeed when sent again.
+TRANSIENT_ERRORS = (requests.ConnectionError, aiohttp.ClientConnectionError,
+                    ServerError) + TIMEOUT_ERRORS
+
+
+class RetryPolicy:
+    """Retries and hedging of the idempotent GETs of one printer.
+
+    A GET failing with a transient error (a timeout, a dropped connection
+    or a 5xx status) is sent up to `attempts` times in all. Before retry
+    `n`, it waits a random time of up to `backoff * 2 ** (n - 1)` seconds,
+    capped at `max_backoff`.
+
+    With `hedge_quantile`, an async GET still running after that quantile
+    of the recent GET latencies gets a duplicate, and the first answer
+    wins. Hedging starts once `hedge_min_samples` latencies are known.
+    """
+
+    def __init__(
+            self, attempts: int = 3, backoff: float = 0.1,
+            max_backoff: float = 2.0, hedge_quantile: Optional[float] = None,
+            hedge_min_samples: int = 20, window: int = 200,
+            seed: Optional[int] = None) -> None:
+        if attempts < 1:
+            raise ValueError('attempts must be at least 1')
+        if hedge_quantile is not None and not 0 < hedge_quantile < 1:
+            raise ValueError('hedge_quantile must be between 0 and 1')
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.retries = 0
+        self.hedges = 0
+        self._latencies = deque(maxlen=window)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def retryable(self, method: str, error: BaseException,
+                  attempt: int) -> bool:
+        """Tell if a request that failed on `attempt` is sent again."""
+        return method == 'GET' and attempt < self.attempts \
+            and isinstance(error, TRANSIENT_ERRORS)
+
+    def delay(self, attempt: int) -> float:
+        """Return the seconds to wait after the failed `attempt`."""
+        with self._lock:
+            self.retries += 1
+            cap = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+            return self._random.uniform(0, cap)
+
+    def observe(self, seconds: float) -> None:
+        """Record the latency of a successful GET."""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge(self) -> None:
+        """Record that a GET was hedged."""
+        with self._lock:
+            self.hedges += 1
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds after which a GET is hedged, or None not to hedge."""
+        with self._lock:
+            if self.hedge_quantile is None \
+                    or len(self._latencies) < self.hedge_min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[int(self.hedge_quantile * (len(latencies) - 1))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {'retries': self.retries, 'hedges': self.hedges,
+                'hedge_delay': self.hedge_delay()}
+
+
+class CircuitBreaker:
+    """Stops sending requests to a printer that keeps failing.
+
+    After `failure_threshold` transient failures in a row the breaker
+    opens, and requests fail at once with `CircuitOpenError`. After
+    `reset_timeout` seconds it is half open: one request goes through as
+    a probe, and its outcome closes the breaker or opens it again.
+    Other errors, such as a 404, show that the printer is reachable and
+    count as successes.
+    """
+
+    def __init__(
+            self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return BreakerState.CLOSED
+        if self._clock() - self._opened_at < self.reset_timeout:
+            return BreakerState.OPEN
+        return BreakerState.HALF_OPEN
+
+    def before_request(self) -> None:
+        """Raise `CircuitOpenError` unless a request may be sent now."""
+        with self._lock:
+            state = self.state
+            if state == BreakerState.CLOSED:
+                return
+            if state == BreakerState.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+        raise CircuitOpenError('{} failures in a row; retrying after {} '
+                               'seconds'.format(self.failures,
+                                                self.reset_timeout))
+
+    def record(self, error: Optional[BaseException] = None) -> None:
+        """Record the outcome of a request let through.
+
+        A request that was cancelled or interrupted rather than failed
+        (an error that is not an `Exception`) frees the probe and is not
+        counted.
+        """
+        with self._lock:
+            probe, self._probing = self._probing, False
+            if error is not None and not isinstance(error, Exception):
+                return
+            if not isinstance(error, TRANSIENT_ERRORS):
+                self.failures = 0
+                self._opened_at = None
+                return
+            self.failures += 1
+            if probe or self.failures >= self.failure_threshold:
+                if self._opened_at is None or probe:
+                    self.opened += 1
+                self._opened_at = self._clock()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'state': self.state, 'failures': self.failures,
+                'opened': self.opened}
+
+
+def call(
+        send: Callable[[], Any], method: str, retry: 'RetryPolicy',
+        breaker: Optional['CircuitBreaker'] = None) -> Any:
+    """Send a request through `send()` with retries and the breaker."""
+    attempt = 0
+    while True:
+        attempt += 1
+        if breaker is not None:
+            breaker.before_request()
+        t1 = time.perf_counter()
+        try:
+            value = send()
+        except (KeyboardInterrupt, SystemExit) as e:
+            _interrupted(e, breaker)
+            raise
+        except Exception as e:
+            error = _failure(e, breaker)
+            if not retry.retryable(method, error, attempt):
+                _raise(error, e)
+            time.sleep(retry.delay(attempt))
+            continue
+        _success(method, time.perf_counter() - t1, retry, breaker)
+        return value
+
+
+async def call_async(
+        send: Callable[[], Awaitable[Any]], method: str,
+        retry: 'RetryPolicy',
+        breaker: Optional['CircuitBreaker'] = None) -> Any:
+    """Like `call`, and hedges GETs as set in `retry`."""
+    attempt = 0
+    while True:
+        attempt += 1
+        if breaker is not None:
+            breaker.before_request()
+        t1 = time.perf_counter()
+        try:
+            if method == 'GET':
+                value = await _hedged(send, retry, breaker)
+            else:
+                value = await send()
+        except (asyncio.CancelledError, KeyboardInterrupt, SystemExit) as e:
+            _interrupted(e, breaker)
+            raise
+        except Exception as e:
+            error = _failure(e, breaker)
+            if not retry.retryable(method, error, attempt):
+                _raise(error, e)
+            await asyncio.sleep(retry.delay(attempt))
+            continue
+        _success(method, time.perf_counter() - t1, retry, breaker)
+        return value
+
+
+async def _hedged(send, retry, breaker):
+    delay = retry.hedge_delay()
+    if delay is None or (breaker is not None
+                         and breaker.state != BreakerState.CLOSED):
+        return await send()
+    tasks = [asyncio.ensure_future(send())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            retry.hedge()
+            tasks.append(asyncio.ensure_future(send()))
+        error = None
+        for future in asyncio.as_completed(tasks):
+            try:
+                return await future
+            except Exception as e:
+                error = e
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _failure(error, breaker):
+    if breaker is not None:
+        breaker.record(error)
+    if isinstance(error, TIMEOUT_ERRORS) \
+            and not isinstance(error, RequestTimeoutError):
+        return RequestTimeoutError('no response within the request timeout')
+    return error
+
+
+def _interrupted(error, breaker):
+    if breaker is not None:
+        breaker.record(error)
+
+
+def _raise(error, cause):
+    if error is cause:
+        raise error
+    raise error from cause
+
+
+def _success(method, seconds, retry, breaker):
+    if breaker is not None:
+        breaker.record()
+    if method == 'GET':
+        retry.observe(seconds)
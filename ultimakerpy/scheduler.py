@@ -0,0 +1,72 @@
+import time
+from typing import Any, Callable, Dict
+
+from .const import OverrunPolicy
+
+_POLICIES = (OverrunPolicy.SKIP, OverrunPolicy.CATCH_UP,
+             OverrunPolicy.STRETCH)
+
+
+class TickScheduler:
+    """Deadlines of a fixed-rate loop on the monotonic clock.
+
+    Each tick is due one `interval` after the previous deadline, not after
+    the previous tick ended, so the rate does not drift. A tick that ends
+    after the next deadline is an overrun, handled by `policy`:
+
+    - `skip`: wait for the next deadline still ahead; the ones passed are
+      missed.
+    - `catch_up`: run the late ticks back to back until on time again.
+    - `stretch`: start the next tick now and count deadlines from it; the
+      ones passed in between are missed.
+    """
+
+    def __init__(
+            self, interval: float, policy: str = OverrunPolicy.STRETCH,
+            clock: Callable[[], float] = time.monotonic) -> None:
+        if policy not in _POLICIES:
+            raise ValueError('unknown overrun policy {!r}; choose from {}'
+                             .format(policy, ', '.join(_POLICIES)))
+        self.interval = interval
+        self.policy = policy
+        self._clock = clock
+        self.deadline = None
+        self.ticks = 0
+        self.overruns = 0
+        self.missed = 0
+        self.max_lateness = 0.0
+
+    def start(self) -> float:
+        """Make the first tick due now and return its deadline."""
+        self.deadline = self._clock()
+        return self.deadline
+
+    def lateness(self) -> float:
+        """Seconds the current tick started after its deadline."""
+        return max(0.0, self._clock() - self.deadline)
+
+    def advance(self) -> float:
+        """End the current tick; return the seconds to sleep until the next."""
+        now = self._clock()
+        if self.deadline is None:
+            self.deadline = now
+        self.ticks += 1
+        deadline = self.deadline + self.interval
+        interval = self.interval
+        if now > deadline and interval > 0:
+            self.overruns += 1
+            self.max_lateness = max(self.max_lateness, now - deadline)
+            passed = int((now - deadline) // interval)
+            if self.policy == OverrunPolicy.SKIP:
+                self.missed += passed + 1
+                deadline += (passed + 1) * interval
+            elif self.policy == OverrunPolicy.STRETCH:
+                self.missed += passed
+                deadline = now
+        self.deadline = deadline
+        return max(0.0, deadline - now)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'ticks': self.ticks, 'overruns': self.overruns,
+                'missed': self.missed, 'max_lateness': self.max_lateness,
+                'policy': self.policy}
@@ -0,0 +1,493 @@
+from argparse import ArgumentParser
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import socket
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import uuid
+
+from aiohttp import web
+import yaml
+
+from .const import ENDPOINT
+
+API_ROOT = '/api/v1'
+REALM = 'Jedi-API'
+BOUNDARY = 'boundarydonotcross'
+# Digest nonces kept; a client answering an older challenge is asked again.
+MAX_NONCES = 1024
+
+# An 8x8 grey JPEG served as every camera frame.
+_FRAME = base64.b64decode(
+    '/9j/4AAQSkZJRgABAQAAAQABAAD/2wBDABALDA4MChAODQ4SERATGCgaGBYWGDEjJR0o'
+    'OjM9PDkzODdASFxOQERXRTc4UG1RV19iZ2hnPk1xeXBkeFxlZ2P/2wBDARESEhgVGC8a'
+    'Gi9jQjhCY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2NjY2Nj'
+    'Y2NjY2P/wAARCAAIAAgDASIAAhEBAxEB/8QAHwAAAQUBAQEBAQEAAAAAAAAAAAECAwQF'
+    'BgcICQoL/8QAtRAAAgEDAwIEAwUFBAQAAAF9AQIDAAQRBRIhMUEGE1FhByJxFDKBkaEI'
+    'I0KxwRVS0fAkM2JyggkKFhcYGRolJicoKSo0NTY3ODk6Q0RFRkdISUpTVFVWV1hZWmNk'
+    'ZWZnaGlqc3R1dnd4eXqDhIWGh4iJipKTlJWWl5iZmqKjpKWmp6ipqrKztLW2t7i5usLD'
+    'xMXGx8jJytLT1NXW19jZ2uHi4+Tl5ufo6erx8vP09fb3+Pn6/8QAHwEAAwEBAQEBAQEB'
+    'AQAAAAAAAAECAwQFBgcICQoL/8QAtREAAgECBAQDBAcFBAQAAQJ3AAECAxEEBSExBhJB'
+    'UQdhcRMiMoEIFEKRobHBCSMzUvAVYnLRChYkNOEl8RcYGRomJygpKjU2Nzg5OkNERUZH'
+    'SElKU1RVVldYWVpjZGVmZ2hpanN0dXZ3eHl6goOEhYaHiImKkpOUlZaXmJmaoqOkpaan'
+    'qKmqsrO0tba3uLm6wsPExcbHyMnK0tPU1dbX2Nna4uPk5ebn6Onq8vP09fb3+Pn6/9oA'
+    'DAMBAAIRAxEAPwAooooA/9k=')
+
+_DEFAULTS = {
+    'printer/status': 'idle',
+    'position/x': 100.0,
+    'position/y': 100.0,
+    'position/z': 0.0,
+    'max_speed/x': 300.0,
+    'max_speed/y': 300.0,
+    'max_speed/z': 40.0,
+    'heads/0/acceleration': 3000.0,
+    'jerk/x': 20.0,
+    'jerk/y': 20.0,
+    'jerk/z': 0.4,
+    'heads/0/fan': 0.0,
+    'feeder/max_speed': 45.0,
+    'feeder/acceleration': 3000.0,
+    'feeder/jerk': 5.0,
+    'temperature/current': 25.0,
+    'temperature/target': 0.0,
+    'bed/pre_heat': {'active': False, 'remaining': 0.0},
+    'led/brightness': 100.0,
+    'ambient_temperature/current': 25.0,
+    'auth/verify': {'message': 'ok'},
+}
+_DIGEST_PARAM = re.compile(r'(\w+)=(?:"([^"]*)"|([^,\s]*))')
+
+
+def _api_paths(item, base_path=''):
+    path = base_path + item['path']
+    paths = [path + ep.get('path', '') for ep in item.get('endpoints', ())]
+    for sub in item.get('items', ()):
+        paths += _api_paths(sub, path)
+    return [p for p in paths if p.startswith(API_ROOT + '/')]
+
+
+def _default_value(path):
+    for suffix, value in _DEFAULTS.items():
+        if path.endswith('/' + suffix):
+            return json.loads(json.dumps(value))
+    return 0.0
+
+
+def build_tree(machine_type: str = 's3') -> Dict[str, Any]:
+    """Build the initial API state from the paths in `endpoint.json`."""
+    with open(ENDPOINT, 'r') as f:
+        item = json.load(f)[machine_type]
+    paths = sorted(set(_api_paths(item)), key=len, reverse=True)
+    tree = {}
+    for path in paths:
+        segments = path[len(API_ROOT)+1:].split('/')
+        node = tree
+        for seg in segments[:-1]:
+            node = node.setdefault(seg, {})
+        if segments[-1] not in node:
+            node[segments[-1]] = _default_value(path)
+    tree.pop('print_job', None)
+    return _listify(tree)
+
+
+def _listify(node):
+    if not isinstance(node, dict):
+        return node
+    node = {k: _listify(v) for k, v in node.items()}
+    if node and all(k.isdigit() for k in node):
+        return [node[str(i)] for i in range(len(node))]
+    return node
+
+
+class Simulator:
+    """A simulated printer serving the Ultimaker HTTP API and a camera.
+
+    Values follow simple models: temperatures approach their targets
+    exponentially, and an uploaded job heats up, then raises the bed by
+    `layer_height` every `layer_time` seconds with a short Z-hop in each
+    layer. With `username` and `password`, writes and `/auth/verify`
+    require HTTP digest auth. Each response is delayed by `latency` plus
+    Gaussian `jitter` seconds, and fails with a 500 at `error_rate`;
+    `path_latency` adds a delay to single paths, to degrade one endpoint.
+    `/simulator/stats` reports the number of API requests served.
+    """
+
+    def __init__(
+            self, host: str = '127.0.0.1', port: int = 0,
+            camera_port: Optional[int] = 0, username: Optional[str] = None,
+            password: Optional[str] = None, latency: float = 0.0,
+            jitter: float = 0.0, error_rate: float = 0.0,
+            layer_height: float = 0.2, layer_time: float = 10.0,
+            num_layers: int = 100, pre_print_time: float = 5.0,
+            fps: float = 10.0, seed: Optional[int] = None,
+            path_latency: Optional[Dict[str, float]] = None) -> None:
+        self.host = host
+        self.port = port
+        self.camera_port = camera_port
+        self.username = username
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.path_latency = dict(path_latency or {})
+        self.layer_height = layer_height
+        self.layer_time = layer_time
+        self.num_layers = num_layers
+        self.pre_print_time = pre_print_time
+        self.fps = fps
+        self.tree = build_tree()
+        self.request_count = 0
+        self._random = random.Random(seed)
+        self._nonces = {}
+        self._job = None
+        self._updated_at = time.monotonic()
+        self._loop = None
+        self._runners = []
+        self._thread = None
+
+    @property
+    def address(self) -> str:
+        """`host:port` of the API, as used for `ip_address` in config."""
+        return '{}:{}'.format(self.host, self.port)
+
+    @property
+    def camera_url(self) -> Optional[str]:
+        if self.camera_port is None:
+            return None
+        return 'http://{}:{}/?action=stream'.format(self.host, self.camera_port)
+
+    def config_entry(self) -> Dict[str, Any]:
+        entry = {'ip_address': self.address}
+        if self.camera_port is not None:
+            # The stream is not on port 8080 of the API host.
+            entry['camera_url'] = self.camera_url
+        if self.username is not None:
+            entry.update(username=self.username, password=self.password)
+        return entry
+
+    def __enter__(self) -> 'Simulator':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Serve on a background thread with its own event loop."""
+        self._loop = asyncio.new_event_loop()
+        self._loop.run_until_complete(self.start_async())
+        self._thread = threading.Thread(target=self._loop.run_forever,
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(
+            self.stop_async(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+    async def start_async(self) -> None:
+        """Serve on the running event loop."""
+        app = web.Application(middlewares=[self._faults, self._auth],
+                              client_max_size=1 << 31)
+        app.router.add_get('/simulator/stats', self._stats)
+        app.router.add_post(API_ROOT + '/print_job', self._post_job)
+        app.router.add_route('*', API_ROOT + '/{path:.*}', self._handle)
+        self.port = await self._serve(app, self.port)
+        if self.camera_port is not None:
+            camera = web.Application()
+            camera.router.add_get('/', self._camera)
+            self.camera_port = await self._serve(camera, self.camera_port)
+
+    async def stop_async(self) -> None:
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners = []
+
+    async def _serve(self, app, port):
+        runner = web.AppRunner(app, handle_signals=False,
+                               shutdown_timeout=1.0)
+        await runner.setup()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, port))
+        await web.SockSite(runner, sock).start()
+        self._runners.append(runner)
+        return sock.getsockname()[1]
+
+    @web.middleware
+    async def _faults(self, request, handler):
+        if not request.path.startswith(API_ROOT + '/'):
+            return await handler(request)
+        self.request_count += 1
+        delay = self.latency + self._random.gauss(0, self.jitter) \
+            if self.jitter else self.latency
+        delay += self.path_latency.get(request.path, 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if self._random.random() < self.error_rate:
+            return web.json_response({'message': 'injected error'},
+                                     status=500)
+        return await handler(request)
+
+    @web.middleware
+    async def _auth(self, request, handler):
+        protected = request.method != 'GET' \
+            or request.path == API_ROOT + '/auth/verify'
+        if self.username is None or not protected \
+                or self._check_digest(request):
+            return await handler(request)
+        nonce = uuid.uuid4().hex
+        self._nonces[nonce] = None
+        if len(self._nonces) > MAX_NONCES:
+            del self._nonces[next(iter(self._nonces))]
+        challenge = ('Digest realm="{}", nonce="{}", qop="auth", '
+                     'algorithm=MD5'.format(REALM, nonce))
+        return web.json_response({'message': 'Authorization required'},
+                                 status=401,
+                                 headers={'WWW-Authenticate': challenge})
+
+    def _check_digest(self, request):
+        header = request.headers.get('Authorization', '')
+        if not header.startswith('Digest '):
+            return False
+        params = {key: quoted or bare
+                  for key, quoted, bare in _DIGEST_PARAM.findall(header[7:])}
+        if params.get('username') != self.username \
+                or params.get('nonce') not in self._nonces \
+                or params.get('uri') != request.path_qs:
+            return False
+
+        def md5(*parts):
+            return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+        ha1 = md5(self.username, REALM, self.password)
+        ha2 = md5(request.method, params['uri'])
+        if params.get('qop'):
+            expected = md5(ha1, params['nonce'], params.get('nc', ''),
+                           params.get('cnonce', ''), params['qop'], ha2)
+        else:
+            expected = md5(ha1, params['nonce'], ha2)
+        return params.get('response') == expected
+
+    async def _stats(self, request):
+        return web.json_response({'requests': self.request_count})
+
+    async def _handle(self, request):
+        self._advance()
+        segments = [s for s in request.match_info['path'].split('/') if s]
+        if segments[:1] == ['print_job']:
+            if self._job is None:
+                return web.json_response({'message': 'No print job'},
+                                         status=404)
+            root = {'print_job': self._job}
+        else:
+            root = self.tree
+        try:
+            parent, key, value = _lookup(root, segments)
+        except (KeyError, IndexError, ValueError, TypeError):
+            return web.json_response({'message': 'Not found'}, status=404)
+
+        if request.method == 'GET':
+            return web.json_response(value)
+        if request.method != 'PUT':
+            return web.json_response({'message': 'Not allowed'}, status=405)
+        body = await request.json()
+        if segments == ['print_job', 'state']:
+            return self._set_job_state(body)
+        if segments[-1] == 'pre_heat':
+            self.tree['printer']['bed']['temperature']['target'] = \
+                float(body['temperature'])
+            value.update(active=True, remaining=body.get('timeout') or 0.0)
+        elif isinstance(value, dict) and isinstance(body, dict):
+            value.update({k: v for k, v in body.items()
+                          if k in value and v is not None})
+        else:
+            parent[key] = body
+        return web.json_response(True)
+
+    async def _post_job(self, request):
+        self._advance()
+        size = 0
+        name = 'job'
+        reader = await request.multipart()
+        async for part in reader:
+            if part.name == 'job_name':
+                name = await part.text()
+            elif part.name == 'file':
+                while True:
+                    chunk = await part.read_chunk()
+                    if not chunk:
+                        break
+                    size += len(chunk)
+        if self._job is not None:
+            return web.json_response({'message': 'Printer is busy'},
+                                     status=405)
+        self._job = {'name': name, 'uuid': str(uuid.uuid4()),
+                     'state': 'pre_print', 'progress': 0.0,
+                     'time_elapsed': 0.0,
+                     'time_total': self.num_layers * self.layer_time,
+                     'size': size}
+        self.tree['printer']['status'] = 'printing'
+        self._set_targets(210.0, 60.0)
+        return web.json_response({'message': 'Job started',
+                                  'uuid': self._job['uuid']}, status=201)
+
+    def _set_job_state(self, body):
+        # The job may have ended while the body was read.
+        if self._job is None:
+            return web.json_response({'message': 'No print job'},
+                                     status=404)
+        target = body.get('target')
+        if target == 'abort':
+            self._finish_job()
+        elif target == 'pause':
+            self._job['state'] = 'paused'
+        elif target == 'print' and self._job['state'] == 'paused':
+            self._job['state'] = 'printing'
+        else:
+            return web.json_response({'message': 'Invalid target'},
+                                     status=400)
+        return web.Response(status=204)
+
+    def _finish_job(self):
+        self._job = None
+        self.tree['printer']['status'] = 'idle'
+        self._set_targets(0.0, 0.0)
+
+    def _set_targets(self, nozzle, bed):
+        for extruder in self._extruders():
+            extruder['hotend']['temperature']['target'] = nozzle
+        self.tree['printer']['bed']['temperature']['target'] = bed
+
+    def _extruders(self):
+        return self.tree['printer']['heads'][0]['extruders']
+
+    def _advance(self):
+        now = time.monotonic()
+        dt, self._updated_at = now - self._updated_at, now
+        ambient = self.tree['ambient_temperature']['current']
+        heaters = [(e['hotend']['temperature'], 20.0)
+                   for e in self._extruders()]
+        heaters.append((self.tree['printer']['bed']['temperature'], 60.0))
+        for temp, tau in heaters:
+            goal = temp['target'] or ambient
+            temp['current'] += (goal - temp['current']) \
+                * (1 - math.exp(-dt / tau)) + self._random.gauss(0, 0.02)
+
+        job = self._job
+        if job is None or job['state'] == 'paused':
+            return
+        job['time_elapsed'] += dt
+        position = self.tree['printer']['heads'][0]['position']
+        if job['state'] == 'pre_print':
+            if job['time_elapsed'] >= self.pre_print_time:
+                job['state'] = 'printing'
+                job['time_elapsed'] = 0.0
+            return
+        elapsed = job['time_elapsed']
+        layer, phase = divmod(elapsed, self.layer_time)
+        if layer >= self.num_layers:
+            self._finish_job()
+            return
+        hop = 0.3 if 0.5 <= phase / self.layer_time < 0.52 else 0.0
+        position['z'] = round((layer + 1) * self.layer_height + hop, 3)
+        angle = 2 * math.pi * phase / self.layer_time
+        position['x'] = round(100 + 50 * math.cos(angle), 3)
+        position['y'] = round(100 + 50 * math.sin(angle), 3)
+        job['progress'] = elapsed / job['time_total']
+
+    async def _camera(self, request):
+        if request.query.get('action') == 'snapshot':
+            return web.Response(body=_FRAME, content_type='image/jpeg')
+        resp = web.StreamResponse(headers={
+            'Content-Type':
+                'multipart/x-mixed-replace;boundary=' + BOUNDARY})
+        await resp.prepare(request)
+        header = ('--{}\r\nContent-Type: image/jpeg\r\n'
+                  'Content-Length: {}\r\n\r\n'.format(BOUNDARY, len(_FRAME)))
+        try:
+            while True:
+                await resp.write(header.encode('ascii') + _FRAME + b'\r\n')
+                await asyncio.sleep(1 / self.fps)
+        except ConnectionResetError:
+            pass
+        return resp
+
+
+def _lookup(root, segments):
+    parent, key, value = None, None, root
+    for seg in segments:
+        parent = value
+        key = int(seg) if isinstance(value, list) else seg
+        value = value[key]
+    return parent, key, value
+
+
+def start_fleet(
+        count: int, host: str = '127.0.0.1', **kwargs) -> List['Simulator']:
+    """Start `count` simulators on free ports of `host`."""
+    simulators = []
+    for _ in range(count):
+        sim = Simulator(host=host, **kwargs)
+        sim.start()
+        simulators.append(sim)
+    return simulators
+
+
+def main() -> None:
+    parser = ArgumentParser(description='Run simulated Ultimaker printers.')
+    parser.add_argument('-n', '--count', type=int, default=1,
+                        help='number of printers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0,
+                        help='port of the first printer; 0 picks free ports')
+    parser.add_argument('--username')
+    parser.add_argument('--password')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--layer-time', type=float, default=10.0)
+    parser.add_argument('--config', help='write a config.yaml for them')
+    args = parser.parse_args()
+
+    simulators = []
+    for i in range(args.count):
+        sim = Simulator(host=args.host,
+                        port=args.port + 2 * i if args.port else 0,
+                        camera_port=args.port + 2 * i + 1 if args.port else 0,
+                        username=args.username, password=args.password,
+                        latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate,
+                        layer_time=args.layer_time)
+        sim.start()
+        simulators.append(sim)
+        print('sim{}: {} camera {}'.format(i, sim.address, sim.camera_url))
+    if args.config:
+        entries = {'sim{}'.format(i): sim.config_entry()
+                   for i, sim in enumerate(simulators)}
+        mode = 'a' if os.path.exists(args.config) else 'w'
+        with open(args.config, mode) as f:
+            yaml.safe_dump(entries, f)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for sim in simulators:
+            sim.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+import csv
+import os
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Optional, Tuple
+import zipfile
+
+from .mjpeg import MJPEGStream
+
+if TYPE_CHECKING:
+    from .component import Head
+    from .layer import LayerTracker
+
+INDEX_COLUMNS = ['layer', 'z', 'timestamp', 'frame_timestamp', 'filename']
+
+
+class LayerTimelapse:
+    """Captures one camera frame per layer reported by a LayerTracker.
+
+    The frame taken is the first one received `settle` seconds after the
+    sample that showed the new layer, so frames line up with the logged
+    telemetry. Frames are stored as the JPEG bytes sent by the camera,
+    without decoding, in the zip file `output_zip`, which must not exist
+    yet. The sidecar CSV next to it lists layer, Z and timestamps per
+    frame.
+
+    With `park_position`, the head is moved there before each frame and
+    back to where it was once the frame is taken.
+    """
+
+    def __init__(
+            self, tracker: 'LayerTracker', stream: 'MJPEGStream',
+            output_zip: str, head: Optional['Head'] = None,
+            park_position: Optional[Tuple[float, float]] = None,
+            settle: float = 0.0, frame_timeout: float = 5.0) -> None:
+        self._tracker = tracker
+        self._stream = stream
+        self.output_zip = output_zip
+        self.index_csv = os.path.splitext(output_zip)[0] + '.csv'
+        self._head = head
+        self.park_position = park_position
+        self.settle = settle
+        self.frame_timeout = frame_timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._active = False
+        self._callback_added = False
+        self._opened = False
+
+    def __enter__(self) -> 'LayerTimelapse':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        # Frames are named by layer, so an older archive would get
+        # duplicate entries; a restarted timelapse appends to its own.
+        if not self._opened:
+            for path in (self.output_zip, self.index_csv):
+                if os.path.exists(path):
+                    raise FileExistsError('{} already exists'.format(path))
+        mode = 'a' if self._opened else 'w'
+        self._opened = True
+        zf = zipfile.ZipFile(self.output_zip, mode, zipfile.ZIP_STORED)
+        f = open(self.index_csv, mode, newline='')
+        self._thread = threading.Thread(target=self._run, args=(zf, f),
+                                        daemon=True)
+        self._thread.start()
+        self._active = True
+        if not self._callback_added:
+            self._tracker.add_callback(self._on_layer)
+            self._callback_added = True
+
+    def stop(self) -> None:
+        self._active = False
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def _on_layer(self, event):
+        if not self._active:
+            return
+        timestamp = event.timestamp or time.time()
+        restore = None
+        if self._head is not None and self.park_position is not None:
+            # Runs on the logger thread, between batches.
+            restore = self._head.position()
+            self._head.move_to(*self.park_position)
+            timestamp = max(timestamp, time.time())
+        self._queue.put((event.layer, event.z, timestamp, restore))
+
+    def _run(self, zf, f):
+        with zf, f:
+            writer = csv.writer(f)
+            if f.tell() == 0:
+                writer.writerow(INDEX_COLUMNS)
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                layer, z, timestamp, restore = item
+                try:
+                    frame = self._frame_after(timestamp + self.settle)
+                finally:
+                    if restore is not None:
+                        self._head.move_to(*restore)
+                if frame is None:
+                    writer.writerow([layer, z, timestamp, '', ''])
+                else:
+                    filename = 'layer_{:05d}.jpg'.format(layer)
+                    zf.writestr(filename, frame.data)
+                    writer.writerow(
+                        [layer, z, timestamp, frame.timestamp, filename])
+                f.flush()
+
+    def _frame_after(self, timestamp):
+        delay = timestamp - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        frame = self._stream.latest_frame()
+        if frame is not None and frame.timestamp >= timestamp:
+            return frame
+        for frame in self._stream.frames(timeout=self.frame_timeout):
+            if frame.timestamp >= timestamp:
+                return frame
+        return None
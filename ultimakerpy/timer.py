@@ -16,8 +16,22 @@ class Timer:
         self.wait_for(lambda: target(self._data_logger.get(key)))
 
     def wait_for(self, target: Callable[[], bool]) -> None:
+        """`target` is evaluated again each time a new sample is logged."""
         t1 = time.perf_counter()
+        count = self._data_logger.sample_count
         while not target():
-            t2 = time.perf_counter()
-            if t2 - t1 > self._timeout:
+            remaining = self._timeout - (time.perf_counter() - t1)
+            if remaining <= 0:
                 raise TimeoutError(f'wait time exceeded {self._timeout} seconds')
+            count = self._data_logger.wait_for_sample(count, remaining)
+
+    def wait_for_layer(self, layer: int) -> None:
+        """Sleep until `layer` starts, as seen by the logger's layer tracker.
+
+        Without a tracker set up by `DataLogger.track_layers`, one with
+        default settings is created for the `bed_pos` column.
+        """
+        tracker = self._data_logger.layer_tracker \
+            or self._data_logger.track_layers()
+        if not tracker.wait_for_layer(layer, self._timeout):
+            raise TimeoutError(f'wait time exceeded {self._timeout} seconds')
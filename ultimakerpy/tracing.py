@@ -0,0 +1,199 @@
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from .metrics import body_size
+
+if TYPE_CHECKING:
+    from .metrics import RequestMetrics
+
+HOOKS = ('before_send', 'after_receive', 'on_error')
+
+
+class RequestTrace:
+    """Lifecycle of one request, as passed to the client hooks.
+
+    Times are `time.perf_counter()` values and durations in seconds:
+    `queue` is the wait between issuing a request and sending it (in
+    batch mode, until the batch is sent), `connect` opening a connection
+    (0 when one is reused, None when it cannot be measured), `wait` the
+    time to the response headers, `transfer` reading the body and `parse`
+    decoding its JSON. `batch_id` numbers the batches of a client and
+    `tick` is the sample of the DataLogger that sent the batch.
+    """
+
+    __slots__ = ('method', 'url', 'printer', 'endpoint', 'batch_id', 'tick',
+                 'queued_at', 'started_at', 'finished_at', 'queue',
+                 'connect', 'wait', 'transfer', 'parse', 'status',
+                 'bytes_sent', 'bytes_received', 'error')
+
+    def __init__(
+            self, method: str, url: str, printer: Optional[str] = None,
+            endpoint: Optional[str] = None, batch_id: Optional[int] = None,
+            tick: Optional[int] = None,
+            queued_at: Optional[float] = None) -> None:
+        self.method = method
+        self.url = url
+        self.printer = printer
+        self.endpoint = endpoint
+        self.batch_id = batch_id
+        self.tick = tick
+        self.queued_at = queued_at
+        self.started_at = None
+        self.finished_at = None
+        self.queue = 0.0
+        self.connect = None
+        self.wait = 0.0
+        self.transfer = 0.0
+        self.parse = 0.0
+        self.status = None
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.error: Optional[BaseException] = None
+
+    @property
+    def duration(self) -> float:
+        """Seconds from sending the request to the end of parsing."""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    def __repr__(self) -> str:
+        return ('RequestTrace({} {}, tick={}, queue={:.4f}, connect={}, '
+                'wait={:.4f}, transfer={:.4f}, parse={:.4f}{})').format(
+                    self.method, self.endpoint, self.tick, self.queue,
+                    'None' if self.connect is None else
+                    '{:.4f}'.format(self.connect),
+                    self.wait, self.transfer, self.parse,
+                    '' if self.error is None else
+                    ', error={!r}'.format(self.error))
+
+
+class TickTrace(NamedTuple):
+    """Where the time of one DataLogger sample went, in seconds.
+
+    `lateness` is how long after its scheduled deadline the tick started.
+    """
+    tick: int
+    started_at: float
+    requests: float
+    publish: float
+    callbacks: float
+    lateness: float = 0.0
+
+    @property
+    def duration(self) -> float:
+        return self.requests + self.publish + self.callbacks
+
+
+class Tracer:
+    """Times the requests of a client for its hooks and metrics.
+
+    Requests are only timed while metrics are attached or a hook is
+    registered, so an idle tracer costs one check per request.
+    """
+
+    def __init__(
+            self, metrics: Optional['RequestMetrics'] = None,
+            printer: Optional[str] = None,
+            labels: Optional[Dict[str, str]] = None) -> None:
+        self.metrics = metrics
+        self.printer = printer
+        self.labels = labels or {}
+        self._hooks = {name: [] for name in HOOKS}
+        self.active = metrics is not None
+
+    def add_hook(
+            self, name: str, func: Callable[['RequestTrace'], Any]) -> None:
+        """Call `func(trace)` at `name`: one of `HOOKS`."""
+        if name not in self._hooks:
+            raise ValueError('unknown hook {!r}; choose from {}'.format(
+                name, ', '.join(HOOKS)))
+        self._hooks[name].append(func)
+        self.active = True
+
+    def trace(
+            self, method: str, url: str, body: Any = None,
+            batch_id: Optional[int] = None, tick: Optional[int] = None,
+            queued_at: Optional[float] = None) -> 'RequestTrace':
+        trace = RequestTrace(method, url, self.printer,
+                             self.labels.get(url) or _path_of(url),
+                             batch_id, tick, queued_at)
+        trace.bytes_sent = body_size(body)
+        return trace
+
+    def before_send(self, trace: 'RequestTrace') -> None:
+        trace.started_at = time.perf_counter()
+        if trace.queued_at is not None:
+            trace.queue = trace.started_at - trace.queued_at
+        for func in self._hooks['before_send']:
+            func(trace)
+
+    def after_receive(self, trace: 'RequestTrace') -> None:
+        trace.finished_at = time.perf_counter()
+        if self.metrics is not None:
+            self.metrics.record(trace)
+        for func in self._hooks['after_receive']:
+            func(trace)
+
+    def on_error(self, trace: 'RequestTrace', error: BaseException) -> None:
+        trace.finished_at = time.perf_counter()
+        trace.error = error
+        if self.metrics is not None:
+            self.metrics.record(trace)
+        for func in self._hooks['on_error']:
+            func(trace)
+
+
+def endpoint_labels(url: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+    """Map each URL of `{category: {label: url}}` to `category/label`."""
+    labels = {}
+    for category, urls in url.items():
+        for label, u in urls.items():
+            labels.setdefault(u, '{}/{}'.format(category, label))
+    return labels
+
+
+def trace_config() -> 'aiohttp.TraceConfig':
+    """Return an aiohttp trace config that times connection setup.
+
+    Sessions created with it fill in `queue` and `connect` of the
+    `RequestTrace` passed as `trace_request_ctx`.
+    """
+    config = aiohttp.TraceConfig()
+    config.on_connection_queued_start.append(_on_start)
+    config.on_connection_queued_end.append(_on_queued_end)
+    config.on_connection_create_start.append(_on_start)
+    config.on_connection_create_end.append(_on_create_end)
+    config.on_connection_reuseconn.append(_on_reuse)
+    return config
+
+
+def _path_of(url):
+    parts = urlsplit(url)
+    return parts.path or '/'
+
+
+async def _on_start(session, ctx, params):
+    ctx.start = time.perf_counter()
+
+
+async def _on_queued_end(session, ctx, params):
+    trace = ctx.trace_request_ctx
+    if isinstance(trace, RequestTrace):
+        trace.queue += time.perf_counter() - ctx.start
+
+
+async def _on_create_end(session, ctx, params):
+    trace = ctx.trace_request_ctx
+    if isinstance(trace, RequestTrace):
+        elapsed = time.perf_counter() - ctx.start
+        trace.connect = (trace.connect or 0.0) + elapsed
+
+
+async def _on_reuse(session, ctx, params):
+    trace = ctx.trace_request_ctx
+    if isinstance(trace, RequestTrace) and trace.connect is None:
+        trace.connect = 0.0
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Iterable, Iterator, Optional
+import zipfile
+
+from .const import CACHE_DIR
+
+UFP_GCODE_PATH = '3D/model.gcode'
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'content-types">'
+    '<Default Extension="rels" ContentType="application/'
+    'vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="gcode" ContentType="text/x-gcode"/>'
+    '</Types>')
+_RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/'
+    'relationships">'
+    '<Relationship Target="/{}" Id="rel0" Type="http://schemas.ultimaker.org/'
+    'package/2018/relationships/gcode"/>'
+    '</Relationships>').format(UFP_GCODE_PATH)
+_CHUNK_SIZE = 1 << 20
+# Bump when the packed output changes, so stale cache entries are unused.
+_FORMAT_VERSION = b'1'
+# Maps each packed source file to its current cache entry.
+_INDEX = 'index.json'
+
+
+def strip_comments(lines: Iterable[bytes]) -> Iterator[bytes]:
+    """Drop G-code comments the printer does not need.
+
+    The Griffin header (`;START_OF_HEADER` to `;END_OF_HEADER`) and
+    `;LAYER` lines are kept; the firmware reads the header, and layer
+    markers are used to follow progress.
+    """
+    in_header = False
+    for line in lines:
+        if line.startswith(b';START_OF_HEADER'):
+            in_header = True
+        if in_header or line.startswith(b';LAYER'):
+            if line.startswith(b';END_OF_HEADER'):
+                in_header = False
+            yield line
+            continue
+        code = line.split(b';', 1)[0].rstrip()
+        if code:
+            yield code + b'\n'
+
+
+def pack_ufp(
+        gcode_path: str, ufp_path: str,
+        strip: bool = False, compresslevel: int = 6) -> None:
+    """Pack a G-code file into a UFP (zip) container, line by line."""
+    with open(gcode_path, 'rb') as src, \
+            zipfile.ZipFile(ufp_path, 'w', zipfile.ZIP_DEFLATED,
+                            compresslevel=compresslevel) as zf:
+        zf.writestr('[Content_Types].xml', _CONTENT_TYPES)
+        zf.writestr('_rels/.rels', _RELS)
+        with zf.open(UFP_GCODE_PATH, 'w', force_zip64=True) as dst:
+            lines = strip_comments(src) if strip else src
+            buf = []
+            size = 0
+            for line in lines:
+                buf.append(line)
+                size += len(line)
+                if size >= _CHUNK_SIZE:
+                    dst.write(b''.join(buf))
+                    buf, size = [], 0
+            dst.write(b''.join(buf))
+
+
+def cached_ufp(
+        gcode_path: str, strip: bool = False,
+        cache_dir: Optional[str] = None, max_bytes: int = 1 << 30) -> str:
+    """Return the path of a packed UFP of `gcode_path`, packing on a miss.
+
+    Packed files are kept in `cache_dir` under the SHA-256 of the G-code
+    content, so printing the same file again skips the compression.
+    Packing a file again after it was edited replaces its old entry, and
+    the least recently used entries are removed once the cache holds
+    more than `max_bytes`.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    digest = hashlib.sha256(_FORMAT_VERSION + (b's' if strip else b'r'))
+    with open(gcode_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    path = os.path.join(cache_dir, digest.hexdigest() + '.ufp')
+    if os.path.exists(path):
+        # Mark it used; the access time orders eviction, and the
+        # modification time is left alone.
+        os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+        return path
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.ufp.part', dir=cache_dir)
+    os.close(fd)
+    try:
+        pack_ufp(gcode_path, tmp_path, strip=strip)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _replace_entry(cache_dir, '{}:{}'.format(
+        os.path.abspath(gcode_path), 's' if strip else 'r'), path)
+    _evict(cache_dir, max_bytes, keep=path)
+    return path
+
+
+def _replace_entry(cache_dir, key, path):
+    index_path = os.path.join(cache_dir, _INDEX)
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        index = {}
+    old = index.get(key)
+    name = os.path.basename(path)
+    if old is not None and old != name and old not in (
+            v for k, v in index.items() if k != key):
+        _remove(os.path.join(cache_dir, old))
+    index[key] = name
+    index = {k: v for k, v in index.items()
+             if os.path.exists(os.path.join(cache_dir, v))}
+    fd, tmp_path = tempfile.mkstemp(suffix='.json', dir=cache_dir)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+
+def _evict(cache_dir, max_bytes, keep):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.ufp') and entry.path != keep:
+            st = entry.stat()
+            entries.append((st.st_atime, st.st_size, entry.path))
+    total = sum(size for _, size, _ in entries) + os.path.getsize(keep)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        _remove(path)
+        total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
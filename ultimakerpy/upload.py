@@ -0,0 +1,106 @@
+import os
+from typing import BinaryIO, Callable, Dict, Iterator, Optional
+import uuid
+
+Progress = Callable[[int, int], None]
+
+
+class MultipartUpload:
+    """A `multipart/form-data` body that streams a file in chunks.
+
+    The form fields and part headers are built up front; the file itself
+    is read `chunk_size` bytes at a time as the body is sent, so memory
+    use does not grow with the file. `progress(sent, total)` is called
+    after every read. The body can be rewound with `seek`, which digest
+    authentication needs to resend it.
+    """
+
+    def __init__(
+            self, fileobj: BinaryIO, fields: Optional[Dict[str, str]] = None,
+            file_field: str = 'file', filename: Optional[str] = None,
+            chunk_size: int = 65536,
+            progress: Optional[Progress] = None) -> None:
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self._fileobj = fileobj
+        self._file_start = fileobj.tell()
+        self._file_size = _remaining_size(fileobj)
+        if filename is None:
+            filename = os.path.basename(getattr(fileobj, 'name', file_field))
+
+        head = b''
+        for name, value in (fields or {}).items():
+            head += self.__part_header(
+                'form-data; name="{}"'.format(name)) \
+                + str(value).encode('utf-8') + b'\r\n'
+        head += self.__part_header(
+            'form-data; name="{}"; filename="{}"'.format(file_field, filename),
+            'application/octet-stream')
+        self._head = head
+        self._tail = '\r\n--{}--\r\n'.format(self.boundary).encode('ascii')
+        self._length = len(head) + self._file_size + len(self._tail)
+        self._pos = 0
+
+    def __part_header(self, disposition, content_type=None):
+        lines = ['--' + self.boundary,
+                 'Content-Disposition: ' + disposition]
+        if content_type is not None:
+            lines.append('Content-Type: ' + content_type)
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8')
+
+    @property
+    def content_type(self) -> str:
+        return 'multipart/form-data; boundary={}'.format(self.boundary)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[bytes]:
+        while True:
+            chunk = self.read()
+            if not chunk:
+                return
+            yield chunk
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self._length
+        self._pos = min(max(0, offset), self._length)
+        return self._pos
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        """Read up to `size` bytes, at most one chunk or one segment."""
+        if size is None or size < 0 or size > self.chunk_size:
+            size = self.chunk_size
+        pos = self._pos
+        file_end = len(self._head) + self._file_size
+        if pos < len(self._head):
+            data = self._head[pos:pos+size]
+        elif pos < file_end:
+            offset = pos - len(self._head)
+            self._fileobj.seek(self._file_start + offset)
+            data = self._fileobj.read(min(size, self._file_size - offset))
+            if not data:
+                raise IOError('file was truncated during the upload')
+        else:
+            data = self._tail[pos-file_end:pos-file_end+size]
+        self._pos += len(data)
+        if data and self.progress is not None:
+            self.progress(self._pos, self._length)
+        return data
+
+
+def _remaining_size(fileobj):
+    try:
+        return os.fstat(fileobj.fileno()).st_size - fileobj.tell()
+    except (AttributeError, OSError):
+        pos = fileobj.tell()
+        size = fileobj.seek(0, os.SEEK_END) - pos
+        fileobj.seek(pos)
+        return size
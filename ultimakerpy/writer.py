@@ -0,0 +1,312 @@
+import csv
+import gzip
+import json
+import queue
+import struct
+import threading
+import time
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+import warnings
+
+BINARY_MAGIC = b'UMLOG\x01'
+
+_LENGTH = struct.Struct('<I')
+_FLOAT = struct.Struct('<d')
+_INT = struct.Struct('<q')
+
+
+class CsvWriter:
+    """Writes rows as CSV; paths ending with `.gz` are gzip-compressed."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = None
+        self._writer = None
+
+    def open(self, columns: Sequence[str]) -> None:
+        if self.path.endswith('.gz'):
+            self._file = gzip.open(self.path, 'at', newline='')
+        else:
+            self._file = open(self.path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(columns)
+
+    def write_rows(self, rows: List[Sequence[Any]]) -> None:
+        self._writer.writerows(rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class BinaryWriter:
+    """Writes rows as length-prefixed, type-tagged binary records.
+
+    A file starts with `BINARY_MAGIC`. Each record is a 4-byte length
+    followed by a kind byte (`H` for a header of column names, `R` for a
+    row) and its encoded values. Use `read_binary` to read it back.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file = None
+
+    def open(self, columns: Sequence[str]) -> None:
+        self._file = open(self.path, 'ab')
+        if self._file.tell() == 0:
+            self._file.write(BINARY_MAGIC)
+        self._file.write(_record(b'H' + _encode_value(list(columns))))
+
+    def write_rows(self, rows: List[Sequence[Any]]) -> None:
+        self._file.write(b''.join(
+            _record(b'R' + _encode_value(list(row))) for row in rows))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes rows to a Parquet file, one row group per batch.
+
+    A column is typed by its first non-null value: numbers as float64,
+    so ints and floats mix, lists of numbers as float64 lists and
+    anything else as strings. Rows are held back until every column has
+    a value, or `max_pending` rows have been held; columns still without
+    one are strings. Later values that do not fit the type of their
+    column, such as the empty string of a failed read, are written as
+    null. Requires `pyarrow`.
+    """
+
+    def __init__(self, path: str, max_pending: int = 1000) -> None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('ParquetWriter requires pyarrow')
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self.max_pending = max_pending
+        self._columns = None
+        self._kinds = None
+        self._pending = []
+        self._writer = None
+
+    def open(self, columns: Sequence[str]) -> None:
+        self._columns = list(columns)
+        self._kinds = [None] * len(self._columns)
+
+    def write_rows(self, rows: List[Sequence[Any]]) -> None:
+        if self._writer is None:
+            self._pending.extend(rows)
+            for row in rows:
+                for i, val in enumerate(row):
+                    if self._kinds[i] is None and val is not None:
+                        self._kinds[i] = _column_kind(val)
+            if None in self._kinds and len(self._pending) < self.max_pending:
+                return
+            self.__open_file()
+            rows, self._pending = self._pending, []
+        self.__write_table(rows)
+
+    def close(self) -> None:
+        if self._writer is None and self._pending:
+            self.__open_file()
+            self.__write_table(self._pending)
+            self._pending = []
+        if self._writer is not None:
+            self._writer.close()
+
+    def __open_file(self):
+        pa = self._pa
+        types = {'float': pa.float64(), 'floats': pa.list_(pa.float64()),
+                 'string': pa.string(), None: pa.string()}
+        schema = pa.schema([(col, types[kind]) for col, kind
+                            in zip(self._columns, self._kinds)])
+        self._writer = self._pq.ParquetWriter(self.path, schema)
+
+    def __write_table(self, rows):
+        kinds = [kind or 'string' for kind in self._kinds]
+        data = {col: [_coerce(v, kind) for v in values]
+                for col, kind, values in zip(self._columns, kinds, zip(*rows))}
+        self._writer.write_table(self._pa.Table.from_pydict(
+            data, schema=self._writer.schema))
+
+
+def open_writer(path: str):
+    """Choose a writer from the extension of `path`."""
+    if path.endswith('.parquet'):
+        return ParquetWriter(path)
+    if path.endswith('.umlog'):
+        return BinaryWriter(path)
+    return CsvWriter(path)
+
+
+class BackgroundWriter:
+    """Feeds rows to a writer on its own thread in batches.
+
+    Rows are handed over through a queue, so a slow disk never delays the
+    thread calling `write`. A batch is flushed once it holds `batch_size`
+    rows or `flush_interval` seconds after its first row. If a flush
+    fails, later rows are dropped and the error is kept in `error` and
+    raised by `close`.
+    """
+
+    def __init__(
+            self, writer, batch_size: int = 100,
+            flush_interval: float = 1.0) -> None:
+        self.writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._thread = None
+        self._error = None
+
+    def start(self, columns: Sequence[str]) -> None:
+        self.writer.open(columns)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def error(self) -> Optional[Exception]:
+        """The error of a failed flush, or None."""
+        return self._error
+
+    def write(self, row: Sequence[Any]) -> None:
+        """Queue `row`, unless a flush has failed."""
+        if self._error is None:
+            self._queue.put(list(row))
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+        try:
+            self.writer.close()
+        finally:
+            if self._error is not None:
+                raise self._error
+
+    def _run(self):
+        while True:
+            row = self._queue.get()
+            if row is None:
+                return
+            rows = [row]
+            deadline = time.monotonic() + self.flush_interval
+            while len(rows) < self.batch_size:
+                try:
+                    row = self._queue.get(
+                        timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if row is None:
+                    self._flush(rows)
+                    return
+                rows.append(row)
+            self._flush(rows)
+
+    def _flush(self, rows):
+        if self._error is not None:
+            return
+        try:
+            self.writer.write_rows(rows)
+        except Exception as e:
+            self._error = e
+            warnings.warn('writing rows failed, later rows are dropped: '
+                          '{!r}'.format(e), RuntimeWarning)
+
+
+def read_binary(path: str) -> Iterator[Tuple[List[str], List[Any]]]:
+    """Yield `(columns, row)` for each row of a binary log file."""
+    with open(path, 'rb') as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError('{} is not a binary log file'.format(path))
+        columns = None
+        while True:
+            head = f.read(_LENGTH.size)
+            if not head:
+                break
+            payload = f.read(_LENGTH.unpack(head)[0])
+            value, _ = _decode_value(payload, 1)
+            if payload[:1] == b'H':
+                columns = value
+            else:
+                yield columns, value
+
+
+def _column_kind(val):
+    if isinstance(val, (int, float)) and not isinstance(val, bool):
+        return 'float'
+    if isinstance(val, (list, tuple)) and all(
+            isinstance(v, (int, float)) and not isinstance(v, bool)
+            for v in val):
+        return 'floats'
+    return 'string'
+
+
+def _coerce(val, kind):
+    if val is None:
+        return None
+    if kind == 'float':
+        return _float(val)
+    if kind == 'floats':
+        if not isinstance(val, (list, tuple)):
+            return None
+        return [_float(v) for v in val]
+    if isinstance(val, str):
+        return val
+    return json.dumps(list(val) if isinstance(val, tuple) else val)
+
+
+def _float(val):
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return None
+
+
+def _record(payload):
+    return _LENGTH.pack(len(payload)) + payload
+
+
+def _encode_value(val):
+    if val is None:
+        return b'n'
+    if isinstance(val, bool):
+        return b'b' + (b'\x01' if val else b'\x00')
+    if isinstance(val, int):
+        return b'q' + _INT.pack(val)
+    if isinstance(val, float):
+        return b'd' + _FLOAT.pack(val)
+    if isinstance(val, str):
+        data = val.encode('utf-8')
+        return b's' + _LENGTH.pack(len(data)) + data
+    if isinstance(val, (list, tuple)):
+        return b'l' + _LENGTH.pack(len(val)) \
+            + b''.join(_encode_value(v) for v in val)
+    data = json.dumps(val).encode('utf-8')
+    return b'j' + _LENGTH.pack(len(data)) + data
+
+
+def _decode_value(buf, pos):
+    tag = buf[pos:pos+1]
+    pos += 1
+    if tag == b'n':
+        return None, pos
+    if tag == b'b':
+        return buf[pos] != 0, pos + 1
+    if tag == b'q':
+        return _INT.unpack_from(buf, pos)[0], pos + _INT.size
+    if tag == b'd':
+        return _FLOAT.unpack_from(buf, pos)[0], pos + _FLOAT.size
+    length = _LENGTH.unpack_from(buf, pos)[0]
+    pos += _LENGTH.size
+    if tag == b'l':
+        values = []
+        for _ in range(length):
+            val, pos = _decode_value(buf, pos)
+            values.append(val)
+        return values, pos
+    data = bytes(buf[pos:pos+length]).decode('utf-8')
+    if tag == b'j':
+        return json.loads(data), pos + length
+    return data, pos + length